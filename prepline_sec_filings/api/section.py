@@ -17,8 +17,13 @@ from starlette.types import Send
 from base64 import b64encode
 from typing import Optional, Mapping, Iterator, Tuple
 import secrets
-from prepline_sec_filings.sections import section_string_to_enum, validate_section_names, SECSection
-from prepline_sec_filings.sec_document import SECDocument, REPORT_TYPES, VALID_FILING_TYPES
+from prepline_sec_filings.sections import (
+    section_string_to_enum,
+    validate_section_names,
+    SECSection,
+    REPORT_TYPES,
+    VALID_FILING_TYPES,
+)
 from enum import Enum
 import re
 import signal
@@ -29,6 +34,7 @@ from prepline_sec_filings.sections import (
     SECTIONS_10Q,
     SECTIONS_S1,
 )
+from prepline_sec_filings.timing import get_timer
 import csv
 from typing import Dict
 from unstructured.documents.elements import Text, NarrativeText, Title, ListItem
@@ -116,9 +122,18 @@ def pipeline_api(
     text, response_type="application/json", response_schema="isd", m_section=[], m_section_regex=[]
 ):
     """Many supported sections including: RISK_FACTORS, MANAGEMENT_DISCUSSION, and many more"""
+    # NOTE: Imported on first use since it pulls in NLTK and sklearn, see
+    # prepline_sec_filings.warmup. The module import keeps the generated API from hoisting it.
+    import prepline_sec_filings.sec_document as sec_document_module
+
     validate_section_names(m_section)
+    timer = get_timer()
+    timer.record_since_start("upload")
 
-    sec_document = SECDocument.from_string(text)
+    with timer.stage("parse"):
+        sec_document = sec_document_module.SECDocument.from_string(text)
+    with timer.stage("partition"):
+        timer.count("elements", len(sec_document.elements))
     if sec_document.filing_type not in VALID_FILING_TYPES:
         raise ValueError(
             f"SEC document filing type {sec_document.filing_type} is not supported, "
@@ -137,13 +152,21 @@ def pipeline_api(
 
         else:
             m_section = [enum.name for enum in SECTIONS_S1]
+    timer.tag("filing_type", sec_document.filing_type)
+    timer.tag("section_count", str(len(m_section) + len(m_section_regex)))
     for section in m_section:
-        results[section] = sec_document.get_section_narrative(section_string_to_enum[section])
+        with timer.stage(f"section.{section}"):
+            results[section] = sec_document.get_section_narrative(section_string_to_enum[section])
     for i, section_regex in enumerate(m_section_regex):
         regex_enum = get_regex_enum(section_regex)
-        with timeout(seconds=5):
+        with timeout(seconds=5), timer.stage(f"section.REGEX_{i}"):
             section_elements = sec_document.get_section_narrative(regex_enum)
             results[f"REGEX_{i}"] = section_elements
+    with timer.stage("serialize"):
+        return _serialize_results(results, response_type, response_schema)
+
+
+def _serialize_results(results, response_type, response_schema):
     if response_type == "application/json":
         if response_schema == LABELSTUDIO:
             return {
@@ -0,0 +1,262 @@
+"""Module for fetching filings from the SEC EDGAR Archives with asyncio. Unlike the blocking
+functions in fetch, AsyncEdgarClient keeps many requests in flight at once, while every request
+still goes through the shared rate limiter (see rate_limiter). download_filings yields filings
+as they complete, so they can be parsed while the rest are downloading:
+
+    async with AsyncEdgarClient(your_organization_name, your_email) as client:
+        async for download in client.download_filings([(cik, accession_number), ...]):
+            sec_document = SECDocument.from_string(download.text)"""
+import asyncio
+import json
+import sys
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+from prepline_sec_filings.cache import EdgarCache
+from prepline_sec_filings.fetch import (
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_TIMEOUT,
+    RETRY_STATUSES,
+    SEC_SUBMISSIONS_URL,
+    _backoff,
+    _drop_dashes,
+    _form_types,
+    _identity,
+    _retry_after,
+    archive_url,
+)
+from prepline_sec_filings.filing_index import FilingIndex
+from prepline_sec_filings.rate_limiter import RateLimiter, get_rate_limiter
+
+DEFAULT_MAX_CONCURRENCY: Final[int] = 10
+
+
+class FilingDownload(NamedTuple):
+    """A filing downloaded by AsyncEdgarClient.download_filings, with the cik and accession
+    number as they were given. If the download failed, text is None and error holds the
+    exception."""
+
+    cik: str
+    accession_number: str
+    text: Optional[str] = None
+    error: Optional[BaseException] = None
+
+
+class AsyncEdgarClient:
+    """Async client for the SEC EDGAR Archives. At most max_concurrency requests are in flight
+    at once, over as many keep-alive connections. Requests wait for the rate limiter without
+    blocking the event loop, and are retried like EdgarClient's requests. With a cache, filings
+    that were downloaded before are read from it instead. Use as an async context manager, or
+    call aclose when done."""
+
+    def __init__(
+        self,
+        company: Optional[str] = None,
+        email: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        cache: Optional[EdgarCache] = None,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "AsyncEdgarClient requires httpx, install it with `pip install httpx`"
+            )
+        company, email = _identity(company, email)
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": f"{company} {email}", "Content-Type": "text/html"},
+            limits=httpx.Limits(
+                max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncEdgarClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _wait_for_rate_limiter(self):
+        limiter = self.rate_limiter or get_rate_limiter()
+        while True:
+            wait = limiter.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def get(self, url: str) -> "httpx.Response":
+        """Sends a GET request once the rate limiter allows it, retrying on connection errors
+        and 429 or 5xx responses. Returns the last response if the retries run out."""
+        if self._in_flight is None:
+            # NOTE: Created here rather than in __init__, so it binds to the running loop
+            self._in_flight = asyncio.Semaphore(self.max_concurrency)
+        attempt = 0
+        while True:
+            async with self._in_flight:
+                await self._wait_for_rate_limiter()
+                try:
+                    response = await self.client.get(url)
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = _backoff(self.backoff_factor, attempt)
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                        return response
+                    retry_after = _retry_after(response)
+                    delay = (
+                        retry_after
+                        if retry_after is not None
+                        else _backoff(self.backoff_factor, attempt)
+                    )
+                    # NOTE: Releases the connection back to the pool before backing off
+                    await response.aclose()
+            # NOTE: Backs off outside the semaphore, so other requests can use the slot
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_filing(self, cik: Union[str, int], accession_number: Union[str, int]) -> str:
+        """Fetches the specified filing from the SEC EDGAR Archives."""
+        # NOTE: The cache reads and writes files, so it runs in the default executor rather
+        # than blocking the event loop
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            cached = await loop.run_in_executor(
+                None, self.cache.get_filing, _drop_dashes(accession_number)
+            )
+            if cached is not None:
+                return cached.decode("utf-8")
+        response = await self.get(archive_url(cik, accession_number))
+        response.raise_for_status()
+        if self.cache is not None:
+            await loop.run_in_executor(
+                None,
+                self.cache.put_filing,
+                _drop_dashes(accession_number),
+                response.text.encode("utf-8"),
+            )
+        return response.text
+
+    async def get_submissions(self, cik: Union[str, int]) -> dict:
+        """Gets the submissions JSON for a given cik number, with the company information and
+        its recent filings."""
+        response = await self.get(f"{SEC_SUBMISSIONS_URL}/CIK{cik}.json")
+        response.raise_for_status()
+        return json.loads(response.content)
+
+    async def get_submissions_page(self, name: str) -> dict:
+        """Gets one of the additional pages of older filings listed under filings.files in the
+        submissions JSON."""
+        response = await self.get(f"{SEC_SUBMISSIONS_URL}/{name}")
+        response.raise_for_status()
+        return json.loads(response.content)
+
+    async def get_filing_index(self, cik: Union[str, int], all_pages: bool = True) -> FilingIndex:
+        """Gets the index of every filing of a given cik number, or only of the recent filings
+        if all_pages is False, which saves the requests for the pages of older filings."""
+        submissions = await self.get_submissions(cik)
+        pages = [submissions["filings"]["recent"]]
+        if all_pages:
+            pages.extend(
+                await asyncio.gather(
+                    *(
+                        self.get_submissions_page(page["name"])
+                        for page in submissions["filings"].get("files", [])
+                    )
+                )
+            )
+        return FilingIndex.from_pages(str(cik), pages)
+
+    async def get_forms_by_cik(self, cik: Union[str, int]) -> dict:
+        """Gets retrieves dict of recent SEC form filings for a given cik number."""
+        recent_forms = (await self.get_submissions(cik))["filings"]["recent"]
+        return {k: v for k, v in zip(recent_forms["accessionNumber"], recent_forms["form"])}
+
+    async def get_recent_acc_by_cik(self, cik: str, form_type: str) -> Tuple[str, str]:
+        """Returns (accession_number, retrieved_form_type) for the given cik and form_type.
+        The retrieved_form_type may be an amended version of requested form_type, e.g. 10-Q/A
+        for 10-Q."""
+        form_types = _form_types(form_type)
+        filing = (await self.get_filing_index(cik, all_pages=False)).latest(form_types)
+        if filing is None:
+            raise ValueError(f"No filings found for {cik}, looking for any of: {form_types}")
+        return filing.accession_number, filing.form
+
+    async def _download(
+        self, cik: Union[str, int], accession_number: Union[str, int]
+    ) -> FilingDownload:
+        try:
+            text = await self.get_filing(cik, accession_number)
+        except Exception as e:
+            return FilingDownload(str(cik), str(accession_number), error=e)
+        return FilingDownload(str(cik), str(accession_number), text=text)
+
+    async def download_filings(
+        self, filings: Iterable[Tuple[Union[str, int], Union[str, int]]]
+    ) -> AsyncIterator[FilingDownload]:
+        """Downloads the (cik, accession_number) filings concurrently and yields each one as
+        soon as it completes, so not in the given order. Failed downloads are yielded with the
+        error instead of raising, so one bad filing does not stop the rest. filings is consumed
+        lazily, so it can be a generator over a large index."""
+        filings_iter = iter(filings)
+        pending: Set[asyncio.Future] = set()
+        # NOTE: Keeps a few more downloads scheduled than can be in flight, so a slot that
+        # frees up is taken immediately, without creating a task per filing up front
+        window = 2 * self.max_concurrency
+
+        def schedule():
+            for cik, accession_number in filings_iter:
+                pending.add(asyncio.ensure_future(self._download(cik, accession_number)))
+                if len(pending) >= window:
+                    return
+
+        schedule()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                schedule()
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            # NOTE: Waits for the cancelled downloads to finish, so their connections are
+            # released and no task is left pending when the iteration stops early
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def download_filings(
+    filings: Iterable[Tuple[Union[str, int], Union[str, int]]],
+    company: Optional[str] = None,
+    email: Optional[str] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> List[FilingDownload]:
+    """Downloads the (cik, accession_number) filings concurrently and returns them in the order
+    they completed."""
+    async with AsyncEdgarClient(company, email, max_concurrency=max_concurrency) as client:
+        return [download async for download in client.download_filings(filings)]
@@ -0,0 +1,201 @@
+"""Module for downloading the filings listed in a manifest, in the shape of
+test_utils/examples.json:
+
+    {
+      "mmm": {
+        "cik": "66740",
+        "forms": {
+          "10-Q": "000006674022000065"
+        }
+      }
+    }
+
+Filings are downloaded by a bounded number of threads that share the client, and so its rate
+limiter and connection pool, with download.download, so interrupted downloads resume where they
+stopped. The SHA-256 and size of every file are recorded in the manifest under "files", next to
+"forms", and files that are already there are only downloaded again if they do not match their
+recorded checksum or the one in a sha256sum style checksums file:
+
+    manifest = read_manifest("test_utils/examples.json")
+    results = download_manifest(client, manifest, "sample-docs", checksums=read_checksums(path))
+    write_manifest("sample-docs/sec_docs_manifest.json", manifest)
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from prepline_sec_filings.download import download
+from prepline_sec_filings.fetch import EdgarClient, archive_url, logger
+
+DEFAULT_MAX_WORKERS: Final[int] = 10
+_HASH_CHUNK_SIZE: Final[int] = 1024**2
+
+
+class ChecksumMismatchError(IOError):
+    pass
+
+
+class ManifestEntry(NamedTuple):
+    ticker: str
+    form_type: str
+    cik: str
+    accession_number: str
+
+
+class ManifestDownload(NamedTuple):
+    entry: ManifestEntry
+    path: str
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    # NOTE: True if the file was already there and matched its checksum
+    skipped: bool = False
+    error: Optional[BaseException] = None
+
+
+def sec_doc_filename(entry: ManifestEntry) -> str:
+    """Returns the file name of a sample document, e.g. mmm-10-Q-66740-000006674022000065.xbrl"""
+    name = f"{entry.ticker}-{entry.form_type}-{entry.cik}-{entry.accession_number}.xbrl"
+    return name.replace("/", "")
+
+
+def read_manifest(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(path: str, manifest: dict):
+    """Writes the manifest to a temporary file and renames it into place, so an interrupted
+    write never leaves a truncated manifest."""
+    _write_atomically(path, json.dumps(manifest, indent=2) + "\n")
+
+
+def manifest_entries(manifest: dict) -> List[ManifestEntry]:
+    return [
+        ManifestEntry(ticker, form_type, str(filing_info["cik"]), str(accession_number))
+        for ticker, filing_info in manifest.items()
+        for form_type, accession_number in filing_info["forms"].items()
+    ]
+
+
+def read_checksums(path: str) -> Dict[str, str]:
+    """Reads a file in the format written by sha256sum into a mapping of path -> checksum."""
+    checksums = {}
+    with open(path) as f:
+        for line in f:
+            checksum, _, filename = line.rstrip("\n").partition(" ")
+            if checksum and filename:
+                # NOTE: sha256sum marks files read in binary mode with a *
+                checksums[filename.lstrip(" *")] = checksum
+    return checksums
+
+
+def write_checksums(path: str, checksums: Dict[str, str]):
+    _write_atomically(
+        path,
+        "".join(f"{checksum}  {filename}\n" for filename, checksum in sorted(checksums.items())),
+    )
+
+
+def sha256_file(path: str) -> Tuple[str, int]:
+    """Returns the SHA-256 and the size of a file, reading it in chunks."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+def download_manifest(
+    client: EdgarClient,
+    manifest: dict,
+    directory: str,
+    checksums: Optional[Dict[str, str]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    compression: Optional[str] = None,
+    filename: Callable[[ManifestEntry], str] = sec_doc_filename,
+    overwrite: bool = False,
+    transform: Optional[Callable[[str], None]] = None,
+) -> List[ManifestDownload]:
+    """Downloads the filings in the manifest to directory, as described above, and records
+    their checksums in the manifest. A filing that fails to download or does not match its
+    expected checksum is returned with its error rather than stopping the other downloads.
+    Checksums are matched by file name, so a checksums file written from another directory
+    still applies. transform is called with the path of each downloaded file before it is
+    checksummed, to rewrite it in place."""
+    os.makedirs(directory, exist_ok=True)
+    expected = {os.path.basename(path): checksum for path, checksum in (checksums or {}).items()}
+    for entry in manifest_entries(manifest):
+        recorded = manifest[entry.ticker].get("files", {}).get(entry.form_type)
+        name = filename(entry)
+        if recorded and recorded.get("sha256") and name not in expected:
+            expected[name] = recorded["sha256"]
+
+    def download_entry(entry: ManifestEntry) -> ManifestDownload:
+        path = os.path.join(directory, filename(entry))
+        try:
+            return _download_entry(
+                client,
+                entry,
+                path,
+                expected.get(os.path.basename(path)),
+                compression,
+                overwrite,
+                transform,
+            )
+        except Exception as error:
+            logger.warning(f"Failed to download {path}", exc_info=True)
+            return ManifestDownload(entry, path, error=error)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(download_entry, manifest_entries(manifest)))
+
+    for result in results:
+        if result.error is None:
+            files = manifest[result.entry.ticker].setdefault("files", {})
+            files[result.entry.form_type] = {"sha256": result.sha256, "size": result.size}
+    return results
+
+
+def _download_entry(
+    client: EdgarClient,
+    entry: ManifestEntry,
+    path: str,
+    expected: Optional[str],
+    compression: Optional[str],
+    overwrite: bool,
+    transform: Optional[Callable[[str], None]] = None,
+) -> ManifestDownload:
+    if os.path.exists(path) and not overwrite:
+        checksum, size = sha256_file(path)
+        if expected is None or checksum == expected:
+            return ManifestDownload(entry, path, checksum, size, skipped=True)
+        logger.warning(f"{path} does not match its checksum, downloading it again")
+    download(client, archive_url(entry.cik, entry.accession_number), path, compression)
+    if transform is not None:
+        transform(path)
+    checksum, size = sha256_file(path)
+    if expected is not None and checksum != expected:
+        raise ChecksumMismatchError(f"{path} has SHA-256 {checksum}, expected {expected}.")
+    return ManifestDownload(entry, path, checksum, size)
+
+
+def _write_atomically(path: str, text: str):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,224 @@
+"""Module for caching SEC EDGAR responses on disk. Archived filings never change once they are
+published, so they are stored by accession number and served from disk without contacting
+EDGAR. Submissions JSON changes whenever a company files, so it is served from disk for max_age
+seconds and then revalidated with its ETag and Last-Modified validators, which costs a request
+but not the download when nothing changed.
+
+The cache is bounded to max_bytes, evicting the least recently used entries first, and can be
+shared by threads and processes: entries are written to a temporary file and renamed into place,
+so readers never see a partial entry."""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Union
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+CACHE_DIR_ENV: Final[str] = "SEC_API_CACHE_DIR"
+DEFAULT_MAX_BYTES: Final[int] = 1024**3
+DEFAULT_MAX_AGE: Final[float] = 600
+# NOTE: Evicts down to this fraction of max_bytes, so eviction does not run on every write
+_EVICT_TO: Final[float] = 0.9
+
+
+class CachedResponse(NamedTuple):
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = 0
+
+
+class EdgarCache:
+    """Size-bounded on-disk cache for archived filings and submissions JSON. Also holds SEC's
+    ticker to CIK mapping for fetch.TickerResolver."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._filings_dir = os.path.join(directory, "filings")
+        self._submissions_dir = os.path.join(directory, "submissions")
+        # NOTE: Outside the entry directories, so it is never evicted
+        self._company_tickers_path = os.path.join(directory, "company_tickers.json")
+        os.makedirs(self._filings_dir, exist_ok=True)
+        os.makedirs(self._submissions_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def get_filing(self, accession_number: str) -> Optional[bytes]:
+        return self._read(self._filing_path(accession_number))
+
+    def put_filing(self, accession_number: str, content: bytes):
+        self._write(self._filing_path(accession_number), content)
+
+    def get_submissions(self, cik: Union[str, int]) -> Optional[CachedResponse]:
+        return self._get_response(self._submissions_path(cik))
+
+    def put_submissions(
+        self,
+        cik: Union[str, int],
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self._put_response(self._submissions_path(cik), content, etag, last_modified)
+
+    def get_submissions_page(self, name: str) -> Optional[CachedResponse]:
+        return self._get_response(self._submissions_page_path(name))
+
+    def put_submissions_page(
+        self,
+        name: str,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self._put_response(self._submissions_page_path(name), content, etag, last_modified)
+
+    def get_company_tickers(self) -> Optional[CachedResponse]:
+        return self._get_response(self._company_tickers_path)
+
+    def put_company_tickers(
+        self, content: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ):
+        self._put_response(self._company_tickers_path, content, etag, last_modified)
+
+    def is_fresh(self, entry: CachedResponse, max_age: Optional[float] = None) -> bool:
+        return time.time() - entry.stored_at < (self.max_age if max_age is None else max_age)
+
+    @staticmethod
+    def revalidation_headers(entry: CachedResponse) -> Dict[str, str]:
+        """Returns the conditional request headers for a stale entry."""
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def size(self) -> int:
+        """Returns the total size of the cached entries, as last counted by this process plus
+        what it has written since."""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(os.path.getsize(path) for path in self._entries())
+            return self._size
+
+    def evict(self, target_bytes: Optional[int] = None):
+        """Removes the least recently used entries until the cache holds at most target_bytes,
+        which defaults to slightly below max_bytes."""
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * _EVICT_TO)
+        with self._lock:
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            size = sum(entry_size for _, entry_size, _ in entries)
+            for _, entry_size, path in sorted(entries):
+                if size <= target_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+            self._size = size
+
+    def _entries(self):
+        for directory in (self._filings_dir, self._submissions_dir):
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.startswith("."):
+                    yield entry.path
+
+    def _filing_path(self, accession_number: str) -> str:
+        return os.path.join(self._filings_dir, f"{accession_number}.txt")
+
+    def _submissions_path(self, cik: Union[str, int]) -> str:
+        return os.path.join(self._submissions_dir, f"CIK{cik}.json")
+
+    def _submissions_page_path(self, name: str) -> str:
+        # NOTE: The name comes from the submissions JSON, so it must not reach outside the cache
+        if name in ("", ".", "..") or "/" in name or "\\" in name:
+            raise ValueError(f"Invalid submissions page name {name!r}")
+        return os.path.join(self._submissions_dir, name)
+
+    def _get_response(self, path: str) -> Optional[CachedResponse]:
+        data = self._read(path)
+        if data is None:
+            return None
+        header, _, content = data.partition(b"\n")
+        try:
+            return CachedResponse(content, **json.loads(header))
+        except (ValueError, TypeError):
+            return None
+
+    def _put_response(
+        self, path: str, content: bytes, etag: Optional[str], last_modified: Optional[str]
+    ):
+        # NOTE: The validators go on the first line, so an entry is one file that is replaced
+        # atomically
+        header = {"etag": etag, "last_modified": last_modified, "stored_at": time.time()}
+        self._write(path, json.dumps(header).encode() + b"\n" + content)
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # NOTE: Marks the entry as recently used for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, path: str, data: bytes):
+        # NOTE: Counts the existing entries first, so the entry replaced below is counted once
+        self.size()
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # NOTE: Under the lock, so threads replacing the same entry each subtract the size
+            # of the one they replaced
+            with self._lock:
+                try:
+                    replaced_size = os.stat(path).st_size
+                except FileNotFoundError:
+                    replaced_size = 0
+                os.replace(tmp_path, path)
+                if directory == self.directory:
+                    # NOTE: Not an entry, so not counted towards max_bytes
+                    return
+                assert self._size is not None
+                self._size += len(data) - replaced_size
+                over_limit = self._size > self.max_bytes
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if over_limit:
+            self.evict()
+
+
+def cache_from_environment() -> Optional[EdgarCache]:
+    """Returns a cache in SEC_API_CACHE_DIR, or None if it is not set."""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    return EdgarCache(directory) if directory else None
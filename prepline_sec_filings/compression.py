@@ -0,0 +1,209 @@
+"""Module for compressing API responses according to the client's Accept-Encoding header"""
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+GZIP: Final[str] = "gzip"
+ZSTD: Final[str] = "zstd"
+
+# NOTE: Small responses (errors, single empty sections) are not worth the CPU time it takes
+# to compress them
+DEFAULT_MINIMUM_SIZE: Final[int] = int(os.environ.get("SEC_FILINGS_COMPRESSION_MINIMUM_SIZE", 1024))
+DEFAULT_GZIP_LEVEL: Final[int] = 6
+DEFAULT_ZSTD_LEVEL: Final[int] = 3
+
+
+def supported_encodings() -> List[str]:
+    """Returns the content codings available in this environment, in order of preference."""
+    encodings = [GZIP]
+    if zstandard is not None:
+        encodings.insert(0, ZSTD)
+    return encodings
+
+
+def parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into a mapping of coding -> quality value.
+    ref: https://www.rfc-editor.org/rfc/rfc9110#name-accept-encoding"""
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], encodings: Optional[List[str]] = None
+) -> Optional[str]:
+    """Picks the content coding to use for a response, or None if the response should be sent
+    uncompressed. Ties between equally weighted codings go to the server preference order."""
+    if not accept_encoding:
+        return None
+    if encodings is None:
+        encodings = supported_encodings()
+    qualities = parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best[0]:
+            best = (quality, encoding)
+    return best[1]
+
+
+class _GzipCompressor:
+    def __init__(self, level: int = DEFAULT_GZIP_LEVEL):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool, flush: bool = True) -> bytes:
+        """Compresses a chunk, flushing so that the client can decode everything sent so far
+        unless flush is False."""
+        out = self._compressobj.compress(data)
+        if not (final or flush):
+            return out
+        return out + self._compressobj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int = DEFAULT_ZSTD_LEVEL):
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool, flush: bool = True) -> bytes:
+        """Compresses a chunk, flushing so that the client can decode everything sent so far
+        unless flush is False."""
+        out = self._compressobj.compress(data)
+        if not (final or flush):
+            return out
+        flush_mode = (
+            zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+        return out + self._compressobj.flush(flush_mode)
+
+
+def get_compressor(encoding: str, gzip_level: int, zstd_level: int):
+    """Returns a streaming compressor for the given content coding."""
+    if encoding == GZIP:
+        return _GzipCompressor(gzip_level)
+    elif encoding == ZSTD and zstandard is not None:
+        return _ZstdCompressor(zstd_level)
+    raise ValueError(f"Content coding {encoding} is not supported.")
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses with gzip or zstd, depending on what the client
+    asks for in Accept-Encoding. Complete responses smaller than minimum_size are sent as is.
+    Streaming responses (e.g. multipart/mixed) are compressed chunk by chunk and flushed after
+    each chunk, so clients can still consume parts as they arrive."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
+        zstd_level: int = DEFAULT_ZSTD_LEVEL,
+        encodings: Optional[List[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.encodings = encodings if encodings is not None else supported_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("Accept-Encoding"), encodings=self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compressor: Any = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # NOTE: Hold on to the headers until we see the first chunk of the body, since that
+            # determines whether we compress and which headers we send.
+            self.initial_message = message
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = Headers(raw=self.initial_message["headers"])
+            if "content-encoding" in headers or (
+                not more_body and len(body) < self.middleware.minimum_size
+            ):
+                self.passthrough = True
+                await self._send(self.initial_message)
+                await self._send(message)
+                return
+
+            self.compressor = get_compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.zstd_level
+            )
+            body = self.compressor.compress(body, final=not more_body)
+
+            mutable_headers = MutableHeaders(raw=self.initial_message["headers"])
+            mutable_headers["Content-Encoding"] = self.encoding
+            mutable_headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del mutable_headers["Content-Length"]
+            else:
+                mutable_headers["Content-Length"] = str(len(body))
+            await self._send(self.initial_message)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = self.compressor.compress(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,103 @@
+"""Module for finding what changed in the sections of a filing since the company's prior one.
+Consecutive 10-Ks repeat most of their risk factors word for word, so downstream processing
+only needs the elements that were added:
+
+    prior, delta = delta_from_store(store, filing, sections)
+    for element in delta["RISK_FACTORS"].added:
+        print(element["text"])
+
+Elements are compared by a hash of their text normalized with clean_sec_text, which ignores
+case, whitespace, dashes and trailing punctuation, so the cost is linear in the number of
+elements. An element that appears n times in one filing and m times in the other is unchanged
+min(n, m) times."""
+from collections import Counter
+import datetime
+import hashlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from prepline_sec_filings.extraction import extract_sections
+from prepline_sec_filings.sec_document import clean_sec_text
+from prepline_sec_filings.section_store import SectionStore, StoredFiling, _iso_date
+
+
+class SectionDelta(NamedTuple):
+    # NOTE: Elements of the current filing that are not in the prior one, in order
+    added: List[dict]
+    # NOTE: Elements of the prior filing that are not in the current one, in order
+    removed: List[dict]
+    # NOTE: Elements of the current filing that are also in the prior one, in order
+    unchanged: List[dict]
+
+
+def normalized_hash(text: str) -> str:
+    """Returns the hash that elements are compared by, of the text normalized with
+    clean_sec_text."""
+    normalized = clean_sec_text(text, lowercase=True)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def section_delta(prior: List[dict], current: List[dict]) -> SectionDelta:
+    """Compares the elements of a section of the prior filing and of the current one."""
+    prior_hashes = [normalized_hash(element["text"]) for element in prior]
+    remaining = Counter(prior_hashes)
+    added = []
+    unchanged = []
+    for element in current:
+        element_hash = normalized_hash(element["text"])
+        if remaining[element_hash] > 0:
+            remaining[element_hash] -= 1
+            unchanged.append(element)
+        else:
+            added.append(element)
+    removed = []
+    # NOTE: The first occurrences of repeated elements are the ones matched
+    for element, element_hash in zip(reversed(prior), reversed(prior_hashes)):
+        if remaining[element_hash] > 0:
+            remaining[element_hash] -= 1
+            removed.append(element)
+    removed.reverse()
+    return SectionDelta(added, removed, unchanged)
+
+
+def sections_delta(prior: Dict[str, list], current: Dict[str, list]) -> Dict[str, SectionDelta]:
+    """Compares the sections of the prior filing and of the current one, as returned by the
+    section API for the isd schema. A section missing from either one is compared as empty."""
+    names = list(current) + [name for name in prior if name not in current]
+    return {name: section_delta(prior.get(name, []), current.get(name, [])) for name in names}
+
+
+def filing_delta(
+    prior_text: str,
+    current_text: str,
+    sections: List[str],
+    extract: Callable[[str, List[str]], Dict[str, list]] = extract_sections,
+) -> Dict[str, SectionDelta]:
+    """Extracts the sections (section names, or ["_ALL"]) from the text of the prior filing and
+    of the current one, and compares them."""
+    return sections_delta(extract(prior_text, sections), extract(current_text, sections))
+
+
+def prior_filing(store: SectionStore, filing: StoredFiling) -> Optional[StoredFiling]:
+    """Returns the most recent filing of the same company and form type stored before the
+    filing, or None if there is none."""
+    if filing.filing_date is None:
+        raise ValueError(f"The filing date of {filing.accession_number} is required")
+    filing_date = datetime.date.fromisoformat(_iso_date(filing.filing_date))
+    day_before = filing_date - datetime.timedelta(days=1)
+    filings = store.filings(ciks=[filing.cik], form_types=[filing.form_type], end=day_before)
+    return filings[0] if filings else None
+
+
+def delta_from_store(
+    store: SectionStore, filing: StoredFiling, sections: Optional[Dict[str, list]] = None
+) -> Tuple[Optional[StoredFiling], Dict[str, SectionDelta]]:
+    """Compares the sections of the filing, the stored ones by default, with the same sections
+    of the prior filing in the store. Returns the prior filing, None if there is none, in which
+    case every element is added, and the delta of each section."""
+    current = sections if sections is not None else store.get(filing.accession_number)
+    prior = prior_filing(store, filing)
+    prior_sections = {} if prior is None else store.get(prior.accession_number, list(current))
+    return prior, {
+        name: section_delta(prior_sections.get(name, []), elements)
+        for name, elements in current.items()
+    }
@@ -0,0 +1,274 @@
+"""Module for downloading files from EDGAR straight to disk. The response body is streamed in
+chunks and compressed on the fly, so memory use does not depend on the size of the file, and
+an interrupted download is resumed with an HTTP Range request instead of starting over:
+
+    client = EdgarClient(your_organization_name, your_email)
+    download_filing(client, "949874", "0001193125-11-215661", "filings/949874.txt.gz")
+
+While downloading, the compressed data goes to <path>.part and the progress to
+<path>.part.json. Every checkpoint_size bytes the current gzip member (or zstd frame) is
+finished, the file is synced and the progress is saved, so the part file can always be cut back
+to the last checkpoint and continued. The result is therefore a sequence of members, which gzip
+and gzip.open read as one file (for zstd, use stream_reader(..., read_across_frames=True) or the
+zstd command line tool). Once the number of bytes received matches the Content-Length (or the
+total in Content-Range), the part file is renamed to path."""
+import json
+import os
+import re
+import time
+from typing import NamedTuple, Optional, Tuple, Union
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+import requests
+
+from prepline_sec_filings.compression import (
+    DEFAULT_GZIP_LEVEL,
+    DEFAULT_ZSTD_LEVEL,
+    GZIP,
+    get_compressor,
+)
+from prepline_sec_filings.fetch import EdgarClient, _backoff, archive_url
+
+DEFAULT_CHUNK_SIZE: Final[int] = 64 * 1024
+DEFAULT_CHECKPOINT_SIZE: Final[int] = 8 * 1024**2
+PART_SUFFIX: Final[str] = ".part"
+STATE_SUFFIX: Final[str] = ".part.json"
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class IncompleteDownloadError(IOError):
+    pass
+
+
+class DownloadResult(NamedTuple):
+    path: str
+    # NOTE: Bytes received from EDGAR, and bytes on disk after compression
+    size: int
+    stored_size: int
+    # NOTE: Bytes that were already downloaded by an earlier, interrupted call
+    resumed_from: int
+
+
+class _IdentityCompressor:
+    def compress(self, data: bytes, final: bool, flush: bool = True) -> bytes:
+        return data
+
+
+def download(
+    client: EdgarClient,
+    url: str,
+    path: str,
+    compression: Optional[str] = GZIP,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    checkpoint_size: int = DEFAULT_CHECKPOINT_SIZE,
+    gzip_level: int = DEFAULT_GZIP_LEVEL,
+    zstd_level: int = DEFAULT_ZSTD_LEVEL,
+) -> DownloadResult:
+    """Downloads url to path, compressed with gzip, zstd or not at all (compression=None), as
+    described above. Resumes from <path>.part if an earlier download of the same url with the
+    same compression was interrupted. Connection errors and responses that end early are retried
+    from the last checkpoint with the client's max_retries and backoff_factor; if the retries
+    run out, the exception is raised and the part file is kept, so calling download again
+    resumes it."""
+    if compression is not None:
+        # NOTE: Fails early if the compression is not available
+        get_compressor(compression, gzip_level, zstd_level)
+
+    def new_compressor():
+        if compression is None:
+            return _IdentityCompressor()
+        return get_compressor(compression, gzip_level, zstd_level)
+
+    part = _PartialDownload(path, url, compression)
+    resumed_from = part.raw_bytes
+    attempt = 0
+    try:
+        while True:
+            try:
+                _stream(client, part, new_compressor, chunk_size, checkpoint_size)
+                break
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                IncompleteDownloadError,
+            ):
+                part.rollback()
+                if attempt >= client.max_retries:
+                    raise
+                time.sleep(_backoff(client.backoff_factor, attempt))
+                attempt += 1
+    finally:
+        part.close()
+    part.finish()
+    return DownloadResult(path, part.raw_bytes, part.stored_bytes, resumed_from)
+
+
+def download_filing(
+    client: EdgarClient,
+    cik: Union[str, int],
+    accession_number: Union[str, int],
+    path: str,
+    compression: Optional[str] = GZIP,
+    **kwargs,
+) -> DownloadResult:
+    """Downloads the full submission text file of the specified filing to path (see download)."""
+    return download(client, archive_url(cik, accession_number), path, compression, **kwargs)
+
+
+def _stream(client, part, new_compressor, chunk_size: int, checkpoint_size: int):
+    headers = {"Accept-Encoding": "identity"}
+    if part.raw_bytes:
+        headers["Range"] = f"bytes={part.raw_bytes}-"
+        if part.validator:
+            # NOTE: If the file changed since the download started, the server sends all of it
+            headers["If-Range"] = part.validator
+    response = client.get(part.url, stream=True, headers=headers)
+    try:
+        if response.status_code == 416 and part.raw_bytes and part.raw_bytes == part.total:
+            # NOTE: Interrupted after the last checkpoint but before the rename
+            return
+        response.raise_for_status()
+        if response.status_code == 206:
+            start, total = _content_range(response)
+            if start != part.raw_bytes:
+                raise IncompleteDownloadError(
+                    f"Asked for {part.url} from byte {part.raw_bytes}, got it from byte {start}."
+                )
+        else:
+            if part.raw_bytes:
+                part.restart()
+            content_length = response.headers.get("Content-Length")
+            total = int(content_length) if content_length is not None else None
+        part.total = total
+        if not part.raw_bytes:
+            part.validator = _validator(response)
+
+        compressor = new_compressor()
+        pending = 0
+        for chunk in response.iter_content(chunk_size):
+            part.write(compressor.compress(chunk, final=False, flush=False), len(chunk))
+            pending += len(chunk)
+            if pending >= checkpoint_size:
+                part.write(compressor.compress(b"", final=True), 0)
+                part.checkpoint()
+                compressor = new_compressor()
+                pending = 0
+        if pending:
+            part.write(compressor.compress(b"", final=True), 0)
+        part.checkpoint()
+    finally:
+        response.close()
+
+    if part.total is not None and part.raw_bytes != part.total:
+        raise IncompleteDownloadError(
+            f"Received {part.raw_bytes} of {part.total} bytes of {part.url}."
+        )
+
+
+class _PartialDownload:
+    """The part file of a download and its progress as of the last checkpoint."""
+
+    def __init__(self, path: str, url: str, compression: Optional[str]):
+        self.path = path
+        self.url = url
+        self.compression = compression
+        self.part_path = path + PART_SUFFIX
+        self.state_path = path + STATE_SUFFIX
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.total: Optional[int] = None
+        self.validator: Optional[str] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = self._load_state()
+        if state is not None and os.path.exists(self.part_path):
+            self.file = open(self.part_path, "r+b")
+            self.file.seek(0, os.SEEK_END)
+            if self.file.tell() >= state["stored_bytes"]:
+                self.raw_bytes = state["raw_bytes"]
+                self.stored_bytes = state["stored_bytes"]
+                self.total = state["total"]
+                self.validator = state["validator"]
+        else:
+            self.file = open(self.part_path, "w+b")
+        self._checkpoint = (self.raw_bytes, self.stored_bytes)
+        self.rollback()
+
+    def write(self, data: bytes, raw_size: int):
+        self.file.write(data)
+        self.stored_bytes += len(data)
+        self.raw_bytes += raw_size
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        state = {
+            "url": self.url,
+            "compression": self.compression,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "total": self.total,
+            "validator": self.validator,
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._checkpoint = (self.raw_bytes, self.stored_bytes)
+
+    def rollback(self):
+        """Cuts the part file back to the last checkpoint."""
+        self.raw_bytes, self.stored_bytes = self._checkpoint
+        self.file.seek(self.stored_bytes)
+        self.file.truncate()
+
+    def restart(self):
+        self._checkpoint = (0, 0)
+        self.validator = None
+        self.rollback()
+
+    def close(self):
+        self.file.close()
+
+    def finish(self):
+        os.replace(self.part_path, self.path)
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+    def _load_state(self) -> Optional[dict]:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if state.get("url") != self.url or state.get("compression") != self.compression:
+            return None
+        return state
+
+
+def _content_range(response) -> Tuple[int, Optional[int]]:
+    """Returns the first byte and the total size from the Content-Range header of a 206."""
+    match = _CONTENT_RANGE_RE.match(response.headers.get("Content-Range", ""))
+    if match is None:
+        raise IncompleteDownloadError("The response has no valid Content-Range.")
+    total = match.group(3)
+    return int(match.group(1)), None if total == "*" else int(total)
+
+
+def _validator(response) -> Optional[str]:
+    """Returns the validator to send in If-Range, which only takes strong ETags or dates."""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
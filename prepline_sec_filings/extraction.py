@@ -0,0 +1,264 @@
+"""Module for extracting sections from the latest filings of many companies. Downloading is
+bound by the network and the EDGAR rate limit, while parsing and extracting sections is bound
+by the CPU, so the two are overlapped: filings are downloaded by a pool of threads and handed to
+a pool of processes for extraction as soon as each one arrives, and results are yielded as they
+finish. The whole run then takes about as long as the slower of the two, not their sum:
+
+    for result in extract_sections_for_tickers(["mmm", "aapl"], "10-K", ["RISK_FACTORS"]):
+        print(result.ticker, result.error or len(result.sections["RISK_FACTORS"]))
+
+At most queue_size downloaded filings wait for or are in extraction at any time, so a slow
+extraction pool holds back the downloads instead of filling up memory.
+
+With a state.StateStore, filings that were already extracted by this version of the library are
+not downloaded again, their stored sections are yielded instead, and newly extracted sections are
+recorded, so recurring runs only process new filings. With a section_store.SectionStore, the
+extracted sections are also stored there, to be queried later without parsing the filings."""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait
+import datetime
+import multiprocessing
+import os
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from prepline_sec_filings.fetch import EdgarClient, get_default_client
+from prepline_sec_filings.section_store import SectionStore, StoredFiling
+from prepline_sec_filings.sections import ALL_SECTIONS, validate_section_names
+from prepline_sec_filings.state import StateStore, content_hash
+
+DEFAULT_DOWNLOAD_WORKERS: Final[int] = 4
+
+
+class SectionResult(NamedTuple):
+    ticker: str
+    cik: Optional[str] = None
+    accession_number: Optional[str] = None
+    form_type: Optional[str] = None
+    # NOTE: Section name -> elements, as returned by the section API for the isd schema
+    sections: Optional[Dict[str, list]] = None
+    error: Optional[BaseException] = None
+    # NOTE: True if the sections were taken from the state store instead of being extracted
+    skipped: bool = False
+    filing_date: Optional[datetime.date] = None
+
+
+class _Download(NamedTuple):
+    cik: str
+    accession_number: str
+    form_type: str
+    text: str
+    # NOTE: Sections from the state store, if the filing is current and was not downloaded
+    stored: Optional[Dict[str, list]] = None
+    filing_date: Optional[datetime.date] = None
+
+
+def extract_sections(text: str, sections: List[str]) -> Dict[str, list]:
+    """Extracts the sections from the text of a filing, like the section API does."""
+    from prepline_sec_filings.api.section import pipeline_api
+
+    return pipeline_api(text, m_section=sections)
+
+
+def _warm_up_worker():
+    from prepline_sec_filings.warmup import warm_up
+
+    warm_up()
+
+
+def _process_context():
+    # NOTE: The extraction processes start while the download threads are running, and a process
+    # forked then inherits the locks those threads hold (logging, connection pools, the rate
+    # limiter) and can deadlock on them, so they are started from a fresh process instead
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # NOTE: Imported once by the server rather than by every process it starts
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def extract_sections_for_tickers(
+    tickers: Iterable[str],
+    form_type: str,
+    sections: List[str],
+    workers: Optional[int] = None,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    queue_size: Optional[int] = None,
+    company: Optional[str] = None,
+    email: Optional[str] = None,
+    client: Optional[EdgarClient] = None,
+    allow_amended_filing: bool = True,
+    primary_document_only: bool = False,
+    warm_up: bool = True,
+    extract: Callable[[str, List[str]], Dict[str, list]] = extract_sections,
+    state: Optional[StateStore] = None,
+    store: Optional[SectionStore] = None,
+) -> Iterator[SectionResult]:
+    """Downloads the most recent form_type filing of each ticker and extracts the sections
+    (section names, or ["_ALL"]) from it, as described above. Yields a SectionResult per ticker
+    in the order they finish, with the error instead of the sections if the download or the
+    extraction failed.
+
+    workers is the number of extraction processes (the number of CPUs by default) and
+    download_workers the number of download threads, which share the client and so its rate
+    limit. queue_size defaults to twice the number of workers. With warm_up, each process
+    warms up the pipeline (see warmup) when it starts, so no filing pays for it. extract is run
+    in the processes, which import it afresh, so it must be a module-level function. state is
+    the optional StateStore to skip the filings that are current in and to record the outcome of
+    the others in, and store the optional SectionStore to store the extracted sections in."""
+    validate_section_names(sections)
+    edgar = client if client is not None else get_default_client(company, email)
+    workers = workers or os.cpu_count() or 1
+    slots = threading.BoundedSemaphore(queue_size or 2 * workers)
+    closed = threading.Event()
+
+    def download(ticker: str) -> Optional[_Download]:
+        slots.acquire()
+        if closed.is_set():
+            slots.release()
+            return None
+        try:
+            cik = edgar.get_cik_by_ticker(ticker)
+            filing = edgar.get_latest_filing(cik, form_type, allow_amended_filing)
+            stored = _stored_sections(state, filing.accession_number, sections)
+            if stored is not None:
+                slots.release()
+                return _Download(
+                    cik, filing.accession_number, filing.form, "", stored, filing.filing_date
+                )
+            try:
+                if primary_document_only:
+                    text = edgar.get_primary_document(
+                        cik, filing.accession_number, filing.form, filing.primary_document or None
+                    )
+                else:
+                    text = edgar.get_filing(cik, filing.accession_number)
+            except Exception as error:
+                if state is not None:
+                    state.record_failure(filing.accession_number, error, cik, filing.form)
+                raise
+            if state is not None:
+                state.record_fetch(filing.accession_number, content_hash(text), cik, filing.form)
+        except BaseException:
+            slots.release()
+            raise
+        return _Download(
+            cik, filing.accession_number, filing.form, text, filing_date=filing.filing_date
+        )
+
+    downloads = ThreadPoolExecutor(max_workers=download_workers)
+    extractions = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_process_context(),
+        initializer=_warm_up_worker if warm_up else None,
+    )
+    pending: Dict[Future, Tuple[str, Optional[_Download]]] = {}
+    try:
+        for ticker in tickers:
+            pending[downloads.submit(download, ticker)] = (ticker, None)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker, downloaded = pending.pop(future)
+                error = future.exception()
+                if downloaded is None and error is None:
+                    downloaded = future.result()
+                    if downloaded.stored is not None:
+                        yield _result(ticker, downloaded, downloaded.stored, None, skipped=True)
+                        continue
+                    # NOTE: Download finished, hand the filing over to the extraction processes
+                    extraction = extractions.submit(extract, downloaded.text, sections)
+                    # NOTE: Only the process pool keeps the text, until it is extracted
+                    pending[extraction] = (
+                        ticker,
+                        _Download(
+                            downloaded.cik,
+                            downloaded.accession_number,
+                            downloaded.form_type,
+                            "",
+                            filing_date=downloaded.filing_date,
+                        ),
+                    )
+                    continue
+                if downloaded is not None:
+                    slots.release()
+                    if store is not None and error is None:
+                        store.put(_stored_filing(ticker, downloaded), future.result())
+                    if state is not None:
+                        _record(state, downloaded, sections, future)
+                yield _result(ticker, downloaded, None if error else future.result(), error)
+    finally:
+        closed.set()
+        for future in pending:
+            future.cancel()
+        # NOTE: Unblocks the downloads waiting for a slot, which then return without downloading
+        for _ in range(download_workers):
+            try:
+                slots.release()
+            except ValueError:
+                break
+        downloads.shutdown(wait=False)
+        extractions.shutdown(wait=False)
+
+
+def _result(
+    ticker: str,
+    downloaded: Optional[_Download],
+    sections: Optional[Dict[str, list]],
+    error: Optional[BaseException],
+    skipped: bool = False,
+) -> SectionResult:
+    if downloaded is None:
+        return SectionResult(ticker, error=error)
+    return SectionResult(
+        ticker,
+        downloaded.cik,
+        downloaded.accession_number,
+        downloaded.form_type,
+        sections,
+        error,
+        skipped,
+        downloaded.filing_date,
+    )
+
+
+def _stored_filing(ticker: str, downloaded: _Download) -> StoredFiling:
+    return StoredFiling(
+        downloaded.accession_number,
+        downloaded.cik,
+        downloaded.form_type,
+        downloaded.filing_date,
+        ticker,
+    )
+
+
+def _stored_sections(
+    state: Optional[StateStore], accession_number: str, sections: List[str]
+) -> Optional[Dict[str, list]]:
+    if state is None:
+        return None
+    current = state.current(accession_number, sections=sections)
+    if current is None or not isinstance(current.result, dict):
+        return None
+    if sections == [ALL_SECTIONS]:
+        return current.result
+    return {name: elements for name, elements in current.result.items() if name in sections}
+
+
+def _record(state: StateStore, downloaded: _Download, sections: List[str], extraction: Future):
+    error = extraction.exception()
+    if error is not None:
+        state.record_failure(
+            downloaded.accession_number, error, downloaded.cik, downloaded.form_type
+        )
+    else:
+        state.record_extraction(
+            downloaded.accession_number, sections=sections, result=extraction.result()
+        )
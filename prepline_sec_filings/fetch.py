@@ -1,9 +1,15 @@
 """Module for fetching data from the SEC EDGAR Archives"""
+from email.utils import parsedate_to_datetime
+import functools
 import json
+import logging
 import os
 import re
 import requests
-from typing import List, Optional, Tuple, Union
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 import sys
 
 if sys.version_info < (3, 8):
@@ -13,72 +19,504 @@ else:
 
 import webbrowser
 
-from ratelimit import limits, sleep_and_retry
+from lxml import etree
+from lxml import html as lxml_html
 
-from prepline_sec_filings.sec_document import VALID_FILING_TYPES
+from prepline_sec_filings.cache import CachedResponse, EdgarCache, cache_from_environment
+from prepline_sec_filings.filing_index import Filing, FilingIndex
+from prepline_sec_filings.rate_limiter import RateLimiter, get_rate_limiter
+from prepline_sec_filings.sections import VALID_FILING_TYPES
 
 SEC_ARCHIVE_URL: Final[str] = "https://www.sec.gov/Archives/edgar/data"
 SEC_SEARCH_URL: Final[str] = "http://www.sec.gov/cgi-bin/browse-edgar"
 SEC_SUBMISSIONS_URL = "https://data.sec.gov/submissions"
+SEC_COMPANY_TICKERS_URL: Final[str] = "https://www.sec.gov/files/company_tickers.json"
+
+logger = logging.getLogger("prepline_sec_filings")
+
+DEFAULT_POOL_SIZE: Final[int] = 10
+DEFAULT_MAX_RETRIES: Final[int] = 5
+DEFAULT_BACKOFF_FACTOR: Final[float] = 0.5
+DEFAULT_TIMEOUT: Final[float] = 30
+MAX_BACKOFF: Final[float] = 60
+RETRY_STATUSES: Final[frozenset] = frozenset({429, 500, 502, 503, 504})
+DEFAULT_TICKERS_MAX_AGE: Final[float] = 24 * 60 * 60
+DEFAULT_TICKERS_RETRY_AFTER: Final[float] = 5 * 60
+
+
+class EdgarClient:
+    """Client for the SEC EDGAR Archives that reuses one session, and so its connections, across
+    requests. Requests go through the shared rate limiter (see rate_limiter) unless a limiter is
+    passed, and are retried on connection errors and 429 or 5xx responses with exponential
+    backoff, waiting for as long as the Retry-After header asks if the response has one.
+
+    pool_size is the number of connections kept alive per host, which should be at least the
+    number of threads sharing the client. An existing session can be passed instead of company
+    and email, in which case it is used as is.
+
+    With a cache (see cache.EdgarCache), filings are only downloaded once and submissions are
+    revalidated instead of downloaded again, and cache hits do not use the rate limit."""
+
+    def __init__(
+        self,
+        company: Optional[str] = None,
+        email: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[EdgarCache] = None,
+    ):
+        if session is None:
+            session = _get_session(company, email)
+            adapter = HTTPAdapter(pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.tickers = TickerResolver(self)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Sends a GET request once the rate limiter allows it, retrying as described above.
+        Returns the last response if the retries run out, so check its status."""
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            (self.rate_limiter or get_rate_limiter()).acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = _backoff(self.backoff_factor, attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = _retry_after(response)
+                delay = (
+                    retry_after
+                    if retry_after is not None
+                    else _backoff(self.backoff_factor, attempt)
+                )
+                # NOTE: Returns the connection to the pool, which a streamed response that is
+                # not read would otherwise hold on to
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get_filing(self, cik: Union[str, int], accession_number: Union[str, int]) -> str:
+        """Fetches the specified filing from the SEC EDGAR Archives."""
+        if self.cache is not None:
+            cached = self.cache.get_filing(_drop_dashes(accession_number))
+            if cached is not None:
+                return cached.decode("utf-8")
+        url = archive_url(cik, accession_number)
+        response = self.get(url)
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.put_filing(_drop_dashes(accession_number), response.text.encode("utf-8"))
+        return response.text
+
+    def get_primary_document(
+        self,
+        cik: Union[str, int],
+        accession_number: Union[str, int],
+        form_type: Optional[str] = None,
+        primary_document: Optional[str] = None,
+    ) -> str:
+        """Fetches only the primary document of the filing, e.g. the 10-K without its exhibits,
+        in the same <DOCUMENT> envelope as in the full submission, so SECDocument reads the
+        filing type from it. Unless primary_document and form_type are given, they are looked
+        up in the filing index. Falls back to the full submission (get_filing) if the filing
+        index or the primary document is unavailable."""
+        cache_key = f"{_drop_dashes(accession_number)}-primary"
+        if self.cache is not None:
+            cached = self.cache.get_filing(cache_key)
+            if cached is not None:
+                return cached.decode("utf-8")
+        if primary_document is None or form_type is None:
+            found = self.find_primary_document(cik, accession_number, form_type)
+            if found is None:
+                return self.get_filing(cik, accession_number)
+            primary_document, form_type = found
+        response = self.get(document_url(cik, accession_number, primary_document))
+        if response.status_code == 404:
+            return self.get_filing(cik, accession_number)
+        response.raise_for_status()
+        text = _wrap_primary_document(response.text, form_type, primary_document)
+        if self.cache is not None:
+            self.cache.put_filing(cache_key, text.encode("utf-8"))
+        return text
+
+    def find_primary_document(
+        self,
+        cik: Union[str, int],
+        accession_number: Union[str, int],
+        form_type: Optional[str] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """Returns the file name and form type of the primary document of the filing from its
+        filing index, or None if the filing index is unavailable."""
+        response = self.get(filing_index_url(cik, accession_number))
+        if response.status_code >= 400:
+            return None
+        return _parse_primary_document(response.text, form_type)
+
+    def get_cik_by_ticker(self, ticker: str) -> str:
+        """Gets a CIK number from a stock ticker. Looks the ticker up in SEC's ticker to CIK
+        mapping (see TickerResolver), falling back to a search on the SEC website for tickers
+        that are not in it."""
+        cik = self._resolve_ticker(ticker)
+        return cik if cik is not None else self._search_cik_by_ticker(ticker)
+
+    def get_ciks_by_tickers(self, tickers: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Gets the CIK numbers of many stock tickers, with one request for the mapping rather
+        than one per ticker. Tickers that are neither in the mapping nor found by a search on
+        the SEC website map to None."""
+        ciks: Dict[str, Optional[str]] = {}
+        for ticker in tickers:
+            cik = self._resolve_ticker(ticker)
+            if cik is None:
+                try:
+                    cik = self._search_cik_by_ticker(ticker)
+                except IndexError:
+                    pass
+            ciks[ticker] = cik
+        return ciks
+
+    def _resolve_ticker(self, ticker: str) -> Optional[str]:
+        try:
+            return self.tickers.resolve(ticker)
+        except (requests.RequestException, ValueError, KeyError):
+            logger.warning("Could not load the SEC ticker to CIK mapping", exc_info=True)
+            return None
+
+    def _search_cik_by_ticker(self, ticker: str) -> str:
+        cik_re = re.compile(r".*CIK=(\d{10}).*")
+        url = _search_url(ticker)
+        response = self.get(url, stream=True)
+        response.raise_for_status()
+        results = cik_re.findall(response.text)
+        return str(results[0])
+
+    def get_submissions(self, cik: Union[str, int]) -> dict:
+        """Gets the submissions JSON for a given cik number, with the company information and
+        its recent filings."""
+        url = f"{SEC_SUBMISSIONS_URL}/CIK{cik}.json"
+        if self.cache is None:
+            return json.loads(self._get_content(url))
+        return json.loads(
+            self._get_revalidated(
+                url,
+                self.cache.get_submissions(cik),
+                self.cache.max_age,
+                functools.partial(self.cache.put_submissions, cik),
+            )
+        )
+
+    def get_submissions_page(self, name: str) -> dict:
+        """Gets one of the additional pages of older filings listed under filings.files in the
+        submissions JSON."""
+        url = f"{SEC_SUBMISSIONS_URL}/{name}"
+        if self.cache is None:
+            return json.loads(self._get_content(url))
+        return json.loads(
+            self._get_revalidated(
+                url,
+                self.cache.get_submissions_page(name),
+                self.cache.max_age,
+                functools.partial(self.cache.put_submissions_page, name),
+            )
+        )
+
+    def get_filing_index(self, cik: Union[str, int], all_pages: bool = True) -> FilingIndex:
+        """Gets the index of every filing of a given cik number, or only of the recent filings
+        if all_pages is False, which saves the requests for the pages of older filings."""
+        submissions = self.get_submissions(cik)
+        pages = [submissions["filings"]["recent"]]
+        if all_pages:
+            for page in submissions["filings"].get("files", []):
+                pages.append(self.get_submissions_page(page["name"]))
+        return FilingIndex.from_pages(str(cik), pages)
+
+    def get_company_tickers(self, max_age: float = DEFAULT_TICKERS_MAX_AGE) -> dict:
+        """Gets SEC's ticker to CIK mapping. With a cache, the mapping is downloaded again at
+        most every max_age seconds."""
+        if self.cache is None:
+            return json.loads(self._get_content(SEC_COMPANY_TICKERS_URL))
+        return json.loads(
+            self._get_revalidated(
+                SEC_COMPANY_TICKERS_URL,
+                self.cache.get_company_tickers(),
+                max_age,
+                self.cache.put_company_tickers,
+            )
+        )
+
+    def _get_content(self, url: str) -> bytes:
+        response = self.get(url)
+        response.raise_for_status()
+        return response.content
+
+    def _get_revalidated(
+        self,
+        url: str,
+        cached: Optional[CachedResponse],
+        max_age: float,
+        store: Callable[[bytes, Optional[str], Optional[str]], None],
+    ) -> bytes:
+        """Returns the cached content while it is fresh, and otherwise revalidates it with a
+        conditional request and stores the result."""
+        assert self.cache is not None
+        if cached is not None and self.cache.is_fresh(cached, max_age):
+            return cached.content
+        headers = self.cache.revalidation_headers(cached) if cached is not None else {}
+        response = self.get(url, headers=headers)
+        if cached is not None and response.status_code == 304:
+            # NOTE: Unchanged, so the cached copy is fresh again
+            store(cached.content, cached.etag, cached.last_modified)
+            return cached.content
+        response.raise_for_status()
+        store(response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.content
+
+    def get_forms_by_cik(self, cik: Union[str, int]) -> dict:
+        """Gets retrieves dict of recent SEC form filings for a given cik number."""
+        content = self.get_submissions(cik)
+        recent_forms = content["filings"]["recent"]
+        form_types = {k: v for k, v in zip(recent_forms["accessionNumber"], recent_forms["form"])}
+        return form_types
+
+    def get_recent_acc_num(self, cik: Union[str, int], form_types: List[str]) -> Tuple[str, str]:
+        """Returns accession number and form type for the most recent filing for one of the
+        given form_types (AKA filing types) for a given cik."""
+        filing = self._latest_filing(cik, form_types)
+        return filing.accession_number, filing.form
+
+    def _latest_filing(self, cik: Union[str, int], form_types: List[str]) -> Filing:
+        filing = self.get_filing_index(cik, all_pages=False).latest(form_types)
+        if filing is None:
+            raise ValueError(f"No filings found for {cik}, looking for any of: {form_types}")
+        return filing
+
+    def get_latest_filing(
+        self, cik: Union[str, int], form_type: str, allow_amended_filing: Optional[bool] = True
+    ) -> Filing:
+        """Returns the most recent filing of the given form_type, or of its amended version if
+        allow_amended_filing, from the filing index of the recent filings."""
+        return self._latest_filing(cik, _form_types(form_type, allow_amended_filing))
+
+    def get_recent_acc_by_cik(self, cik: str, form_type: str) -> Tuple[str, str]:
+        """Returns (accession_number, retrieved_form_type) for the given cik and form_type.
+        The retrieved_form_type may be an amended version of requested form_type, e.g. 10-Q/A
+        for 10-Q."""
+        return self.get_recent_acc_num(cik, _form_types(form_type))
+
+    def get_recent_cik_and_acc_by_ticker(self, ticker: str, form_type: str) -> Tuple[str, str, str]:
+        """Returns (cik, accession_number, retrieved_form_type) for the given ticker and
+        form_type. The retrieved_form_type may be an amended version of requested form_type,
+        e.g. 10-Q/A for 10-Q."""
+        cik = self.get_cik_by_ticker(ticker)
+        acc_num, retrieved_form_type = self.get_recent_acc_num(cik, _form_types(form_type))
+        return cik, acc_num, retrieved_form_type
+
+    def get_form_by_ticker(
+        self,
+        ticker: str,
+        form_type: str,
+        allow_amended_filing: Optional[bool] = True,
+        primary_document_only: bool = False,
+    ) -> str:
+        """For a given ticker, gets the most recent form of a given form_type."""
+        cik = self.get_cik_by_ticker(ticker)
+        return self.get_form_by_cik(
+            cik,
+            form_type,
+            allow_amended_filing=allow_amended_filing,
+            primary_document_only=primary_document_only,
+        )
+
+    def get_form_by_cik(
+        self,
+        cik: str,
+        form_type: str,
+        allow_amended_filing: Optional[bool] = True,
+        primary_document_only: bool = False,
+    ) -> str:
+        """For a given CIK, returns the most recent form of a given form_type. By default
+        an amended version of the form_type may be retrieved (allow_amended_filing=True).
+        E.g., if form_type is "10-Q", the retrived form could be a 10-Q or 10-Q/A. With
+        primary_document_only, only the primary document is fetched, see get_primary_document.
+        """
+        filing = self.get_latest_filing(cik, form_type, allow_amended_filing)
+        if primary_document_only:
+            return self.get_primary_document(
+                cik, filing.accession_number, filing.form, filing.primary_document or None
+            )
+        return self.get_filing(cik, filing.accession_number)
+
+
+class TickerResolver:
+    """Resolves stock tickers to CIK numbers from SEC's company_tickers.json, which is
+    downloaded on first use and again once it is max_age seconds old. With a cache on the
+    client, the mapping is stored there, so other processes and later runs reuse it.
+
+    If the first download fails, it is not tried again for retry_after seconds, so that lookups
+    do not each wait for the client's retries while EDGAR is down."""
+
+    def __init__(
+        self,
+        client: EdgarClient,
+        max_age: float = DEFAULT_TICKERS_MAX_AGE,
+        retry_after: float = DEFAULT_TICKERS_RETRY_AFTER,
+    ):
+        self.client = client
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self._ciks: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def resolve(self, ticker: str) -> Optional[str]:
+        """Returns the 10 digit CIK number of the ticker, or None if it is not in the mapping or
+        the mapping could not be downloaded within the last retry_after seconds. Raises the
+        error if downloading the mapping fails."""
+        with self._lock:
+            if self._ciks is None:
+                if (
+                    self._failed_at is not None
+                    and time.monotonic() - self._failed_at < self.retry_after
+                ):
+                    return None
+                self._load()
+            elif time.monotonic() - self._loaded_at > self.max_age:
+                self._load()
+            assert self._ciks is not None
+            return self._ciks.get(_normalize_ticker(ticker))
+
+    def _load(self):
+        try:
+            company_tickers = self.client.get_company_tickers(self.max_age)
+        except (requests.RequestException, ValueError):
+            if self._ciks is None:
+                self._failed_at = time.monotonic()
+                raise
+            # NOTE: Tickers rarely change, so a stale mapping beats failing every lookup
+            logger.warning("Could not refresh the SEC ticker to CIK mapping", exc_info=True)
+            self._loaded_at = time.monotonic()
+            return
+        self._ciks = {
+            _normalize_ticker(company["ticker"]): str(company["cik_str"]).zfill(10)
+            for company in company_tickers.values()
+        }
+        self._loaded_at = time.monotonic()
+
+
+def _normalize_ticker(ticker: str) -> str:
+    # NOTE: SEC writes share classes with a dash, e.g. BRK-B
+    return ticker.strip().upper().replace(".", "-")
+
+
+_default_clients: Dict[Tuple[str, str], EdgarClient] = {}
+_default_clients_lock = threading.Lock()
+
+
+def get_default_client(company: Optional[str] = None, email: Optional[str] = None) -> EdgarClient:
+    """Returns the client the module level functions use for the given company and email, so
+    that their connections are reused across calls. The client caches responses in
+    SEC_API_CACHE_DIR if it is set."""
+    company, email = _identity(company, email)
+    with _default_clients_lock:
+        client = _default_clients.get((company, email))
+        if client is None:
+            client = _default_clients[(company, email)] = EdgarClient(
+                company, email, cache=cache_from_environment()
+            )
+        return client
+
+
+_SESSION_CLIENT_ATTRIBUTE: Final[str] = "_edgar_client"
+_session_clients_lock = threading.Lock()
+
+
+def _as_client(session: Union[requests.Session, EdgarClient]) -> EdgarClient:
+    """Returns the client for a session, created once per session so that its ticker mapping
+    is downloaded once rather than on every call."""
+    if isinstance(session, EdgarClient):
+        return session
+    with _session_clients_lock:
+        # NOTE: Kept on the session rather than in a WeakKeyDictionary, whose values would keep
+        # their sessions alive since each client refers to its session
+        client = vars(session).get(_SESSION_CLIENT_ATTRIBUTE)
+        if not isinstance(client, EdgarClient):
+            client = EdgarClient(session=session)
+            setattr(session, _SESSION_CLIENT_ATTRIBUTE, client)
+        return client
 
 
 def get_filing(
-    cik: Union[str, int], accession_number: Union[str, int], company: str, email: str
+    cik: Union[str, int],
+    accession_number: Union[str, int],
+    company: str,
+    email: str,
+    primary_document_only: bool = False,
 ) -> str:
     """Fetches the specified filing from the SEC EDGAR Archives. Conforms to the rate
-    limits specified on the SEC website.
+    limits specified on the SEC website. With primary_document_only, only the primary document
+    is fetched, see EdgarClient.get_primary_document.
     ref: https://www.sec.gov/os/accessing-edgar-data"""
-    session = _get_session(company, email)
-    return _get_filing(session, cik, accession_number)
+    client = get_default_client(company, email)
+    if primary_document_only:
+        return client.get_primary_document(cik, accession_number)
+    return client.get_filing(cik, accession_number)
 
 
-@sleep_and_retry
-@limits(calls=10, period=1)
 def _get_filing(
-    session: requests.Session, cik: Union[str, int], accession_number: Union[str, int]
+    session: Union[requests.Session, EdgarClient],
+    cik: Union[str, int],
+    accession_number: Union[str, int],
 ) -> str:
     """Wrapped so filings can be retrieved with an existing session."""
-    url = archive_url(cik, accession_number)
-    response = session.get(url)
-    response.raise_for_status()
-    return response.text
-
-
-@sleep_and_retry
-@limits(calls=10, period=1)
-def get_cik_by_ticker(session: requests.Session, ticker: str) -> str:
-    """Gets a CIK number from a stock ticker by running a search on the SEC website."""
-    cik_re = re.compile(r".*CIK=(\d{10}).*")
-    url = _search_url(ticker)
-    response = session.get(url, stream=True)
-    response.raise_for_status()
-    results = cik_re.findall(response.text)
-    return str(results[0])
-
-
-@sleep_and_retry
-@limits(calls=10, period=1)
-def get_forms_by_cik(session: requests.Session, cik: Union[str, int]) -> dict:
+    return _as_client(session).get_filing(cik, accession_number)
+
+
+def get_cik_by_ticker(session: Union[requests.Session, EdgarClient], ticker: str) -> str:
+    """Gets a CIK number from a stock ticker from SEC's ticker to CIK mapping, or by running a
+    search on the SEC website."""
+    return _as_client(session).get_cik_by_ticker(ticker)
+
+
+def get_filing_index(
+    cik: Union[str, int], company: Optional[str] = None, email: Optional[str] = None
+) -> FilingIndex:
+    """Returns the index of every filing of a given cik number, see filing_index."""
+    return get_default_client(company, email).get_filing_index(cik)
+
+
+def get_ciks_by_tickers(
+    tickers: Iterable[str], company: Optional[str] = None, email: Optional[str] = None
+) -> Dict[str, Optional[str]]:
+    """Returns the CIK number of each ticker, or None for tickers that SEC does not know."""
+    return get_default_client(company, email).get_ciks_by_tickers(tickers)
+
+
+def get_forms_by_cik(session: Union[requests.Session, EdgarClient], cik: Union[str, int]) -> dict:
     """Gets retrieves dict of recent SEC form filings for a given cik number."""
-    json_name = f"CIK{cik}.json"
-    response = session.get(f"{SEC_SUBMISSIONS_URL}/{json_name}")
-    response.raise_for_status()
-    content = json.loads(response.content)
-    recent_forms = content["filings"]["recent"]
-    form_types = {k: v for k, v in zip(recent_forms["accessionNumber"], recent_forms["form"])}
-    return form_types
+    return _as_client(session).get_forms_by_cik(cik)
 
 
 def _get_recent_acc_num_by_cik(
-    session: requests.Session, cik: Union[str, int], form_types: List[str]
+    session: Union[requests.Session, EdgarClient], cik: Union[str, int], form_types: List[str]
 ) -> Tuple[str, str]:
     """Returns accession number and form type for the most recent filing for one of the
     given form_types (AKA filing types) for a given cik."""
-    retrieved_form_types = get_forms_by_cik(session, cik)
-    for acc_num, form_type_ in retrieved_form_types.items():
-        if form_type_ in form_types:
-            return _drop_dashes(acc_num), form_type_
-    raise ValueError(f"No filings found for {cik}, looking for any of: {form_types}")
+    return _as_client(session).get_recent_acc_num(cik, form_types)
 
 
 def get_recent_acc_by_cik(
@@ -90,8 +528,7 @@ def get_recent_acc_by_cik(
     """Returns (accession_number, retrieved_form_type) for the given cik and form_type.
     The retrieved_form_type may be an amended version of requested form_type, e.g. 10-Q/A for 10-Q.
     """
-    session = _get_session(company, email)
-    return _get_recent_acc_num_by_cik(session, cik, _form_types(form_type))
+    return get_default_client(company, email).get_recent_acc_by_cik(cik, form_type)
 
 
 def get_recent_cik_and_acc_by_ticker(
@@ -103,10 +540,7 @@ def get_recent_cik_and_acc_by_ticker(
     """Returns (cik, accession_number, retrieved_form_type) for the given ticker and form_type.
     The retrieved_form_type may be an amended version of requested form_type, e.g. 10-Q/A for 10-Q.
     """
-    session = _get_session(company, email)
-    cik = get_cik_by_ticker(session, ticker)
-    acc_num, retrieved_form_type = _get_recent_acc_num_by_cik(session, cik, _form_types(form_type))
-    return cik, acc_num, retrieved_form_type
+    return get_default_client(company, email).get_recent_cik_and_acc_by_ticker(ticker, form_type)
 
 
 def get_form_by_ticker(
@@ -115,12 +549,14 @@ def get_form_by_ticker(
     allow_amended_filing: Optional[bool] = True,
     company: Optional[str] = None,
     email: Optional[str] = None,
+    primary_document_only: bool = False,
 ) -> str:
     """For a given ticker, gets the most recent form of a given form_type."""
-    session = _get_session(company, email)
-    cik = get_cik_by_ticker(session, ticker)
-    return get_form_by_cik(
-        cik, form_type, allow_amended_filing=allow_amended_filing, company=company, email=email
+    return get_default_client(company, email).get_form_by_ticker(
+        ticker,
+        form_type,
+        allow_amended_filing=allow_amended_filing,
+        primary_document_only=primary_document_only,
     )
 
 
@@ -141,24 +577,24 @@ def get_form_by_cik(
     allow_amended_filing: Optional[bool] = True,
     company: Optional[str] = None,
     email: Optional[str] = None,
+    primary_document_only: bool = False,
 ) -> str:
     """For a given CIK, returns the most recent form of a given form_type. By default
     an amended version of the form_type may be retrieved (allow_amended_filing=True).
     E.g., if form_type is "10-Q", the retrived form could be a 10-Q or 10-Q/A.
     """
-    session = _get_session(company, email)
-    acc_num, _ = _get_recent_acc_num_by_cik(
-        session, cik, _form_types(form_type, allow_amended_filing)
+    return get_default_client(company, email).get_form_by_cik(
+        cik,
+        form_type,
+        allow_amended_filing=allow_amended_filing,
+        primary_document_only=primary_document_only,
     )
-    text = _get_filing(session, cik, acc_num)
-    return text
 
 
 def open_form(cik, acc_num):
     """For a given cik and accession number, opens the index page in default browser for the
     associated SEC form"""
-    acc_num = _drop_dashes(acc_num)
-    webbrowser.open_new_tab(f"{SEC_ARCHIVE_URL}/{cik}/{acc_num}/{_add_dashes(acc_num)}-index.html")
+    webbrowser.open_new_tab(filing_index_url(cik, acc_num))
 
 
 def open_form_by_ticker(
@@ -170,22 +606,66 @@ def open_form_by_ticker(
 ):
     """For a given ticker, opens the index page in default browser for the most recent form of a
     given form_type."""
-    session = _get_session(company, email)
-    cik = get_cik_by_ticker(session, ticker)
-    acc_num, _ = _get_recent_acc_num_by_cik(
-        session, cik, _form_types(form_type, allow_amended_filing)
-    )
+    client = get_default_client(company, email)
+    cik = client.get_cik_by_ticker(ticker)
+    acc_num, _ = client.get_recent_acc_num(cik, _form_types(form_type, allow_amended_filing))
     open_form(cik, acc_num)
 
 
 def archive_url(cik: Union[str, int], accession_number: Union[str, int]) -> str:
     """Builds the archive URL for the SEC accession number. Looks for the .txt file for the
     filing, while follows a {accession_number}.txt format."""
-    filename = f"{_add_dashes(accession_number)}.txt"
     accession_number = _drop_dashes(accession_number)
+    filename = f"{_add_dashes(accession_number)}.txt"
     return f"{SEC_ARCHIVE_URL}/{cik}/{accession_number}/{filename}"
 
 
+def filing_index_url(cik: Union[str, int], accession_number: Union[str, int]) -> str:
+    """Builds the URL of the filing index page, which lists the documents of the filing."""
+    accession_number = _drop_dashes(accession_number)
+    return f"{SEC_ARCHIVE_URL}/{cik}/{accession_number}/{_add_dashes(accession_number)}-index.html"
+
+
+def document_url(cik: Union[str, int], accession_number: Union[str, int], document: str) -> str:
+    """Builds the archive URL for one document of the filing, e.g. its primary document."""
+    return f"{SEC_ARCHIVE_URL}/{cik}/{_drop_dashes(accession_number)}/{document}"
+
+
+def _parse_primary_document(
+    index_html: str, form_type: Optional[str] = None
+) -> Optional[Tuple[str, str]]:
+    """Returns the file name and type of the primary document listed on a filing index page,
+    i.e. the first document of form_type, or the first document if form_type is None."""
+    try:
+        tree = lxml_html.fromstring(index_html)
+    except (etree.ParserError, ValueError):
+        return None
+    documents = []
+    for row in tree.xpath('//table[@summary="Document Format Files"]//tr[td]'):
+        cells = row.xpath("./td")
+        # NOTE: Columns are Seq, Description, Document, Type and Size, and the document cell
+        # may include an iXBRL marker after the file name
+        if len(cells) < 4 or not cells[2].text_content().split():
+            continue
+        documents.append((cells[2].text_content().split()[0], cells[3].text_content().strip()))
+    if form_type is not None:
+        for name, type_ in documents:
+            if type_ == form_type:
+                return name, type_
+        return None
+    # NOTE: EDGAR lists the primary document first, as sequence 1
+    if documents and documents[0][1]:
+        return documents[0]
+    return None
+
+
+def _wrap_primary_document(text: str, form_type: str, filename: str) -> str:
+    return (
+        f"<SEC-DOCUMENT>\n<DOCUMENT>\n<TYPE>{form_type}\n<SEQUENCE>1\n<FILENAME>{filename}\n"
+        f"<TEXT>\n{text}\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n"
+    )
+
+
 def _search_url(cik: Union[str, int]) -> str:
     search_string = f"CIK={cik}&Find=Search&owner=exclude&action=getcompany"
     url = f"{SEC_SEARCH_URL}?{search_string}"
@@ -204,16 +684,43 @@ def _drop_dashes(accession_number: Union[str, int]) -> str:
     return accession_number.zfill(18)
 
 
-def _get_session(company: Optional[str] = None, email: Optional[str] = None) -> requests.Session:
-    """Creates a requests sessions with the appropriate headers set. If these headers are not
-    set, SEC will reject your request.
-    ref: https://www.sec.gov/os/accessing-edgar-data"""
+def _backoff(backoff_factor: float, attempt: int) -> float:
+    return min(backoff_factor * 2**attempt, MAX_BACKOFF)
+
+
+def _retry_after(response) -> Optional[float]:
+    """Returns the seconds to wait from the Retry-After header of a requests or httpx response,
+    which is either a number of seconds or an HTTP date, or None if there is no valid header."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _identity(company: Optional[str] = None, email: Optional[str] = None) -> Tuple[str, str]:
+    """Returns the company and email that identify the caller to SEC, defaulting to the
+    SEC_API_ORGANIZATION and SEC_API_EMAIL environment variables."""
     if company is None:
         company = os.environ.get("SEC_API_ORGANIZATION")
     if email is None:
         email = os.environ.get("SEC_API_EMAIL")
     assert company
     assert email
+    return company, email
+
+
+def _get_session(company: Optional[str] = None, email: Optional[str] = None) -> requests.Session:
+    """Creates a requests sessions with the appropriate headers set. If these headers are not
+    set, SEC will reject your request.
+    ref: https://www.sec.gov/os/accessing-edgar-data"""
+    company, email = _identity(company, email)
     session = requests.Session()
     session.headers.update(
         {
@@ -0,0 +1,161 @@
+"""Module for indexing every filing of a company. The submissions JSON of a company only lists
+its ~1,000 most recent filings under filings.recent, and older filings on additional pages
+listed under filings.files. FilingIndex merges all of them into compact columnar arrays, sorted
+from the most recent filing to the oldest, that can be queried by form type and filing date:
+
+    index = get_filing_index(cik, your_organization_name, your_email)
+    for filing in index.query(["10-K", "10-K/A"], start="2001-01-01"):
+        print(filing.accession_number, filing.filing_date)
+"""
+import datetime
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+DateLike = Union[str, datetime.date, np.datetime64]
+
+
+class Filing(NamedTuple):
+    accession_number: str
+    form: str
+    filing_date: datetime.date
+    primary_document: str
+
+
+class FilingIndex:
+    """Every filing of a company, in columns: accession numbers (without dashes), filing dates
+    and primary documents, plus forms stored as codes into form_names, which keeps the index
+    small and makes queries by form type a comparison of integers."""
+
+    def __init__(
+        self,
+        cik: str,
+        accession_numbers: np.ndarray,
+        form_codes: np.ndarray,
+        form_names: np.ndarray,
+        filing_dates: np.ndarray,
+        primary_documents: np.ndarray,
+    ):
+        self.cik = cik
+        self.accession_numbers = accession_numbers
+        self.form_codes = form_codes
+        self.form_names = form_names
+        self.filing_dates = filing_dates
+        self.primary_documents = primary_documents
+
+    @classmethod
+    def from_pages(cls, cik: str, pages: Iterable[dict]) -> "FilingIndex":
+        """Builds the index from the columnar pages of the submissions JSON, i.e.
+        filings.recent and the pages listed in filings.files. Filings listed on more than one
+        page are only indexed once."""
+        accession_numbers: List[str] = []
+        forms: List[str] = []
+        filing_dates: List[str] = []
+        primary_documents: List[str] = []
+        for page in pages:
+            n_filings = len(page["accessionNumber"])
+            accession_numbers.extend(page["accessionNumber"])
+            forms.extend(page["form"])
+            filing_dates.extend(page["filingDate"])
+            primary_documents.extend(page.get("primaryDocument") or [""] * n_filings)
+
+        accession_array = np.array(
+            [accession_number.replace("-", "") for accession_number in accession_numbers],
+            dtype="U18",
+        )
+        _, first = np.unique(accession_array, return_index=True)
+        date_array = np.array(filing_dates, dtype="datetime64[D]")
+        # NOTE: Most recent first, keeping the order of the pages for filings on the same day
+        first = np.sort(first)
+        order = first[np.argsort(-date_array[first].astype(np.int64), kind="stable")]
+
+        form_names, form_codes = np.unique(np.array(forms, dtype=str), return_inverse=True)
+        return cls(
+            cik,
+            accession_array[order],
+            form_codes[order].astype(np.uint16),
+            form_names,
+            date_array[order],
+            np.array(primary_documents, dtype=str)[order],
+        )
+
+    def __len__(self) -> int:
+        return len(self.accession_numbers)
+
+    def __getitem__(self, i: int) -> Filing:
+        return Filing(
+            str(self.accession_numbers[i]),
+            str(self.form_names[self.form_codes[i]]),
+            self.filing_dates[i].item(),
+            str(self.primary_documents[i]),
+        )
+
+    def __iter__(self) -> Iterator[Filing]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def query(
+        self,
+        form_types: Optional[Iterable[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+    ) -> "FilingIndex":
+        """Returns the filings of the given form types filed between start and end, both
+        inclusive, most recent first."""
+        # NOTE: Dates are sorted in descending order, so the range is one contiguous slice
+        descending = -self.filing_dates.astype(np.int64)
+        first = 0
+        last = len(self)
+        if end is not None:
+            first = int(np.searchsorted(descending, -_day(end), side="left"))
+        if start is not None:
+            last = int(np.searchsorted(descending, -_day(start), side="right"))
+        selected = np.arange(first, max(first, last))
+        if form_types is not None:
+            codes = np.flatnonzero(np.isin(self.form_names, list(form_types)))
+            selected = selected[np.isin(self.form_codes[selected], codes)]
+        return self._take(selected)
+
+    def latest(self, form_types: Iterable[str]) -> Optional[Filing]:
+        """Returns the most recent filing of one of the given form types, if any."""
+        filings = self.query(form_types)
+        return filings[0] if len(filings) else None
+
+    def _take(self, selected: np.ndarray) -> "FilingIndex":
+        return FilingIndex(
+            self.cik,
+            self.accession_numbers[selected],
+            self.form_codes[selected],
+            self.form_names,
+            self.filing_dates[selected],
+            self.primary_documents[selected],
+        )
+
+    def save(self, path: str):
+        """Saves the index as a .npz file."""
+        np.savez_compressed(
+            path,
+            cik=np.array(self.cik),
+            accession_numbers=self.accession_numbers,
+            form_codes=self.form_codes,
+            form_names=self.form_names,
+            filing_dates=self.filing_dates,
+            primary_documents=self.primary_documents,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FilingIndex":
+        with np.load(path) as arrays:
+            return cls(
+                str(arrays["cik"]),
+                arrays["accession_numbers"],
+                arrays["form_codes"],
+                arrays["form_names"],
+                arrays["filing_dates"],
+                arrays["primary_documents"],
+            )
+
+
+def _day(date: DateLike) -> int:
+    """Returns the date as days since the epoch."""
+    return int(np.datetime64(date, "D").astype(np.int64))
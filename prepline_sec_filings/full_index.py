@@ -0,0 +1,318 @@
+"""Module for discovering filings in bulk from the EDGAR full and daily indexes. EDGAR publishes
+one index of every filing per quarter (full-index) and per business day (daily-index), so the
+filings of a period can be listed with a few requests instead of one request per company:
+
+    client = EdgarClient(your_organization_name, your_email)
+    index = get_index(client, "2023-01-01", "2023-06-30")
+    for entry in index.query(["10-K"]):
+        print(entry.cik, entry.accession_number, entry.filing_date)
+
+Only filings of the given form types, VALID_FILING_TYPES by default, are kept, in compact
+columnar arrays sorted from the most recent filing to the oldest like filing_index.FilingIndex.
+Both the pipe-delimited master.idx files and the fixed-width form.idx files can be parsed."""
+import datetime
+import os
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+import numpy as np
+
+from prepline_sec_filings.fetch import EdgarClient
+from prepline_sec_filings.filing_index import DateLike, _day
+from prepline_sec_filings.sections import VALID_FILING_TYPES
+
+FULL_INDEX_URL: Final[str] = "https://www.sec.gov/Archives/edgar/full-index"
+DAILY_INDEX_URL: Final[str] = "https://www.sec.gov/Archives/edgar/daily-index"
+MASTER: Final[str] = "master"
+FORM: Final[str] = "form"
+
+Row = Tuple[str, str, str, str]
+
+
+class IndexEntry(NamedTuple):
+    cik: str
+    form: str
+    filing_date: datetime.date
+    accession_number: str
+
+
+class FullIndex:
+    """Filings of many companies, in columns: CIK numbers, accession numbers (without dashes)
+    and filing dates, plus forms stored as codes into form_names. A filing by several
+    registrants has one entry per CIK."""
+
+    def __init__(
+        self,
+        ciks: np.ndarray,
+        accession_numbers: np.ndarray,
+        form_codes: np.ndarray,
+        form_names: np.ndarray,
+        filing_dates: np.ndarray,
+    ):
+        self.ciks = ciks
+        self.accession_numbers = accession_numbers
+        self.form_codes = form_codes
+        self.form_names = form_names
+        self.filing_dates = filing_dates
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Row],
+        form_types: Optional[Iterable[str]] = VALID_FILING_TYPES,
+    ) -> "FullIndex":
+        """Builds the index from (cik, form type, date filed, accession number) rows, keeping
+        the rows of the given form types, or every row if form_types is None. Repeated rows,
+        e.g. from overlapping daily and quarterly indexes, are only indexed once."""
+        wanted = None if form_types is None else set(form_types)
+        ciks: List[int] = []
+        forms: List[str] = []
+        filing_dates: List[str] = []
+        accession_numbers: List[str] = []
+        for cik, form, filing_date, accession_number in rows:
+            if wanted is not None and form not in wanted:
+                continue
+            ciks.append(int(cik))
+            forms.append(form)
+            filing_dates.append(filing_date)
+            accession_numbers.append(accession_number.replace("-", ""))
+        return cls._from_columns(
+            np.array(ciks, dtype=np.int64),
+            np.array(accession_numbers, dtype="U18"),
+            np.array(forms, dtype=str),
+            np.array(filing_dates, dtype="datetime64[D]"),
+        )
+
+    @classmethod
+    def concat(cls, indexes: Iterable["FullIndex"]) -> "FullIndex":
+        indexes = list(indexes)
+        if not indexes:
+            return cls.from_rows([])
+        return cls._from_columns(
+            np.concatenate([index.ciks for index in indexes]),
+            np.concatenate([index.accession_numbers for index in indexes]),
+            np.concatenate([index.form_names[index.form_codes] for index in indexes]),
+            np.concatenate([index.filing_dates for index in indexes]),
+        )
+
+    @classmethod
+    def _from_columns(
+        cls,
+        ciks: np.ndarray,
+        accession_numbers: np.ndarray,
+        forms: np.ndarray,
+        filing_dates: np.ndarray,
+    ) -> "FullIndex":
+        keys = np.char.add(np.char.add(accession_numbers, "|"), ciks.astype(str))
+        _, first = np.unique(keys, return_index=True)
+        # NOTE: Most recent first, keeping the order of the rows for filings on the same day
+        first = np.sort(first)
+        order = first[np.argsort(-filing_dates[first].astype(np.int64), kind="stable")]
+        form_names, form_codes = np.unique(forms.astype(str), return_inverse=True)
+        return cls(
+            ciks[order],
+            accession_numbers[order],
+            form_codes.reshape(-1)[order].astype(np.uint16),
+            form_names,
+            filing_dates[order],
+        )
+
+    def __len__(self) -> int:
+        return len(self.accession_numbers)
+
+    def __getitem__(self, i: int) -> IndexEntry:
+        return IndexEntry(
+            str(self.ciks[i]),
+            str(self.form_names[self.form_codes[i]]),
+            self.filing_dates[i].item(),
+            str(self.accession_numbers[i]),
+        )
+
+    def __iter__(self) -> Iterator[IndexEntry]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def query(
+        self,
+        form_types: Optional[Iterable[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        ciks: Optional[Iterable[Union[str, int]]] = None,
+    ) -> "FullIndex":
+        """Returns the filings of the given form types and companies filed between start and
+        end, both inclusive, most recent first."""
+        descending = -self.filing_dates.astype(np.int64)
+        first = 0
+        last = len(self)
+        if end is not None:
+            first = int(np.searchsorted(descending, -_day(end), side="left"))
+        if start is not None:
+            last = int(np.searchsorted(descending, -_day(start), side="right"))
+        selected = np.arange(first, max(first, last))
+        if form_types is not None:
+            codes = np.flatnonzero(np.isin(self.form_names, list(form_types)))
+            selected = selected[np.isin(self.form_codes[selected], codes)]
+        if ciks is not None:
+            wanted = np.array([int(cik) for cik in ciks], dtype=np.int64)
+            selected = selected[np.isin(self.ciks[selected], wanted)]
+        return FullIndex(
+            self.ciks[selected],
+            self.accession_numbers[selected],
+            self.form_codes[selected],
+            self.form_names,
+            self.filing_dates[selected],
+        )
+
+    def save(self, path: str):
+        """Saves the index as a .npz file."""
+        np.savez_compressed(
+            path,
+            ciks=self.ciks,
+            accession_numbers=self.accession_numbers,
+            form_codes=self.form_codes,
+            form_names=self.form_names,
+            filing_dates=self.filing_dates,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FullIndex":
+        with np.load(path) as arrays:
+            return cls(
+                arrays["ciks"],
+                arrays["accession_numbers"],
+                arrays["form_codes"],
+                arrays["form_names"],
+                arrays["filing_dates"],
+            )
+
+
+def parse_master_index(text: str) -> Iterator[Row]:
+    """Parses a master.idx file, where each row is CIK|Company Name|Form Type|Date Filed|File
+    Name, into (cik, form type, date filed, accession number) rows."""
+    for line in _rows(text):
+        fields = line.split("|")
+        if len(fields) != 5:
+            continue
+        cik, _, form, filing_date, filename = fields
+        yield cik, form, _iso_date(filing_date), _accession_number(filename)
+
+
+def parse_form_index(text: str) -> Iterator[Row]:
+    """Parses a form.idx file, which has fixed-width Form Type, Company Name, CIK, Date Filed
+    and File Name columns, into (cik, form type, date filed, accession number) rows."""
+    form_width = None
+    for line in text.splitlines():
+        if form_width is None:
+            if line.startswith("Form Type"):
+                form_width = line.index("Company Name")
+            continue
+        # NOTE: Form types can contain spaces (e.g. SC 13G) but company names can too, so the
+        # form type is read from its column and the other fields from the right
+        fields = line[form_width:].rsplit(None, 3)
+        if len(fields) != 4 or not fields[1].isdigit():
+            continue
+        _, cik, filing_date, filename = fields
+        yield cik, line[:form_width].strip(), _iso_date(filing_date), _accession_number(filename)
+
+
+def get_full_index(
+    client: EdgarClient,
+    year: int,
+    quarter: int,
+    form_types: Optional[Iterable[str]] = VALID_FILING_TYPES,
+) -> FullIndex:
+    """Gets the index of the filings of the given form types filed in the given quarter."""
+    text = _get_index_file(client, full_index_url(year, quarter))
+    return FullIndex.from_rows(parse_master_index(text or ""), form_types)
+
+
+def get_daily_index(
+    client: EdgarClient,
+    date: DateLike,
+    form_types: Optional[Iterable[str]] = VALID_FILING_TYPES,
+) -> FullIndex:
+    """Gets the index of the filings of the given form types filed on the given day, which is
+    empty on days without a daily index, e.g. weekends and holidays."""
+    text = _get_index_file(client, daily_index_url(date))
+    return FullIndex.from_rows(parse_master_index(text or ""), form_types)
+
+
+def get_index(
+    client: EdgarClient,
+    start: DateLike,
+    end: Optional[DateLike] = None,
+    form_types: Optional[Iterable[str]] = VALID_FILING_TYPES,
+    daily: bool = False,
+) -> FullIndex:
+    """Gets the index of the filings of the given form types filed between start and end
+    (today by default), both inclusive, with one request per quarter. With daily=True, uses one
+    request per day instead, which is less to download when polling for recent filings."""
+    first = np.datetime64(start, "D").item()
+    last = np.datetime64(end, "D").item() if end is not None else datetime.date.today()
+    if daily:
+        days = (first + datetime.timedelta(days=i) for i in range((last - first).days + 1))
+        indexes = [get_daily_index(client, day, form_types) for day in days if day.weekday() < 5]
+    else:
+        indexes = [
+            get_full_index(client, year, quarter, form_types)
+            for year, quarter in _quarters(first, last)
+        ]
+    return FullIndex.concat(indexes).query(start=first, end=last)
+
+
+def full_index_url(year: int, quarter: int, name: str = MASTER) -> str:
+    return f"{FULL_INDEX_URL}/{year}/QTR{quarter}/{name}.idx"
+
+
+def daily_index_url(date: DateLike, name: str = MASTER) -> str:
+    day = np.datetime64(date, "D").item()
+    return f"{DAILY_INDEX_URL}/{day.year}/QTR{_quarter(day)}/{name}.{day:%Y%m%d}.idx"
+
+
+def _get_index_file(client: EdgarClient, url: str) -> Optional[str]:
+    """Returns the text of an index file, or None if there is no such file."""
+    response = client.get(url)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    # NOTE: Company names are not always valid UTF-8
+    return response.content.decode("latin-1")
+
+
+def _rows(text: str) -> Iterator[str]:
+    """Yields the lines after the dashed line that ends the header of an index file."""
+    lines = iter(text.splitlines())
+    for line in lines:
+        if line.startswith("---"):
+            break
+    yield from lines
+
+
+def _iso_date(filing_date: str) -> str:
+    """Daily indexes write dates as YYYYMMDD, full indexes as YYYY-MM-DD."""
+    if len(filing_date) == 8 and filing_date.isdigit():
+        return f"{filing_date[:4]}-{filing_date[4:6]}-{filing_date[6:]}"
+    return filing_date
+
+
+def _accession_number(filename: str) -> str:
+    """Returns the accession number from a path like edgar/data/1000045/0000950170-23-002211.txt"""
+    return os.path.splitext(os.path.basename(filename.strip()))[0]
+
+
+def _quarter(day: datetime.date) -> int:
+    return (day.month - 1) // 3 + 1
+
+
+def _quarters(first: datetime.date, last: datetime.date) -> List[Tuple[int, int]]:
+    quarters = []
+    year, quarter = first.year, _quarter(first)
+    while (year, quarter) <= (last.year, _quarter(last)):
+        quarters.append((year, quarter))
+        year, quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+    return quarters
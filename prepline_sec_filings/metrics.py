@@ -0,0 +1,190 @@
+"""Module for exposing Prometheus metrics for the section API. When the API runs with several
+worker processes, set PROMETHEUS_MULTIPROC_DIR to a directory shared by the workers (and empty
+at startup) so that /metrics reports values aggregated across all of them.
+ref: https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn"""
+import os
+import time
+from typing import Optional
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+import anyio.to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from prepline_sec_filings.timing import (
+    NULL_TIMER,
+    TIMING_ENABLED,
+    StageTimer,
+    get_timer,
+    use_timer,
+)
+
+LATENCY_BUCKETS: Final[tuple] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, float("inf"))
+SIZE_BUCKETS: Final[tuple] = tuple(2**power for power in range(14, 30, 2)) + (float("inf"),)
+
+# NOTE: Maps timer counts recorded by SECDocument.get_section_narrative to extraction paths
+EXTRACTION_PATH_COUNTS: Final[dict] = {
+    "sections_toc": "toc",
+    "sections_no_toc": "no_toc",
+    "sections_up_to_next_title": "up_to_next_title",
+    "sections_not_found": "not_found",
+}
+
+REQUEST_LATENCY = Histogram(
+    "sec_filings_request_duration_seconds",
+    "Time to process a section request.",
+    ["filing_type", "section_count"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SIZE = Histogram(
+    "sec_filings_request_size_bytes",
+    "Size of the uploaded request body.",
+    ["filing_type"],
+    buckets=SIZE_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "sec_filings_requests_in_flight",
+    "Section requests currently being processed.",
+    multiprocess_mode="livesum",
+)
+REQUESTS_QUEUED = Gauge(
+    "sec_filings_requests_queued",
+    "Requests waiting for a free worker thread.",
+    multiprocess_mode="livesum",
+)
+REQUEST_ERRORS = Counter(
+    "sec_filings_request_errors_total",
+    "Section requests that failed, by exception type or HTTP status.",
+    ["error"],
+)
+EXTRACTION_PATHS = Counter(
+    "sec_filings_extraction_path_total",
+    "Sections extracted, by the strategy that resolved them.",
+    ["path"],
+)
+
+
+def section_count_bucket(section_count: Optional[str]) -> str:
+    """Buckets the number of requested sections to keep the label cardinality bounded."""
+    if not section_count:
+        return "unknown"
+    count = int(section_count)
+    if count <= 1:
+        return str(count)
+    elif count <= 5:
+        return "2-5"
+    elif count <= 10:
+        return "6-10"
+    return "11+"
+
+
+def get_registry() -> CollectorRegistry:
+    """Returns the registry to expose. In multiprocess mode this collects the values written
+    by every worker to PROMETHEUS_MULTIPROC_DIR."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Serves metrics in the Prometheus text exposition format."""
+    return Response(generate_latest(get_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int):
+    """Cleans up the live gauges of a worker process that exited. Call from the process
+    manager; a no-op outside of multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def _threads_waiting() -> int:
+    return anyio.to_thread.current_default_thread_limiter().statistics().tasks_waiting
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records request metrics for the section API (POST requests). The
+    filing type, section count and extraction paths come from the request's StageTimer, so a
+    timer is installed here if ServerTimingMiddleware has not already done so. With timing
+    disabled, requests keep the no-op timer and are recorded without those labels."""
+
+    def __init__(self, app: ASGIApp, timing_enabled: bool = TIMING_ENABLED):
+        self.app = app
+        self.timing_enabled = timing_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        timer = get_timer()
+        if timer is NULL_TIMER and self.timing_enabled:
+            with use_timer() as timer:
+                await self._call_with_metrics(scope, receive, send, timer)
+        else:
+            await self._call_with_metrics(scope, receive, send, timer)
+
+    async def _call_with_metrics(self, scope: Scope, receive: Receive, send: Send, timer):
+        # NOTE: Timed here rather than with the timer, which may be the no-op one
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                REQUESTS_QUEUED.set(_threads_waiting())
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        REQUESTS_QUEUED.set(_threads_waiting())
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            REQUEST_ERRORS.labels(error=type(e).__name__).inc()
+            raise
+        else:
+            if status_code >= 400:
+                REQUEST_ERRORS.labels(error=str(status_code)).inc()
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _observe(scope, timer, time.perf_counter() - started)
+
+
+def _observe(scope: Scope, timer: StageTimer, elapsed: float):
+    filing_type = timer.tags.get("filing_type", "unknown")
+    REQUEST_LATENCY.labels(
+        filing_type=filing_type,
+        section_count=section_count_bucket(timer.tags.get("section_count")),
+    ).observe(elapsed)
+
+    try:
+        size = int(Headers(scope=scope)["content-length"])
+    except (KeyError, ValueError):
+        # NOTE: Missing (e.g. chunked uploads) or malformed, which is not worth failing over
+        pass
+    else:
+        REQUEST_SIZE.labels(filing_type=filing_type).observe(size)
+
+    for count_name, path in EXTRACTION_PATH_COUNTS.items():
+        if count_name in timer.counts:
+            EXTRACTION_PATHS.labels(path=path).inc(timer.counts[count_name])
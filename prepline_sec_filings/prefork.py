@@ -0,0 +1,185 @@
+"""Pre-fork launcher for the section API. Unlike `uvicorn --workers`, where every worker
+imports the app and loads the NLTK models itself, the launcher imports and warms up the app
+once in the parent process and then forks the workers. The imported modules, loaded models and
+compiled patterns are shared copy-on-write between the workers, which cuts startup time and
+the resident memory of each worker. Workers are recycled gracefully after a maximum number of
+requests to bound memory drift, and replaced if they exit. Run with:
+
+    python -m prepline_sec_filings.prefork --workers 4 --max-requests 1000
+
+Linux and macOS only, since it relies on os.fork."""
+import argparse
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from prepline_sec_filings import warmup
+from prepline_sec_filings.metrics import mark_process_dead
+
+logger = logging.getLogger("prepline_sec_filings")
+
+DEFAULT_APP: Final[str] = "prepline_sec_filings.server:app"
+SHUTDOWN_TIMEOUT: Final[float] = 30
+
+
+class PreforkLauncher:
+    """Forks workers that serve the app from a socket bound by the parent and keeps
+    workers_count of them running until the parent receives SIGINT or SIGTERM.
+
+    Each worker exits gracefully (finishing in-flight requests) after max_requests plus a random
+    jitter of up to max_requests_jitter requests, so that workers do not recycle in lockstep,
+    and is replaced by a fresh fork of the parent."""
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers_count: int,
+        max_requests: Optional[int] = None,
+        max_requests_jitter: int = 0,
+    ):
+        self.config = config
+        self.workers_count = workers_count
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.workers: Dict[int, float] = {}
+        self.should_exit = False
+        self.sockets: List[socket.socket] = []
+
+    def run(self):
+        self.sockets = [self.config.bind_socket()]
+        # NOTE: Moves everything allocated so far out of the garbage collector's reach, so that
+        # collections in the workers do not write to (and copy) the pages shared with the parent
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        logger.info("Pre-fork launcher [%d] starting %d workers", os.getpid(), self.workers_count)
+        while not self.should_exit:
+            while len(self.workers) < self.workers_count and not self.should_exit:
+                self.spawn_worker()
+            self.reap_workers()
+            time.sleep(0.1)
+        self.stop_workers()
+
+    def spawn_worker(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            # NOTE: In the worker, os._exit skips the parent's cleanup handlers
+            exit_code = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                logger.exception("Worker crashed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def _run_worker(self):
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if self.max_requests:
+            self.config.limit_max_requests = self.max_requests + random.randint(
+                0, self.max_requests_jitter
+            )
+        uvicorn.Server(self.config).run(sockets=self.sockets)
+
+    def reap_workers(self):
+        """Collects exited workers, so that run() replaces them."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            mark_process_dead(pid)
+            if started is not None and not self.should_exit:
+                logger.info(
+                    "Worker [%d] exited with status %d after %.0fs, replacing it",
+                    pid,
+                    _exit_code(status),
+                    time.monotonic() - started,
+                )
+
+    def stop_workers(self, timeout: float = SHUTDOWN_TIMEOUT):
+        for pid in self.workers:
+            _signal_worker(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        for pid in self.workers:
+            _signal_worker(pid, signal.SIGKILL)
+        for sock in self.sockets:
+            sock.close()
+
+    def _handle_exit(self, signum, frame):
+        self.should_exit = True
+
+
+def _exit_code(status: int) -> int:
+    # NOTE: Same as os.waitstatus_to_exitcode, which was added in Python 3.9
+    return os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+
+def _signal_worker(pid: int, signum: int):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serves the section API from forked workers.")
+    parser.add_argument("--app", default=DEFAULT_APP, help=f"Defaults to {DEFAULT_APP}.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        help="Recycle a worker after this many requests. Unlimited by default.",
+    )
+    parser.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=0,
+        help="Add up to this many requests to each worker's --max-requests.",
+    )
+    parser.add_argument("--log-config", help="Logging config file, e.g. logger_config.yaml.")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        raise SystemExit("The pre-fork launcher requires os.fork, use uvicorn --workers instead")
+
+    config_kwargs = {"log_config": args.log_config} if args.log_config else {}
+    config = uvicorn.Config(
+        import_from_string(args.app), host=args.host, port=args.port, **config_kwargs
+    )
+    if warmup.WARMUP_ENABLED:
+        warmup.warm_up()
+        if not warmup.is_ready():
+            raise SystemExit("Warm up failed, not starting workers")
+    PreforkLauncher(config, args.workers, args.max_requests, args.max_requests_jitter).run()
+
+
+if __name__ == "__main__":
+    main()
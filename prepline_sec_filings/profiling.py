@@ -0,0 +1,274 @@
+"""Module for opt-in memory profiling of the section pipeline. While profiling, the stages that
+the pipeline records on its timer (upload, parse, partition, toc, section.*, serialize) also
+record the RSS of the process and the memory traced by tracemalloc, and the top allocation
+sites are captured after each top level stage. From the library:
+
+    with profile_memory() as profiler:
+        pipeline_api(text, m_section=["RISK_FACTORS"])
+    profiler.report()
+
+Through the API, set SEC_FILINGS_PROFILING_TOKEN on the server and send the token in the
+X-Profile-Memory header of a request. The report is logged as a JSON line.
+
+tracemalloc traces the whole process and slows it down considerably, so only one profile can
+run at a time and any concurrent requests are included in it. Profile on an idle worker."""
+from contextlib import ExitStack, contextmanager
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Optional
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from prepline_sec_filings.timing import NULL_TIMER, StageTimer, get_timer, use_timer
+
+logger = logging.getLogger("prepline_sec_filings")
+
+PROFILING_HEADER: Final[str] = "x-profile-memory"
+PROFILING_TOKEN_ENV: Final[str] = "SEC_FILINGS_PROFILING_TOKEN"
+DEFAULT_TOP_N: Final[int] = 10
+
+_MB: Final[int] = 1024**2
+_profiling_lock = threading.Lock()
+_IGNORED_TRACES: Final[list] = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_bytes() -> int:
+    """Returns the current resident set size of the process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # NOTE: Not on Linux, fall back to the peak RSS
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Returns the peak resident set size of the process."""
+    import resource
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # NOTE: ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def reset_peak_rss() -> bool:
+    """Resets the peak resident set size to the current one, so that peak_rss_bytes measures
+    what follows. Returns False if the OS does not support it (it requires Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _mb(n_bytes: float) -> float:
+    return round(n_bytes / _MB, 3)
+
+
+class MemoryProfiler(StageTimer):
+    """Timer that records memory usage at the end of each stage. Durations, counts and tags
+    are forwarded to parent, so request timings and metrics are unaffected by profiling.
+
+    For each stage this records the RSS, the traced memory, the traced memory retained by the
+    stage (e.g. the document tree for parse) and the traced peak during the stage. Peaks of
+    nested stages are only separated on Python 3.9+, where tracemalloc.reset_peak exists."""
+
+    def __init__(self, parent: StageTimer = NULL_TIMER, top_n: int = DEFAULT_TOP_N):
+        super().__init__()
+        self.parent = parent
+        self.top_n = top_n
+        self.events: List[dict] = []
+        self.peak_traced = 0
+        self.top_allocations: List[dict] = []
+        self._open_stages: List[dict] = []
+        self._started_tracing = False
+        self._start_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._rss_at_stop: Optional[int] = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+        self._reset_peak()
+
+    def stop(self):
+        self._update_peaks()
+        self.top_allocations = self._top_allocations()
+        self._rss_at_stop = rss_bytes()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._enter_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            self._exit_stage()
+
+    def record(self, name: str, seconds: float):
+        super().record(name, seconds)
+        self.parent.record(name, seconds)
+
+    def record_since_start(self, name: str):
+        """Forwards to the parent timer, whose start includes receiving the upload, and records
+        the memory held at this point (e.g. the decoded upload) as a stage."""
+        self.parent.record_since_start(name)
+        self._enter_stage(name)
+        self._exit_stage()
+
+    def count(self, name: str, n: int = 1):
+        super().count(name, n)
+        self.parent.count(name, n)
+
+    def tag(self, name: str, value: str):
+        super().tag(name, value)
+        self.parent.tag(name, value)
+
+    def _reset_peak(self):
+        # NOTE: tracemalloc.reset_peak was added in Python 3.9
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    def _update_peaks(self) -> int:
+        """Folds the traced peak since the last reset into the open stages and returns the
+        current traced memory."""
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_traced = max(self.peak_traced, peak)
+        for open_stage in self._open_stages:
+            open_stage["peak"] = max(open_stage["peak"], peak)
+        self._reset_peak()
+        return current
+
+    def _enter_stage(self, name: str):
+        current = self._update_peaks()
+        self._open_stages.append({"stage": name, "traced_at_start": current, "peak": current})
+
+    def _exit_stage(self):
+        current = self._update_peaks()
+        open_stage = self._open_stages.pop()
+        event = {
+            "stage": open_stage["stage"],
+            "depth": len(self._open_stages),
+            "rss_mb": _mb(rss_bytes()),
+            "traced_mb": _mb(current),
+            "retained_mb": _mb(current - open_stage["traced_at_start"]),
+            "peak_traced_mb": _mb(open_stage["peak"]),
+        }
+        if not self._open_stages:
+            event["top_allocations"] = self._top_allocations()
+            # NOTE: Excludes the memory used to take the snapshot from the next stage's peak
+            self._reset_peak()
+        self.events.append(event)
+
+    def _top_allocations(self) -> List[dict]:
+        """Returns the allocation sites that grew the most since profiling started."""
+        if not self.top_n or self._start_snapshot is None or not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+        stats = snapshot.compare_to(self._start_snapshot, "lineno")
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_mb": _mb(stat.size),
+                "size_diff_mb": _mb(stat.size_diff),
+                "count": stat.count,
+            }
+            for stat in stats[: self.top_n]
+        ]
+
+    def report(self) -> Dict:
+        """Returns the memory recorded for each stage, in the order the stages finished (nested
+        stages before the stages that contain them), and the top allocation sites at the end."""
+        return {
+            "stages": list(self.events),
+            "peak_traced_mb": _mb(self.peak_traced),
+            "rss_mb": _mb(self._rss_at_stop if self._rss_at_stop is not None else rss_bytes()),
+            "peak_rss_mb": _mb(peak_rss_bytes()),
+            "top_allocations": list(self.top_allocations),
+        }
+
+
+@contextmanager
+def profile_memory(top_n: int = DEFAULT_TOP_N) -> Iterator[MemoryProfiler]:
+    """Profiles the memory used by the pipeline within the block. The profiler wraps the
+    current timer, so timings recorded in the block still reach it."""
+    if not _profiling_lock.acquire(blocking=False):
+        raise RuntimeError("A memory profile is already running in this process")
+    try:
+        profiler = MemoryProfiler(parent=get_timer(), top_n=top_n)
+        profiler.start()
+        try:
+            with use_timer(profiler):
+                yield profiler
+        finally:
+            profiler.stop()
+    finally:
+        _profiling_lock.release()
+
+
+class MemoryProfilingMiddleware:
+    """ASGI middleware that profiles the memory of requests that send the admin token in the
+    X-Profile-Memory header and logs the report. Disabled unless a token is configured."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: Optional[str] = os.environ.get(PROFILING_TOKEN_ENV),
+        top_n: int = DEFAULT_TOP_N,
+    ):
+        self.app = app
+        self.token = token
+        self.top_n = top_n
+
+    def _is_authorized(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or not self.token:
+            return False
+        header = Headers(scope=scope).get(PROFILING_HEADER)
+        return header is not None and hmac.compare_digest(header.encode(), self.token.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._is_authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        stack = ExitStack()
+        try:
+            profiler = stack.enter_context(profile_memory(self.top_n))
+        except RuntimeError:
+            logger.warning("Skipping memory profile of %s, one is already running", scope["path"])
+            await self.app(scope, receive, send)
+            return
+        with stack:
+            await self.app(scope, receive, send)
+        logger.info(
+            json.dumps(
+                {
+                    "event": "memory_profile",
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    **profiler.report(),
+                }
+            )
+        )
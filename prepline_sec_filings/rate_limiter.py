@@ -0,0 +1,146 @@
+"""Module for rate limiting requests to SEC EDGAR. SEC allows 10 requests per second per host,
+so every EDGAR request in the package goes through one shared limiter instead of each function
+having its own budget. To share the budget between processes on one host (e.g. parallel bulk
+downloads), set SEC_API_RATE_LIMIT_FILE to a path that all of them can write to.
+ref: https://www.sec.gov/os/accessing-edgar-data"""
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+SEC_RATE_LIMIT: Final[float] = 10
+RATE_LIMIT_ENV: Final[str] = "SEC_API_RATE_LIMIT"
+RATE_LIMIT_FILE_ENV: Final[str] = "SEC_API_RATE_LIMIT_FILE"
+
+# NOTE: The bucket state in the shared file, (tokens, monotonic time of the last update)
+_STATE_FORMAT: Final[str] = "dd"
+_STATE_SIZE: Final[int] = struct.calcsize(_STATE_FORMAT)
+_EPSILON: Final[float] = 1e-9
+# NOTE: How long to wait before trying again when another thread or process holds the file lock
+_LOCKED_WAIT: Final[float] = 0.001
+
+
+class RateLimiter:
+    """Token bucket that allows rate requests per second on average and bursts of up to
+    capacity requests. The default capacity of 1 spaces requests evenly, so no one second
+    window ever holds more than rate requests. Thread-safe."""
+
+    def __init__(
+        self,
+        rate: float = SEC_RATE_LIMIT,
+        capacity: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated = clock()
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available and returns 0, otherwise returns the number of
+        seconds until one will be."""
+        with self._lock:
+            self._tokens, self._updated, wait = self._take(self._tokens, self._updated)
+            return wait
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            self.sleep(wait)
+
+    def _take(self, tokens: float, updated: float) -> Tuple[float, float, float]:
+        """Refills the bucket up to now and takes a token from it. Returns the new state and
+        the wait, which is 0 if a token was taken."""
+        now = self.clock()
+        tokens = min(self.capacity, tokens + max(now - updated, 0) * self.rate)
+        # NOTE: Tolerates rounding, e.g. sleeping exactly the returned wait refilling 0.999...
+        if tokens >= 1 - _EPSILON:
+            return max(tokens - 1, 0), now, 0
+        return tokens, now, (1 - tokens) / self.rate
+
+
+class FileRateLimiter(RateLimiter):
+    """RateLimiter whose bucket is kept in a file under an exclusive lock, so that every
+    process on the host using the same path shares one budget. Requires fcntl (Linux and
+    macOS). The processes must share a monotonic clock, i.e. run on the same host. try_acquire
+    never waits for the lock, so it can be called from an event loop: while another thread or
+    process holds it, it returns a short wait instead."""
+
+    def __init__(self, path: str, rate: float = SEC_RATE_LIMIT, capacity: float = 1, **kwargs):
+        import fcntl
+
+        super().__init__(rate, capacity, **kwargs)
+        self.path = path
+        self._flock = fcntl.flock
+        self._lock_ex_nb = fcntl.LOCK_EX | fcntl.LOCK_NB
+        self._lock_un = fcntl.LOCK_UN
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+
+    def try_acquire(self) -> float:
+        # NOTE: flock does not exclude threads sharing the file descriptor, hence the lock
+        if not self._lock.acquire(blocking=False):
+            return _LOCKED_WAIT
+        try:
+            try:
+                self._flock(self._fd, self._lock_ex_nb)
+            except BlockingIOError:
+                return _LOCKED_WAIT
+            try:
+                state = os.pread(self._fd, _STATE_SIZE, 0)
+                if len(state) == _STATE_SIZE:
+                    tokens, updated = struct.unpack(_STATE_FORMAT, state)
+                else:
+                    tokens, updated = self.capacity, self.clock()
+                tokens, updated, wait = self._take(tokens, updated)
+                os.pwrite(self._fd, struct.pack(_STATE_FORMAT, tokens, updated), 0)
+                return wait
+            finally:
+                self._flock(self._fd, self._lock_un)
+        finally:
+            self._lock.release()
+
+    def close(self):
+        os.close(self._fd)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the limiter shared by all EDGAR requests, created on first use from the
+    SEC_API_RATE_LIMIT (requests per second) and SEC_API_RATE_LIMIT_FILE environment
+    variables."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rate = float(os.environ.get(RATE_LIMIT_ENV, SEC_RATE_LIMIT))
+            path = os.environ.get(RATE_LIMIT_FILE_ENV)
+            _default_limiter = FileRateLimiter(path, rate) if path else RateLimiter(rate)
+        return _default_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Replaces the limiter shared by all EDGAR requests. None recreates it from the
+    environment on next use."""
+    global _default_limiter
+    with _default_limiter_lock:
+        _default_limiter = limiter
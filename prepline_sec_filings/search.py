@@ -0,0 +1,345 @@
+"""Module for full-text search over extracted sections. SearchIndex is a section_store.SectionStore
+that also keeps a SQLite FTS5 index of the text of its elements, which can be searched together
+with the metadata of their filings and ranked by relevance (BM25):
+
+    with SearchIndex("sec-sections.db") as index:
+        index.update()
+        results = index.search("cybersecurity incident", sections=["RISK_FACTORS"], limit=20)
+        for hit in results.hits:
+            print(hit.cik, hit.filing_date, hit.snippet)
+
+Elements are indexed incrementally: update indexes the elements stored since the last update in
+batches, one transaction per batch, so it can run after every load and be interrupted without
+losing more than one batch. Elements that are replaced or deleted afterwards are removed from the
+index as part of the same transaction. The index lives in the same database file as the sections,
+so the store can be copied as a single file. Build and update it from the command line with:
+
+    python -m prepline_sec_filings.search index sec-sections.db
+
+FTS5 requires SQLite 3.9 or later compiled with FTS5, which most builds of Python ship."""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from prepline_sec_filings.section_store import (
+    DEFAULT_TIMEOUT,
+    DateLike,
+    SectionName,
+    SectionStore,
+    _date,
+    _filing_conditions,
+    _section_name,
+)
+from prepline_sec_filings.sections import SECSection
+
+SEARCH_INDEX_ENV: Final[str] = "SEC_FILINGS_SEARCH_INDEX"
+DEFAULT_INDEX_BATCH_SIZE: Final[int] = 10000
+DEFAULT_PAGE_SIZE: Final[int] = 10
+MAX_PAGE_SIZE: Final[int] = 100
+
+_SCHEMA: Final[List[str]] = [
+    # NOTE: External content table, the text is only stored once, in elements
+    "CREATE VIRTUAL TABLE IF NOT EXISTS elements_fts USING fts5 ("
+    "text, content='elements', content_rowid='id', tokenize='porter unicode61')",
+    """CREATE TABLE IF NOT EXISTS search_index (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        indexed_id INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO search_index (id, indexed_id) VALUES (0, 0)",
+    # NOTE: Elements up to indexed_id are in the index, so those that are deleted are removed
+    # from it and those that are inserted with a reused id are added to it
+    """CREATE TRIGGER IF NOT EXISTS elements_fts_delete AFTER DELETE ON elements
+    WHEN old.id <= (SELECT indexed_id FROM search_index) BEGIN
+        INSERT INTO elements_fts (elements_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS elements_fts_insert AFTER INSERT ON elements
+    WHEN new.id <= (SELECT indexed_id FROM search_index) BEGIN
+        INSERT INTO elements_fts (rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+
+class SearchHit(NamedTuple):
+    accession_number: str
+    cik: str
+    form_type: str
+    filing_date: Optional[datetime.date]
+    section: str
+    # NOTE: Position of the element within its section
+    position: int
+    type: Optional[str]
+    text: str
+    snippet: str
+    # NOTE: BM25 relevance, higher is more relevant
+    score: float
+
+
+class SearchResults(NamedTuple):
+    # NOTE: Number of matching elements, of which hits is the requested page
+    total: int
+    hits: List[SearchHit]
+
+
+class SearchIndex(SectionStore):
+    """SectionStore with a full-text index of its elements, in the SQLite database at path.
+    With read_only, the index must have been created already. Raises RuntimeError if SQLite
+    does not support FTS5."""
+
+    def __init__(self, path: str, timeout: float = DEFAULT_TIMEOUT, read_only: bool = False):
+        super().__init__(path, timeout, read_only)
+        try:
+            if read_only:
+                # NOTE: Fails if the index does not exist or FTS5 is missing
+                self._connection.execute("SELECT rowid FROM elements_fts LIMIT 0").fetchall()
+                self._connection.execute("SELECT indexed_id FROM search_index").fetchall()
+            else:
+                with self._transaction() as connection:
+                    for statement in _SCHEMA:
+                        connection.execute(statement)
+        except sqlite3.Error as error:
+            self.close()
+            if "fts5" in str(error):
+                raise RuntimeError(
+                    f"The SQLite {sqlite3.sqlite_version} used by Python does not support FTS5"
+                ) from error
+            raise
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def pending(self) -> int:
+        """Returns the number of elements that are not indexed yet."""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM elements WHERE id > (SELECT indexed_id FROM search_index)"
+            ).fetchone()
+        return count
+
+    def update(self, batch_size: int = DEFAULT_INDEX_BATCH_SIZE) -> int:
+        """Indexes the elements stored since the last update, batch_size elements per
+        transaction. Returns the number of elements indexed."""
+        indexed = 0
+        while True:
+            with self._transaction() as connection:
+                (first,) = connection.execute("SELECT indexed_id FROM search_index").fetchone()
+                (last,) = connection.execute(
+                    "SELECT MAX(id) FROM "
+                    "(SELECT id FROM elements WHERE id > ? ORDER BY id LIMIT ?)",
+                    (first, batch_size),
+                ).fetchone()
+                if last is None:
+                    return indexed
+                indexed += connection.execute(
+                    "INSERT INTO elements_fts (rowid, text) "
+                    "SELECT id, text FROM elements WHERE id > ? AND id <= ?",
+                    (first, last),
+                ).rowcount
+                connection.execute("UPDATE search_index SET indexed_id = ?", (last,))
+
+    def rebuild(self):
+        """Indexes all elements again from scratch."""
+        with self._transaction() as connection:
+            connection.execute("INSERT INTO elements_fts (elements_fts) VALUES ('rebuild')")
+            connection.execute(
+                "UPDATE search_index SET indexed_id = (SELECT COALESCE(MAX(id), 0) FROM elements)"
+            )
+
+    def search(
+        self,
+        query: str,
+        sections: Optional[Union[SectionName, Iterable[SectionName]]] = None,
+        ciks: Optional[Iterable[Union[str, int]]] = None,
+        form_types: Optional[Iterable[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0,
+    ) -> SearchResults:
+        """Returns the indexed elements matching the FTS5 query, e.g. 'cyber*' or '"supply
+        chain" NOT covid', in the given sections of the filings of the given companies and form
+        types filed between start and end, both inclusive. Hits are ranked from the most
+        relevant and paginated with limit and offset. Raises ValueError for invalid queries."""
+        conditions, parameters = _filing_conditions(form_types, start, end)
+        conditions.insert(0, "elements_fts MATCH ?")
+        parameters.insert(0, query)
+        if isinstance(sections, (str, SECSection)):
+            sections = [sections]
+        if sections is not None:
+            names = [_section_name(section) for section in sections]
+            conditions.append(f"e.section IN ({', '.join('?' * len(names))})")
+            parameters.extend(names)
+        tables = (
+            "elements_fts JOIN elements e ON e.id = elements_fts.rowid "
+            "JOIN filings f ON f.accession_number = e.accession_number"
+        )
+        where = " AND ".join(conditions)
+        try:
+            with self._lock:
+                if ciks is not None:
+                    self._load_query_ciks(ciks)
+                    tables += " JOIN query_ciks q ON q.cik = f.cik"
+                (total,) = self._connection.execute(
+                    f"SELECT COUNT(*) FROM {tables} WHERE {where}", parameters
+                ).fetchone()
+                rows = self._connection.execute(
+                    "SELECT f.accession_number, f.cik, f.form_type, f.filing_date, e.section, "
+                    "e.position, e.type, e.text, "
+                    "snippet(elements_fts, 0, '<b>', '</b>', '...', 16), bm25(elements_fts) "
+                    f"FROM {tables} WHERE {where} ORDER BY rank LIMIT ? OFFSET ?",
+                    parameters + [limit, offset],
+                ).fetchall()
+        except sqlite3.OperationalError as error:
+            raise ValueError(f"Invalid search query {query!r}: {error}") from error
+        hits = [
+            SearchHit(
+                accession_number,
+                str(cik),
+                form_type,
+                _date(filing_date),
+                section,
+                position,
+                element_type,
+                text,
+                snippet,
+                -bm25,
+            )
+            for (
+                accession_number,
+                cik,
+                form_type,
+                filing_date,
+                section,
+                position,
+                element_type,
+                text,
+                snippet,
+                bm25,
+            ) in rows
+        ]
+        return SearchResults(total, hits)
+
+
+_indexes: Dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(path: Optional[str] = None) -> Optional[SearchIndex]:
+    """Returns the SearchIndex at path, SEC_FILINGS_SEARCH_INDEX by default, opened read-only
+    once per process, or None if no path is set. Raises sqlite3.Error or RuntimeError if it
+    cannot be opened, and tries again on the next call."""
+    path = path or os.environ.get(SEARCH_INDEX_ENV)
+    if not path:
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = SearchIndex(path, read_only=True)
+        return _indexes[path]
+
+
+def search_endpoint(request: Request) -> JSONResponse:
+    """Searches the index at SEC_FILINGS_SEARCH_INDEX. Takes the query as q, the filters as
+    section, cik and form_type, which can be repeated, and start and end dates, and returns the
+    page (from 1) of page_size hits, most relevant first."""
+    try:
+        index = get_search_index()
+    except (sqlite3.Error, RuntimeError) as error:
+        return JSONResponse({"error": f"The search index is unavailable: {error}"}, status_code=503)
+    if index is None:
+        return JSONResponse({"error": f"{SEARCH_INDEX_ENV} is not set"}, status_code=503)
+    params = request.query_params
+    query = params.get("q", "").strip()
+    try:
+        if not query:
+            raise ValueError("q is required")
+        page = int(params.get("page", 1))
+        page_size = int(params.get("page_size", DEFAULT_PAGE_SIZE))
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page must be at least 1 and page_size from 1 to {MAX_PAGE_SIZE}")
+        results = index.search(
+            query,
+            sections=params.getlist("section") or None,
+            ciks=params.getlist("cik") or None,
+            form_types=params.getlist("form_type") or None,
+            start=params.get("start"),
+            end=params.get("end"),
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+    return JSONResponse(
+        {
+            "q": query,
+            "page": page,
+            "page_size": page_size,
+            "total": results.total,
+            "hits": [
+                dict(
+                    hit._asdict(),
+                    filing_date=None if hit.filing_date is None else hit.filing_date.isoformat(),
+                )
+                for hit in results.hits
+            ],
+        }
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Full-text search over extracted sections.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_command = commands.add_parser(
+        "index", help="Index the elements stored since the last run."
+    )
+    index_command.add_argument("path", help="Path of the section store database.")
+    index_command.add_argument("--batch-size", type=int, default=DEFAULT_INDEX_BATCH_SIZE)
+    index_command.add_argument("--rebuild", action="store_true", help="Index everything again.")
+    search_command = commands.add_parser("search", help="Search the index.")
+    search_command.add_argument("path", help="Path of the section store database.")
+    search_command.add_argument("query", help="FTS5 query.")
+    search_command.add_argument("--section", action="append")
+    search_command.add_argument("--cik", action="append")
+    search_command.add_argument("--form-type", action="append")
+    search_command.add_argument("--start")
+    search_command.add_argument("--end")
+    search_command.add_argument("--limit", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    with SearchIndex(args.path) as index:
+        if args.command == "index":
+            if args.rebuild:
+                index.rebuild()
+                print("rebuilt the index")
+            else:
+                print(f"indexed {index.update(args.batch_size)} elements")
+            return
+        results = index.search(
+            args.query,
+            sections=args.section,
+            ciks=args.cik,
+            form_types=args.form_type,
+            start=args.start,
+            end=args.end,
+            limit=args.limit,
+        )
+        print(f"{results.total} matching elements")
+        for hit in results.hits:
+            print(
+                f"{hit.score:7.2f} {hit.cik} {hit.form_type} {hit.filing_date} "
+                f"{hit.accession_number} {hit.section}: {hit.snippet}"
+            )
+
+
+if __name__ == "__main__":
+    main()
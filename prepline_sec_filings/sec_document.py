@@ -1,12 +1,6 @@
 from functools import partial
 import re
 from typing import List, Optional, Iterable, Iterator, Any, Tuple
-import sys
-
-if sys.version_info < (3, 8):
-    from typing_extensions import Final
-else:
-    from typing import Final
 
 import numpy as np
 import numpy.typing as npt
@@ -17,19 +11,14 @@ from unstructured.cleaners.core import clean
 from unstructured.documents.elements import Text, ListItem, NarrativeText, Title, Element
 from unstructured.documents.html import HTMLDocument
 from unstructured.nlp.partition import is_possible_title
-from prepline_sec_filings.sections import SECSection
-
+from prepline_sec_filings.sections import (
+    SECSection,
+    REPORT_TYPES,
+    S1_TYPES,
+    VALID_FILING_TYPES,
+)
+from prepline_sec_filings.timing import get_timer
 
-VALID_FILING_TYPES: Final[List[str]] = [
-    "10-K",
-    "10-Q",
-    "S-1",
-    "10-K/A",
-    "10-Q/A",
-    "S-1/A",
-]
-REPORT_TYPES: Final[List[str]] = ["10-K", "10-Q", "10-K/A", "10-Q/A"]
-S1_TYPES: Final[List[str]] = ["S-1", "S-1/A"]
 
 ITEM_TITLE_RE = re.compile(r"(?i)item \d{1,3}(?:[a-z]|\([a-z]\))?(?:\.)?(?::)?")
 
@@ -87,26 +76,33 @@ class SECDocument(HTMLDocument):
         """Identifies text sections that are likely the table of contents."""
         out_cls = self.__class__
         _raise_for_invalid_filing_type(self.filing_type)
-        title_locs = to_sklearn_format(self.elements)
-        if len(title_locs) == 0:
-            return out_cls.from_elements([])
-        # NOTE(alan): Might be a way to do the same thing that doesn't involve the transformations
-        # necessary to get it into sklearn. We're just looking for densely packed Titles.
-        res = DBSCAN(eps=6.0).fit_predict(title_locs)
-        for i in range(res.max() + 1):
-            idxs = cluster_num_to_indices(i, title_locs, res)
-            cluster_elements: List[Text] = [self.elements[i] for i in idxs]
-            if any(
-                [
-                    # TODO(alan): Maybe swap risk title out for something more generic? It helps to
-                    # have 2 markers though, I think.
-                    is_risk_title(el.text, self.filing_type)
-                    for el in cluster_elements
-                    if isinstance(el, Title)
-                ]
-            ) and any([is_toc_title(el.text) for el in cluster_elements if isinstance(el, Title)]):
-                return out_cls.from_elements(self._filter_table_of_contents(cluster_elements))
-        return out_cls.from_elements(self._filter_table_of_contents(self.elements))
+        timer = get_timer()
+        with timer.stage("toc"):
+            with timer.stage("title_detection"):
+                title_locs = to_sklearn_format(self.elements)
+            timer.count("titles_detected", len(title_locs))
+            if len(title_locs) == 0:
+                return out_cls.from_elements([])
+            # NOTE(alan): Might be a way to do the same thing that doesn't involve the
+            # transformations necessary to get it into sklearn. We're just looking for densely
+            # packed Titles.
+            res = DBSCAN(eps=6.0).fit_predict(title_locs)
+            for i in range(res.max() + 1):
+                idxs = cluster_num_to_indices(i, title_locs, res)
+                cluster_elements: List[Text] = [self.elements[i] for i in idxs]
+                if any(
+                    [
+                        # TODO(alan): Maybe swap risk title out for something more generic? It
+                        # helps to have 2 markers though, I think.
+                        is_risk_title(el.text, self.filing_type)
+                        for el in cluster_elements
+                        if isinstance(el, Title)
+                    ]
+                ) and any(
+                    [is_toc_title(el.text) for el in cluster_elements if isinstance(el, Title)]
+                ):
+                    return out_cls.from_elements(self._filter_table_of_contents(cluster_elements))
+            return out_cls.from_elements(self._filter_table_of_contents(self.elements))
 
     def get_section_narrative_no_toc(self, section: SECSection) -> List[NarrativeText]:
         """Identifies narrative text sections that fall under the given section heading without
@@ -117,19 +113,20 @@ class SECDocument(HTMLDocument):
         # title formating
         section_elements: List[NarrativeText] = list()
         in_section = False
-        for element in self.elements:
-            is_title = is_possible_title(element.text)
-            if in_section:
-                if is_title and is_item_title(element.text, self.filing_type):
-                    if section_elements:
-                        return section_elements
-                    else:
-                        in_section = False
-                elif isinstance(element, NarrativeText) or isinstance(element, ListItem):
-                    section_elements.append(element)
-
-            if is_title and is_section_elem(section, element, self.filing_type):
-                in_section = True
+        with get_timer().stage("no_toc"):
+            for element in self.elements:
+                is_title = is_possible_title(element.text)
+                if in_section:
+                    if is_title and is_item_title(element.text, self.filing_type):
+                        if section_elements:
+                            return section_elements
+                        else:
+                            in_section = False
+                    elif isinstance(element, NarrativeText) or isinstance(element, ListItem):
+                        section_elements.append(element)
+
+                if is_title and is_section_elem(section, element, self.filing_type):
+                    in_section = True
 
         return section_elements
 
@@ -162,8 +159,10 @@ class SECDocument(HTMLDocument):
         # NOTE(robinson) - We are not skipping table text because the risk narrative section
         # usually does not contain any tables and sometimes tables are used for
         # title formating
+        timer = get_timer()
         toc = self.get_table_of_contents()
         if not toc.pages:
+            timer.count("sections_no_toc")
             return self.get_section_narrative_no_toc(section)
 
         # Note(yuming): section_toc is the section title in TOC,
@@ -171,6 +170,7 @@ class SECDocument(HTMLDocument):
         section_toc, next_section_toc = self._get_toc_sections(section, toc)
         if section_toc is None:
             # NOTE(yuming): fail to find the section title in TOC
+            timer.count("sections_not_found")
             return []
 
         # NOTE(yuming): we use doc after next_section_toc instead of after toc
@@ -185,6 +185,7 @@ class SECDocument(HTMLDocument):
             reversed(doc_after_section_toc.elements), section_toc.text, self.filing_type
         )
         if section_start_element is None:
+            timer.count("sections_not_found")
             return []
         doc_after_section_heading = self.after_element(section_start_element)
 
@@ -194,6 +195,7 @@ class SECDocument(HTMLDocument):
         # to avoid the worst case of returning the entire doc.
         if self._is_last_section_in_report(section, toc) or next_section_toc is None:
             # returns everything after section_start_element in doc
+            timer.count("sections_up_to_next_title")
             return get_narrative_texts(doc_after_section_heading, up_to_next_title=True)
 
         # NOTE(yuming): map next_section_toc to the section title after TOC
@@ -205,8 +207,10 @@ class SECDocument(HTMLDocument):
         if section_end_element is None:
             # NOTE(yuming): returns everything up to the next Title element
             # to avoid the worst case of returning the entire doc.
+            timer.count("sections_up_to_next_title")
             return get_narrative_texts(doc_after_section_heading, up_to_next_title=True)
 
+        timer.count("sections_toc")
         return get_narrative_texts(doc_after_section_heading.before_element(section_end_element))
 
     def get_risk_narrative(self) -> List[NarrativeText]:
@@ -0,0 +1,341 @@
+"""Module for storing extracted sections in a local SQLite database, so they can be queried
+without parsing the filings again. Each filing is stored with its CIK, form type and filing date,
+and each section as the elements returned by the section API for the isd schema, in order:
+
+    with SectionStore("sec-sections.db") as store:
+        store.put(StoredFiling("000006674022000065", "66740", "10-Q", "2022-04-26"), sections)
+        for section in store.query("RISK_FACTORS", ciks=ciks, start="2022-01-01",
+                                   end="2022-12-31"):
+            print(section.cik, section.filing_date, len(section.elements))
+
+Filings are indexed by CIK, form type and filing date and elements by filing and section, so
+queries only read the matching rows. put_many inserts filings in batches, one transaction per
+batch, which is much faster than a transaction per filing."""
+import datetime
+import itertools
+import json
+import pathlib
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from prepline_sec_filings.sections import SECSection
+
+DEFAULT_BATCH_SIZE: Final[int] = 100
+DEFAULT_TIMEOUT: Final[float] = 30.0
+
+_SCHEMA: Final[List[str]] = [
+    """CREATE TABLE IF NOT EXISTS filings (
+        accession_number TEXT PRIMARY KEY,
+        cik INTEGER NOT NULL,
+        form_type TEXT NOT NULL,
+        filing_date TEXT,
+        ticker TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS filings_by_cik ON filings (cik, filing_date)",
+    "CREATE INDEX IF NOT EXISTS filings_by_form ON filings (form_type, filing_date)",
+    "CREATE INDEX IF NOT EXISTS filings_by_date ON filings (filing_date)",
+    """CREATE TABLE IF NOT EXISTS elements (
+        id INTEGER PRIMARY KEY,
+        accession_number TEXT NOT NULL REFERENCES filings (accession_number),
+        section TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        type TEXT,
+        text TEXT NOT NULL,
+        extra TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS elements_by_filing "
+    "ON elements (accession_number, section, position)",
+]
+_ELEMENT_KEYS: Final[Tuple[str, str]] = ("text", "type")
+
+SectionName = Union[str, SECSection]
+# NOTE: Like filing_index.DateLike, without numpy so that the server does not import it
+DateLike = Union[str, datetime.date]
+
+
+class StoredFiling(NamedTuple):
+    accession_number: str
+    cik: str
+    form_type: str
+    filing_date: Optional[DateLike] = None
+    ticker: Optional[str] = None
+
+
+class StoredSection(NamedTuple):
+    accession_number: str
+    cik: str
+    form_type: str
+    filing_date: Optional[datetime.date]
+    section: str
+    # NOTE: As returned by the section API for the isd schema, e.g. {"text": ..., "type": ...}
+    elements: List[dict]
+
+
+class SectionStore:
+    """Extracted sections of filings, stored in the SQLite database at path (created if it does
+    not exist). Can be shared by threads, and by processes since SQLite locks the database
+    file. With read_only, the database must exist and is opened without writing to it, not even
+    to set it up, so it can be on a read-only mount or be written by another process."""
+
+    def __init__(self, path: str, timeout: float = DEFAULT_TIMEOUT, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            f"{pathlib.Path(path).absolute().as_uri()}?mode=ro" if read_only else path,
+            timeout=timeout,
+            check_same_thread=False,
+            isolation_level=None,
+            uri=read_only,
+        )
+        if read_only:
+            return
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # NOTE: With WAL, a crash can lose the last transactions but not corrupt the database
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "SectionStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def put(self, filing: StoredFiling, sections: Dict[str, list]):
+        """Stores the sections of the filing, replacing the ones already stored for it under the
+        same section names."""
+        self.put_many([(filing, sections)])
+
+    def put_many(
+        self,
+        filings: Iterable[Tuple[StoredFiling, Dict[str, list]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Stores the sections of many filings like put, batch_size filings per transaction.
+        Returns the number of filings stored."""
+        count = 0
+        iterator = iter(filings)
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                return count
+            with self._transaction() as connection:
+                for filing, sections in batch:
+                    self._put(connection, filing, sections)
+            count += len(batch)
+
+    def get(
+        self, accession_number: str, sections: Optional[Iterable[SectionName]] = None
+    ) -> Dict[str, list]:
+        """Returns the stored sections of the filing, all of them if sections is None."""
+        return {
+            section.section: section.elements
+            for section in self._select(["e.accession_number = ?"], [accession_number], sections)
+        }
+
+    def get_filing(self, accession_number: str) -> Optional[StoredFiling]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT accession_number, cik, form_type, filing_date, ticker FROM filings "
+                "WHERE accession_number = ?",
+                (accession_number,),
+            ).fetchone()
+        return None if row is None else _filing(row)
+
+    def filings(
+        self,
+        ciks: Optional[Iterable[Union[str, int]]] = None,
+        form_types: Optional[Iterable[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+    ) -> List[StoredFiling]:
+        """Returns the stored filings of the given companies and form types filed between start
+        and end, both inclusive, most recent first."""
+        conditions, parameters = _filing_conditions(form_types, start, end)
+        with self._lock:
+            filings = self._filings_table(ciks)
+            rows = self._connection.execute(
+                "SELECT f.accession_number, f.cik, f.form_type, f.filing_date, f.ticker "
+                f"FROM {filings} WHERE {' AND '.join(conditions)} "
+                "ORDER BY f.filing_date DESC, f.accession_number",
+                parameters,
+            ).fetchall()
+        return [_filing(row) for row in rows]
+
+    def query(
+        self,
+        sections: Optional[Union[SectionName, Iterable[SectionName]]] = None,
+        ciks: Optional[Iterable[Union[str, int]]] = None,
+        form_types: Optional[Iterable[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+    ) -> List[StoredSection]:
+        """Returns the given sections (all of them if None) of the filings of the given companies
+        and form types filed between start and end, both inclusive, most recent filing first."""
+        if isinstance(sections, (str, SECSection)):
+            sections = [sections]
+        conditions, parameters = _filing_conditions(form_types, start, end)
+        return self._select(conditions, parameters, sections, ciks)
+
+    def _select(
+        self,
+        conditions: List[str],
+        parameters: list,
+        sections: Optional[Iterable[SectionName]] = None,
+        ciks: Optional[Iterable[Union[str, int]]] = None,
+    ) -> List[StoredSection]:
+        conditions = list(conditions)
+        parameters = list(parameters)
+        if sections is not None:
+            names = [_section_name(section) for section in sections]
+            conditions.append(f"e.section IN ({', '.join('?' * len(names))})")
+            parameters.extend(names)
+        with self._lock:
+            filings = self._filings_table(ciks)
+            rows = self._connection.execute(
+                "SELECT f.accession_number, f.cik, f.form_type, f.filing_date, e.section, "
+                "e.type, e.text, e.extra "
+                f"FROM {filings} CROSS JOIN elements e ON e.accession_number = f.accession_number "
+                f"WHERE {' AND '.join(conditions) or '1'} "
+                "ORDER BY f.filing_date DESC, f.accession_number, e.section, e.position",
+                parameters,
+            ).fetchall()
+        results = []
+        for key, elements in itertools.groupby(rows, key=lambda row: row[:5]):
+            accession_number, cik, form_type, filing_date, section = key
+            results.append(
+                StoredSection(
+                    accession_number,
+                    str(cik),
+                    form_type,
+                    _date(filing_date),
+                    section,
+                    [_element(row[5], row[6], row[7]) for row in elements],
+                )
+            )
+        return results
+
+    def _filings_table(self, ciks: Optional[Iterable[Union[str, int]]]) -> str:
+        # NOTE: CROSS JOIN makes SQLite select the filings first and then their elements, the
+        # order of the indexes
+        if ciks is None:
+            return "filings f"
+        self._load_query_ciks(ciks)
+        return "query_ciks q CROSS JOIN filings f ON f.cik = q.cik"
+
+    def _load_query_ciks(self, ciks: Iterable[Union[str, int]]):
+        # NOTE: Queries join this temporary table rather than binding a parameter per CIK, which
+        # works for any number of CIKs and looks each one up in the filings_by_cik index
+        self._connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS query_ciks (cik INTEGER PRIMARY KEY)"
+        )
+        self._connection.execute("DELETE FROM query_ciks")
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO query_ciks (cik) VALUES (?)", [(int(cik),) for cik in ciks]
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _put(self, connection: sqlite3.Connection, filing: StoredFiling, sections: Dict[str, list]):
+        connection.execute(
+            "INSERT OR REPLACE INTO filings (accession_number, cik, form_type, filing_date, "
+            "ticker) VALUES (?, ?, ?, ?, ?)",
+            (
+                filing.accession_number,
+                int(filing.cik),
+                filing.form_type,
+                None if filing.filing_date is None else _iso_date(filing.filing_date),
+                filing.ticker,
+            ),
+        )
+        for section, elements in sections.items():
+            name = _section_name(section)
+            connection.execute(
+                "DELETE FROM elements WHERE accession_number = ? AND section = ?",
+                (filing.accession_number, name),
+            )
+            connection.executemany(
+                "INSERT INTO elements (accession_number, section, position, type, text, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (filing.accession_number, name, position, *_element_row(element))
+                    for position, element in enumerate(elements)
+                ],
+            )
+
+
+def _filing_conditions(
+    form_types: Optional[Iterable[str]], start: Optional[DateLike], end: Optional[DateLike]
+) -> Tuple[List[str], list]:
+    conditions = []
+    parameters: list = []
+    if form_types is not None:
+        form_types = list(form_types)
+        conditions.append(f"f.form_type IN ({', '.join('?' * len(form_types))})")
+        parameters.extend(form_types)
+    if start is not None:
+        conditions.append("f.filing_date >= ?")
+        parameters.append(_iso_date(start))
+    if end is not None:
+        conditions.append("f.filing_date <= ?")
+        parameters.append(_iso_date(end))
+    if not conditions:
+        conditions.append("1")
+    return conditions, parameters
+
+
+def _section_name(section: SectionName) -> str:
+    return section.name if isinstance(section, SECSection) else section
+
+
+def _iso_date(value: DateLike) -> str:
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    # NOTE: Also accepts timestamps, e.g. 2022-04-26T16:05:00, and numpy datetime64 values
+    return datetime.date.fromisoformat(str(value)[:10]).isoformat()
+
+
+def _date(value: Optional[str]) -> Optional[datetime.date]:
+    return None if value is None else datetime.date.fromisoformat(value)
+
+
+def _filing(row: tuple) -> StoredFiling:
+    accession_number, cik, form_type, filing_date, ticker = row
+    return StoredFiling(accession_number, str(cik), form_type, _date(filing_date), ticker)
+
+
+def _element_row(element: dict) -> Tuple[Optional[str], str, Optional[str]]:
+    extra = {key: value for key, value in element.items() if key not in _ELEMENT_KEYS}
+    return element.get("type"), element["text"], json.dumps(extra) if extra else None
+
+
+def _element(element_type: Optional[str], text: str, extra: Optional[str]) -> dict:
+    element = {"text": text, "type": element_type}
+    if extra is not None:
+        element.update(json.loads(extra))
+    return element
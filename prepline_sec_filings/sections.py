@@ -2,6 +2,23 @@
 from enum import Enum
 import re
 from typing import List
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+VALID_FILING_TYPES: Final[List[str]] = [
+    "10-K",
+    "10-Q",
+    "S-1",
+    "10-K/A",
+    "10-Q/A",
+    "S-1/A",
+]
+REPORT_TYPES: Final[List[str]] = ["10-K", "10-Q", "10-K/A", "10-Q/A"]
+S1_TYPES: Final[List[str]] = ["S-1", "S-1/A"]
 
 
 class SECSection(Enum):
@@ -0,0 +1,37 @@
+"""Entrypoint for serving the section API. The FastAPI app in prepline_sec_filings.api is
+generated from the pipeline notebooks, so anything that is not part of the pipeline itself
+(middleware, operational endpoints, search) is attached here instead. Run with:
+
+    uvicorn prepline_sec_filings.server:app
+"""
+import logging
+
+from prepline_sec_filings.api.app import app
+from prepline_sec_filings.compression import CompressionMiddleware, DEFAULT_MINIMUM_SIZE
+from prepline_sec_filings.metrics import MetricsMiddleware, metrics_endpoint
+from prepline_sec_filings.profiling import MemoryProfilingMiddleware
+from prepline_sec_filings.search import search_endpoint
+from prepline_sec_filings.timing import ServerTimingMiddleware
+from prepline_sec_filings.warmup import readyz_endpoint, start_warm_up
+
+# NOTE: Innermost so that profiled requests forward their stages to the request timer
+app.add_middleware(MemoryProfilingMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=DEFAULT_MINIMUM_SIZE)
+app.add_middleware(MetricsMiddleware)
+# NOTE: Added last so it is the outermost middleware and the total includes compression
+app.add_middleware(ServerTimingMiddleware)
+
+app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+app.add_route("/readyz", readyz_endpoint, methods=["GET"], include_in_schema=False)
+app.add_route("/sec-filings/v0/search", search_endpoint, methods=["GET"])
+app.add_event_handler("startup", start_warm_up)
+
+
+# Filter out /metrics scrape and /readyz probe noise
+class ProbeFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        return message.find("/metrics") == -1 and message.find("/readyz") == -1
+
+
+logging.getLogger("uvicorn.access").addFilter(ProbeFilter())
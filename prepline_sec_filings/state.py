@@ -0,0 +1,284 @@
+"""Module for recording which filings have already been processed, so that recurring jobs only
+process the new ones. The state of each filing is kept by accession number in a local SQLite
+database: whether it was fetched, extracted or failed, the SHA-256 of its text, the version of
+this library that processed it and the extraction results, or the location they were written to:
+
+    with StateStore("sec-filings-state.db") as state:
+        if not state.is_current(accession_number, content_hash(text)):
+            sections = extract_sections(text, ["RISK_FACTORS"])
+            state.record_extraction(accession_number, result=sections)
+
+A filing is current if it was extracted by the same version of the library, from the same text
+when a content hash is given. Filings in EDGAR's archives never change once they are published,
+so a filing that is current can be skipped without downloading it again.
+
+The store can be shared by threads, and by processes since SQLite locks the database file."""
+from contextlib import contextmanager
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from prepline_sec_filings.__version__ import __version__
+from prepline_sec_filings.sections import ALL_SECTIONS
+
+FETCHED: Final[str] = "fetched"
+EXTRACTED: Final[str] = "extracted"
+FAILED: Final[str] = "failed"
+DEFAULT_TIMEOUT: Final[float] = 30.0
+
+_SCHEMA: Final[
+    str
+] = """
+CREATE TABLE IF NOT EXISTS filing_state (
+    accession_number TEXT PRIMARY KEY,
+    cik TEXT,
+    form_type TEXT,
+    status TEXT NOT NULL,
+    content_hash TEXT,
+    version TEXT,
+    sections TEXT,
+    result TEXT,
+    result_path TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+_COLUMNS: Final[List[str]] = [
+    "accession_number",
+    "cik",
+    "form_type",
+    "status",
+    "content_hash",
+    "version",
+    "sections",
+    "result",
+    "result_path",
+    "error",
+    "updated_at",
+]
+
+
+class FilingState(NamedTuple):
+    accession_number: str
+    cik: Optional[str]
+    form_type: Optional[str]
+    status: str
+    content_hash: Optional[str]
+    version: Optional[str]
+    # NOTE: The section names that were requested, result holds what was extracted for them
+    sections: Optional[List[str]]
+    result: Optional[Any]
+    result_path: Optional[str]
+    error: Optional[str]
+    updated_at: float
+
+
+def content_hash(text: str) -> str:
+    """Returns the hex SHA-256 of the text of a filing, as recorded in the store."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StateStore:
+    """Processing state of filings by accession number, stored in the SQLite database at path
+    (created if it does not exist). version is the library version recorded for the filings
+    processed from now on, so upgrading the library makes every filing stale again."""
+
+    def __init__(self, path: str, version: str = __version__, timeout: float = DEFAULT_TIMEOUT):
+        self.path = path
+        self.version = version
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, check_same_thread=False, isolation_level=None
+        )
+        # NOTE: Lets readers in other processes carry on while a job is writing
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "StateStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, accession_number: str) -> Optional[FilingState]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM filing_state WHERE accession_number = ?",
+                (accession_number,),
+            ).fetchone()
+        return None if row is None else _state(row)
+
+    def is_current(
+        self,
+        accession_number: str,
+        content_hash: Optional[str] = None,
+        sections: Optional[List[str]] = None,
+    ) -> bool:
+        """Returns True if the filing was extracted by this version of the library, from the
+        text with the given content_hash and for all of the given sections, if any."""
+        return self.current(accession_number, content_hash, sections) is not None
+
+    def current(
+        self,
+        accession_number: str,
+        content_hash: Optional[str] = None,
+        sections: Optional[List[str]] = None,
+    ) -> Optional[FilingState]:
+        """Returns the state of the filing if it is current, like is_current, otherwise None."""
+        state = self.get(accession_number)
+        if state is None or not self._is_current(state, content_hash, sections):
+            return None
+        return state
+
+    def stale(self, accession_numbers: Iterable[str]) -> List[str]:
+        """Returns the accession numbers that are not current, in the order given."""
+        return [
+            accession_number
+            for accession_number in accession_numbers
+            if not self.is_current(accession_number)
+        ]
+
+    def record_fetch(
+        self,
+        accession_number: str,
+        content_hash: str,
+        cik: Optional[str] = None,
+        form_type: Optional[str] = None,
+    ):
+        """Records that the filing was fetched. Results extracted from the same text by the same
+        version of the library are kept, anything else is cleared."""
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM filing_state WHERE accession_number = ?",
+                (accession_number,),
+            ).fetchone()
+            if row is not None and self._is_current(_state(row), content_hash):
+                return
+            self._write(
+                accession_number,
+                cik=cik,
+                form_type=form_type,
+                status=FETCHED,
+                content_hash=content_hash,
+            )
+
+    def record_extraction(
+        self,
+        accession_number: str,
+        content_hash: Optional[str] = None,
+        sections: Optional[List[str]] = None,
+        result: Optional[Any] = None,
+        result_path: Optional[str] = None,
+        cik: Optional[str] = None,
+        form_type: Optional[str] = None,
+    ):
+        """Records that sections were extracted from the filing by this version of the library.
+        The result is stored as JSON, so large results are better written elsewhere and their
+        location recorded as result_path. content_hash, cik and form_type default to the ones
+        recorded when the filing was fetched."""
+        with self._transaction() as connection:
+            previous = _previous(connection, accession_number)
+            self._write(
+                accession_number,
+                cik=cik or previous[0],
+                form_type=form_type or previous[1],
+                status=EXTRACTED,
+                content_hash=content_hash or previous[2],
+                version=self.version,
+                sections=None if sections is None else json.dumps(sections),
+                result=None if result is None else json.dumps(result),
+                result_path=result_path,
+            )
+
+    def record_failure(
+        self,
+        accession_number: str,
+        error: BaseException,
+        cik: Optional[str] = None,
+        form_type: Optional[str] = None,
+    ):
+        """Records that fetching or extracting the filing failed, so it is processed again next
+        time."""
+        with self._transaction() as connection:
+            previous = _previous(connection, accession_number)
+            self._write(
+                accession_number,
+                cik=cik or previous[0],
+                form_type=form_type or previous[1],
+                status=FAILED,
+                content_hash=previous[2],
+                version=self.version,
+                error=f"{type(error).__name__}: {error}",
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of filings by status."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM filing_state GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def _is_current(
+        self,
+        state: FilingState,
+        content_hash: Optional[str] = None,
+        sections: Optional[List[str]] = None,
+    ) -> bool:
+        if state.status != EXTRACTED or state.version != self.version:
+            return False
+        if content_hash is not None and state.content_hash != content_hash:
+            return False
+        if sections is None or state.sections is None:
+            return True
+        return ALL_SECTIONS in state.sections or set(sections) <= set(state.sections)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # NOTE: Takes the write lock up front, so reading and then writing a row is atomic
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _write(self, accession_number: str, **values):
+        # NOTE: Not an upsert, which needs SQLite 3.24 and the Docker image links an older one
+        row = dict.fromkeys(_COLUMNS)
+        row.update(values, accession_number=accession_number, updated_at=time.time())
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO filing_state ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+            [row[column] for column in _COLUMNS],
+        )
+
+
+def _state(row: tuple) -> FilingState:
+    values = dict(zip(_COLUMNS, row))
+    for column in ("sections", "result"):
+        if values[column] is not None:
+            values[column] = json.loads(values[column])
+    return FilingState(**values)
+
+
+def _previous(connection: sqlite3.Connection, accession_number: str) -> tuple:
+    return connection.execute(
+        "SELECT cik, form_type, content_hash FROM filing_state WHERE accession_number = ?",
+        (accession_number,),
+    ).fetchone() or (None, None, None)
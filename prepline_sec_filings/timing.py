@@ -0,0 +1,175 @@
+"""Module for lightweight per-stage timing of the section pipeline. Code that wants to be timed
+records stages and counts on the timer returned by get_timer(). Unless a timer has been
+installed with use_timer (the API middleware does this per request), get_timer() returns a
+no-op timer, so instrumented code costs next to nothing when timing is not in use."""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+import sys
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("prepline_sec_filings")
+
+TIMING_ENABLED: Final[bool] = os.environ.get("SEC_FILINGS_TIMING", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+
+class StageTimer:
+    """Accumulates wall clock durations for named stages and counts for named events. Stages
+    with the same name are summed, e.g. the TOC lookup that runs once per requested section.
+    Tags hold descriptive values about the request, such as the filing type."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.tags: Dict[str, str] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def record_since_start(self, name: str):
+        """Records the time between creation of the timer and now as a stage, once. Used to
+        attribute the time spent receiving and decoding the upload before the pipeline runs."""
+        if name not in self.durations:
+            self.record(name, time.perf_counter() - self.started)
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def tag(self, name: str, value: str):
+        self.tags[name] = value
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        """Returns durations in milliseconds along with the counts."""
+        return {
+            "stages": {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()},
+            "counts": dict(self.counts),
+            "tags": dict(self.tags),
+        }
+
+    def server_timing(self) -> str:
+        """Formats the stages and counts as the value of a Server-Timing header.
+        ref: https://www.w3.org/TR/server-timing/"""
+        metrics: List[str] = [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()
+        ]
+        metrics.extend(f'{name};desc="{count}"' for name, count in self.counts.items())
+        metrics.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class NullTimer(StageTimer):
+    """Timer that records nothing."""
+
+    _null_context = nullcontext()
+
+    def stage(self, name: str):  # type: ignore[override]
+        return self._null_context
+
+    def record(self, name: str, seconds: float):
+        pass
+
+    def record_since_start(self, name: str):
+        pass
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def tag(self, name: str, value: str):
+        pass
+
+
+NULL_TIMER: Final[NullTimer] = NullTimer()
+
+_current_timer: ContextVar[StageTimer] = ContextVar("sec_filings_timer", default=NULL_TIMER)
+
+
+def get_timer() -> StageTimer:
+    """Returns the timer for the current context, or the no-op timer if none is installed."""
+    return _current_timer.get()
+
+
+@contextmanager
+def use_timer(timer: Optional[StageTimer] = None) -> Iterator[StageTimer]:
+    """Installs a timer for the duration of the block. Stages recorded by instrumented code in
+    this context (including worker threads started from it) go to this timer."""
+    if timer is None:
+        timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that times each request, adds the recorded stages to the response as a
+    Server-Timing header and logs them as a JSON line. Stages that run after the headers are
+    sent (e.g. later parts of a multipart/mixed response) only appear in the log."""
+
+    def __init__(self, app: ASGIApp, enabled: bool = TIMING_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timer.server_timing())
+            await send(message)
+
+        with use_timer() as timer:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if scope.get("path") != "/healthcheck":
+                    _log_timing(scope, status_code, timer)
+
+
+def _log_timing(scope: Scope, status_code: int, timer: StageTimer):
+    logger.info(
+        json.dumps(
+            {
+                "event": "request_timing",
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status_code": status_code,
+                "total_ms": round(timer.elapsed() * 1000, 3),
+                **timer.as_dict(),
+            }
+        )
+    )
@@ -0,0 +1,113 @@
+"""Module for warming up the section pipeline before it serves requests. The first filing
+processed by a fresh process pays for importing NLTK and scikit-learn, loading the NLTK
+tokenizer and tagger models and compiling the section patterns. warm_up runs a tiny embedded
+filing through the full pipeline so that this happens at startup instead, and the /readyz
+endpoint only reports ready once it has finished."""
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+if sys.version_info < (3, 8):
+    from typing_extensions import Final
+else:
+    from typing import Final
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger("prepline_sec_filings")
+
+WARMUP_ENABLED: Final[bool] = os.environ.get("SEC_FILINGS_WARMUP", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+
+# NOTE: A minimal 10-K with a table of contents, so that warming up exercises the TOC
+# clustering as well as the narrative text checks
+WARMUP_FILING: Final[
+    str
+] = """<SEC-DOCUMENT>
+<TYPE>10-K
+<COMPANY>Warmup Inc.
+<HTML>
+<table>
+<tr><td><p>TABLE OF CONTENTS</p></td><td></td></tr>
+<p>PART I</p>
+<tr><td><p>ITEM 1. BUSINESS</p></td><td>1</td></tr>
+<tr><td><p>ITEM 1A. RISK FACTORS</p></td><td>2</td></tr>
+<tr><td><p>ITEM 1B. UNRESOLVED STAFF COMMENTS</p></td><td>3</td></tr>
+<tr><td><p>ITEM 2. PROPERTIES</p></td><td>3</td></tr>
+</table>
+<p>PART I</p>
+<p>ITEM 1. BUSINESS</p>
+<p>The company sells warm up services to its customers.</p>
+<p>ITEM 1A. RISK FACTORS</p>
+<p>Our business could be adversely affected by changes in general economic conditions.</p>
+<ul><li>We may lose key customers.</li></ul>
+<p>ITEM 1B. UNRESOLVED STAFF COMMENTS</p>
+<p>None</p>
+<p>ITEM 2. PROPERTIES</p>
+<p>We lease one office building.</p>
+</HTML>
+</SEC-DOCUMENT>"""
+
+
+class WarmupState:
+    """Tracks whether this process has finished warming up."""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+
+_state = WarmupState()
+
+
+def is_ready() -> bool:
+    return _state.ready.is_set()
+
+
+def warm_up():
+    """Runs the embedded filing through the pipeline with JSON and CSV responses and marks the
+    process as ready. If the pipeline fails, the error is logged and the process stays not
+    ready, since requests would fail the same way."""
+    from prepline_sec_filings.api.section import pipeline_api
+
+    start = time.perf_counter()
+    try:
+        pipeline_api(WARMUP_FILING, m_section=["_ALL"])
+        pipeline_api(WARMUP_FILING, response_type="text/csv", m_section=["RISK_FACTORS"])
+    except Exception as e:
+        _state.error = f"{type(e).__name__}: {e}"
+        logger.exception("Warm up failed, the API will not report ready")
+        return
+    _state.seconds = time.perf_counter() - start
+    _state.error = None
+    _state.ready.set()
+    logger.info("Warm up finished in %.2fs", _state.seconds)
+
+
+def start_warm_up(enabled: bool = WARMUP_ENABLED) -> Optional[threading.Thread]:
+    """Warms up in a background thread, so the server can answer /healthcheck and /readyz in
+    the meantime. With warm up disabled, the process is ready immediately."""
+    if not enabled:
+        _state.ready.set()
+        return None
+    if is_ready():
+        # NOTE: Already warmed up, e.g. before forking the worker processes
+        return None
+    thread = threading.Thread(target=warm_up, name="sec-filings-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readyz_endpoint(request: Request) -> JSONResponse:
+    """Reports whether the process has warmed up and can serve requests at full speed."""
+    if is_ready():
+        return JSONResponse({"ready": True, "warmup_seconds": _state.seconds})
+    return JSONResponse({"ready": False, "error": _state.error}, status_code=503)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+import prepline_sec_filings.async_fetch as async_fetch
+from prepline_sec_filings.async_fetch import AsyncEdgarClient
+from prepline_sec_filings.cache import EdgarCache
+from prepline_sec_filings.fetch import SEC_ARCHIVE_URL, SEC_SUBMISSIONS_URL
+
+
+class NoWaitRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def try_acquire(self):
+        self.acquired += 1
+        return 0
+
+
+class MockEdgar:
+    """Serves filings after a delay given by their accession number, and fails accession
+    numbers ending in 9."""
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        url = str(request.url)
+        if url.startswith(SEC_SUBMISSIONS_URL):
+            # NOTE: Not in filing date order, so the most recent filing is not the first one
+            recent = {
+                "accessionNumber": [
+                    "0000000001-21-000001",
+                    "0000000001-22-000002",
+                    "0000000001-22-000003",
+                ],
+                "form": ["10-K", "10-K", "10-Q"],
+                "filingDate": ["2021-03-01", "2022-03-01", "2022-05-01"],
+            }
+            return httpx.Response(200, content=json.dumps({"filings": {"recent": recent}}))
+        assert url.startswith(SEC_ARCHIVE_URL)
+        filename = url.split("/")[-1]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(int(filename[-5]) / 100)
+        finally:
+            self.in_flight -= 1
+        if filename[-5] == "9":
+            return httpx.Response(404)
+        return httpx.Response(200, text=filename)
+
+
+def _client(transport, **kwargs):
+    return AsyncEdgarClient(
+        "Giant",
+        "parker@giant.com",
+        transport=transport,
+        rate_limiter=kwargs.pop("rate_limiter", NoWaitRateLimiter()),
+        **kwargs,
+    )
+
+
+def test_get_filing_sends_identity():
+    edgar = MockEdgar()
+
+    async def get_filing():
+        async with _client(httpx.MockTransport(edgar)) as client:
+            return await client.get_filing("949874", "000119312511215661")
+
+    assert asyncio.run(get_filing()) == "0001193125-11-215661.txt"
+    assert edgar.requests[0].headers["User-Agent"] == "Giant parker@giant.com"
+
+
+class ThreadRecordingCache(EdgarCache):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.threads = []
+
+    def get_filing(self, accession_number):
+        self.threads.append(threading.get_ident())
+        return super().get_filing(accession_number)
+
+    def put_filing(self, accession_number, content):
+        self.threads.append(threading.get_ident())
+        super().put_filing(accession_number, content)
+
+
+def test_get_filing_uses_cache_off_the_event_loop(tmp_path):
+    edgar = MockEdgar()
+    cache = ThreadRecordingCache(str(tmp_path))
+
+    async def get_filing():
+        async with _client(httpx.MockTransport(edgar), cache=cache) as client:
+            texts = [await client.get_filing("1", "000000000122000001") for _ in range(2)]
+            return texts, threading.get_ident()
+
+    texts, loop_thread = asyncio.run(get_filing())
+    assert texts == ["0000000001-22-000001.txt"] * 2
+    assert len(edgar.requests) == 1
+    # NOTE: Read, write, then read again
+    assert len(cache.threads) == 3
+    assert loop_thread not in cache.threads
+
+
+def test_get_recent_acc_by_cik():
+    async def get_recent_acc_by_cik():
+        async with _client(httpx.MockTransport(MockEdgar())) as client:
+            return await client.get_recent_acc_by_cik("1", "10-K")
+
+    assert asyncio.run(get_recent_acc_by_cik()) == ("000000000122000002", "10-K")
+
+
+def test_get_recent_acc_by_cik_without_filings():
+    async def get_recent_acc_by_cik():
+        async with _client(httpx.MockTransport(MockEdgar())) as client:
+            return await client.get_recent_acc_by_cik("1", "S-1")
+
+    with pytest.raises(ValueError):
+        asyncio.run(get_recent_acc_by_cik())
+
+
+def test_download_filings_yields_in_completion_order():
+    edgar = MockEdgar()
+    limiter = NoWaitRateLimiter()
+    filings = [("1", f"00000000012200000{delay}") for delay in (5, 1, 9, 3)]
+
+    async def download():
+        async with _client(httpx.MockTransport(edgar), rate_limiter=limiter) as client:
+            return [download async for download in client.download_filings(filings)]
+
+    downloads = asyncio.run(download())
+    assert [download.accession_number for download in downloads] == [
+        "000000000122000001",
+        "000000000122000003",
+        "000000000122000005",
+        "000000000122000009",
+    ]
+    assert downloads[0].text == "0000000001-22-000001.txt"
+    assert downloads[-1].text is None
+    assert isinstance(downloads[-1].error, httpx.HTTPStatusError)
+    assert edgar.max_in_flight == 4
+    assert limiter.acquired == 4
+
+
+def test_download_filings_bounds_concurrency():
+    edgar = MockEdgar()
+    filings = (("1", f"00000000012200{i:03}1") for i in range(20))
+
+    async def download():
+        async with _client(httpx.MockTransport(edgar), max_concurrency=3) as client:
+            return [download async for download in client.download_filings(filings)]
+
+    assert len(asyncio.run(download())) == 20
+    assert edgar.max_in_flight == 3
+
+
+def test_download_filings_cleans_up_when_stopped_early():
+    edgar = MockEdgar()
+    filings = [("1", f"00000000012200{i:03}5") for i in range(10)]
+
+    async def download():
+        async with _client(httpx.MockTransport(edgar), max_concurrency=3) as client:
+            downloads = client.download_filings(filings)
+            first = await downloads.__anext__()
+            await downloads.aclose()
+            others = asyncio.all_tasks() - {asyncio.current_task()}
+            return first, others
+
+    first, others = asyncio.run(download())
+    assert first.text is not None
+    assert others == set()
+    assert edgar.in_flight == 0
+
+
+def test_get_retries(monkeypatch):
+    sleeps = []
+
+    async def no_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(async_fetch.asyncio, "sleep", no_sleep)
+    closed = []
+    aclose = httpx.Response.aclose
+
+    async def recording_aclose(response):
+        closed.append(response.status_code)
+        await aclose(response)
+
+    monkeypatch.setattr(httpx.Response, "aclose", recording_aclose)
+    responses = [
+        httpx.ConnectError("refused"),
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(200, text="ok"),
+    ]
+
+    def handler(request):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def get():
+        async with _client(httpx.MockTransport(handler), backoff_factor=0.5) as client:
+            return await client.get("https://www.sec.gov")
+
+    assert asyncio.run(get()).text == "ok"
+    assert sleeps == [0.5, 3]
+    assert closed == [429]
+
+
+def test_requires_identity(monkeypatch):
+    monkeypatch.delenv("SEC_API_ORGANIZATION", raising=False)
+    monkeypatch.delenv("SEC_API_EMAIL", raising=False)
+    with pytest.raises(AssertionError):
+        AsyncEdgarClient()
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+
+from prepline_sec_filings.bulk_download import (
+    ChecksumMismatchError,
+    download_manifest,
+    read_checksums,
+    read_manifest,
+    sha256_file,
+    write_checksums,
+    write_manifest,
+)
+from prepline_sec_filings.fetch import EdgarClient
+
+MANIFEST = {
+    "mmm": {"cik": "66740", "forms": {"10-Q": "000006674022000065"}},
+    "aig": {"cik": "5272", "forms": {"10-K": "000110465922024701", "10-K/A": "000110465922000001"}},
+}
+MMM = "mmm-10-Q-66740-000006674022000065.xbrl"
+AIG = "aig-10-K-5272-000110465922024701.xbrl"
+AIG_AMENDMENT = "aig-10-KA-5272-000110465922000001.xbrl"
+
+
+def _body(url):
+    return f"<SEC-DOCUMENT>{url.split('/')[-1]}".encode()
+
+
+def _sha256(url):
+    return hashlib.sha256(_body(url)).hexdigest()
+
+
+class MockResponse:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {"Content-Length": str(len(body))}
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+class MockSession:
+    def __init__(self):
+        self.headers = {}
+        self.urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.urls.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return MockResponse(_body(url))
+
+
+class NoWaitRateLimiter:
+    def acquire(self):
+        pass
+
+
+def _client(session):
+    return EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+
+
+def _manifest():
+    return {ticker: dict(info, forms=dict(info["forms"])) for ticker, info in MANIFEST.items()}
+
+
+def test_download_manifest_records_checksums(tmp_path):
+    session = MockSession()
+    manifest = _manifest()
+    results = download_manifest(_client(session), manifest, str(tmp_path), max_workers=3)
+    assert sorted(os.listdir(tmp_path)) == sorted([MMM, AIG, AIG_AMENDMENT])
+    assert all(result.error is None and not result.skipped for result in results)
+    assert session.max_in_flight == 3
+    url = (
+        "https://www.sec.gov/Archives/edgar/data/66740/000006674022000065/0000066740-22-000065.txt"
+    )
+    assert url in session.urls
+    assert manifest["mmm"]["files"]["10-Q"] == {"sha256": _sha256(url), "size": len(_body(url))}
+    assert manifest["mmm"]["forms"] == MANIFEST["mmm"]["forms"]
+
+    # NOTE: Everything is there and matches its recorded checksum, so nothing is downloaded
+    session = MockSession()
+    results = download_manifest(_client(session), manifest, str(tmp_path))
+    assert session.urls == []
+    assert all(result.skipped for result in results)
+
+
+def test_download_manifest_replaces_truncated_files(tmp_path):
+    session = MockSession()
+    manifest = _manifest()
+    download_manifest(_client(session), manifest, str(tmp_path))
+    with open(tmp_path / MMM, "r+b") as f:
+        f.truncate(5)
+
+    session = MockSession()
+    results = download_manifest(_client(session), manifest, str(tmp_path))
+    assert len(session.urls) == 1
+    assert [result.path for result in results if not result.skipped] == [str(tmp_path / MMM)]
+    assert sha256_file(str(tmp_path / MMM))[0] == manifest["mmm"]["files"]["10-Q"]["sha256"]
+
+
+def test_download_manifest_reports_checksum_mismatch(tmp_path):
+    checksums = {f"sample-docs/{AIG}": "0" * 64}
+    manifest = _manifest()
+    results = download_manifest(_client(MockSession()), manifest, str(tmp_path), checksums)
+    errors = {os.path.basename(result.path): result.error for result in results}
+    assert isinstance(errors[AIG], ChecksumMismatchError)
+    assert errors[MMM] is None
+    assert "10-K" not in manifest["aig"]["files"]
+
+
+def test_checksums_round_trip(tmp_path):
+    path = str(tmp_path / "sample-sec-docs.sha256")
+    checksums = {"sample-docs/b.xbrl": "b" * 64, "sample-docs/a.xbrl": "a" * 64}
+    write_checksums(path, checksums)
+    assert open(path).readline() == f"{'a' * 64}  sample-docs/a.xbrl\n"
+    assert read_checksums(path) == checksums
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "sec_docs_manifest.json")
+    write_manifest(path, MANIFEST)
+    assert read_manifest(path) == MANIFEST
+
+
+def test_download_manifest_transforms_downloads(tmp_path):
+    def lowercase(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data.lower())
+
+    url = (
+        "https://www.sec.gov/Archives/edgar/data/66740/000006674022000065/0000066740-22-000065.txt"
+    )
+    checksums = {MMM: hashlib.sha256(_body(url).lower()).hexdigest()}
+    results = download_manifest(
+        _client(MockSession()), _manifest(), str(tmp_path), checksums, transform=lowercase
+    )
+    assert all(result.error is None for result in results)
+    assert (tmp_path / MMM).read_bytes() == _body(url).lower()
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+
+import pytest
+
+from prepline_sec_filings.cache import CachedResponse, EdgarCache
+import prepline_sec_filings.fetch as fetch
+
+
+def test_filings_round_trip(tmp_path):
+    cache = EdgarCache(str(tmp_path))
+    assert cache.get_filing("000119312511215661") is None
+    cache.put_filing("000119312511215661", b"<SEC-DOCUMENT>")
+    assert cache.get_filing("000119312511215661") == b"<SEC-DOCUMENT>"
+    # NOTE: Shared with other instances, e.g. in other processes
+    assert EdgarCache(str(tmp_path)).get_filing("000119312511215661") == b"<SEC-DOCUMENT>"
+
+
+def test_submissions_round_trip(tmp_path):
+    cache = EdgarCache(str(tmp_path), max_age=60)
+    cache.put_submissions("1234", b'{"a":\n1}', etag='"abc"', last_modified="yesterday")
+    entry = cache.get_submissions("1234")
+    assert entry.content == b'{"a":\n1}'
+    assert cache.is_fresh(entry)
+    assert not cache.is_fresh(entry._replace(stored_at=time.time() - 61))
+    assert cache.revalidation_headers(entry) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "yesterday",
+    }
+    assert cache.revalidation_headers(CachedResponse(b"")) == {}
+
+
+@pytest.mark.parametrize("name", ["../../x", "..", "pages/CIK1.json", "..\\x", ""])
+def test_submissions_pages_stay_in_the_cache(tmp_path, name):
+    cache = EdgarCache(str(tmp_path / "cache"))
+    with pytest.raises(ValueError):
+        cache.put_submissions_page(name, b"{}")
+    with pytest.raises(ValueError):
+        cache.get_submissions_page(name)
+    cache.put_submissions_page("CIK1-submissions-001.json", b"{}")
+    assert cache.get_submissions_page("CIK1-submissions-001.json").content == b"{}"
+    assert not (tmp_path / "x").exists()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = EdgarCache(str(tmp_path), max_bytes=350)
+    for i in range(3):
+        cache.put_filing(str(i), b"x" * 100)
+        path = os.path.join(tmp_path, "filings", f"{i}.txt")
+        os.utime(path, (1000 + i, 1000 + i))
+    # NOTE: Reading 0 makes 1 the least recently used
+    assert cache.get_filing("0") is not None
+    cache.put_filing("3", b"x" * 100)
+    assert cache.get_filing("1") is None
+    assert all(cache.get_filing(key) is not None for key in ("0", "2", "3"))
+    assert cache.size() == 300
+
+
+def test_overwriting_entries_counts_their_size_once(tmp_path):
+    cache = EdgarCache(str(tmp_path))
+    cache.put_filing("0", b"x" * 100)
+    for i in range(5):
+        cache.put_submissions("66740", b"{}" * (50 + i), etag=f'"{i}"')
+        cache.put_filing("0", b"x" * 100)
+    stored = sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory in (tmp_path / "filings", tmp_path / "submissions")
+        for name in os.listdir(directory)
+    )
+    assert cache.size() == stored
+    assert EdgarCache(str(tmp_path)).size() == stored
+
+
+def test_concurrent_writes(tmp_path):
+    cache = EdgarCache(str(tmp_path))
+
+    def write(i):
+        for _ in range(20):
+            cache.put_filing("same", bytes([i]) * 1000)
+            assert cache.get_filing("same") in {bytes([j]) * 1000 for j in range(8)}
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(os.path.join(tmp_path, "filings")) == ["same.txt"]
+    assert cache.size() == 1000
+
+
+class MockResponse:
+    def __init__(self, status_code=200, text="", content=b"", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+
+class RecordingSession:
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, headers))
+        return self.responses.pop(0)
+
+
+class CountingRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+def _client(tmp_path, responses, max_age=600):
+    return fetch.EdgarClient(
+        session=RecordingSession(responses),
+        rate_limiter=CountingRateLimiter(),
+        cache=EdgarCache(str(tmp_path), max_age=max_age),
+    )
+
+
+def test_client_caches_filings(tmp_path):
+    client = _client(tmp_path, [MockResponse(text="filing")])
+    assert client.get_filing("949874", "0001193125-11-215661") == "filing"
+    assert client.get_filing("949874", "000119312511215661") == "filing"
+    assert len(client.session.requests) == 1
+    # NOTE: Cache hits do not take from the rate limit
+    assert client.rate_limiter.acquired == 1
+
+
+def test_client_revalidates_submissions(tmp_path):
+    submissions = b'{"filings": {"recent": {"accessionNumber": ["1-22-3"], "form": ["10-K"]}}}'
+    client = _client(
+        tmp_path,
+        [
+            MockResponse(content=submissions, headers={"ETag": '"v1"'}),
+            MockResponse(status_code=304),
+        ],
+        max_age=0,
+    )
+    assert client.get_forms_by_cik("1234") == {"1-22-3": "10-K"}
+    assert client.get_forms_by_cik("1234") == {"1-22-3": "10-K"}
+    assert client.session.requests[0][1] == {}
+    assert client.session.requests[1][1] == {"If-None-Match": '"v1"'}
+
+
+def test_client_serves_fresh_submissions_from_cache(tmp_path):
+    submissions = b'{"filings": {"recent": {"accessionNumber": [], "form": []}}}'
+    client = _client(tmp_path, [MockResponse(content=submissions)])
+    assert client.get_submissions("1234") == client.get_submissions("1234")
+    assert len(client.session.requests) == 1
+
+
+def test_client_caches_company_tickers(tmp_path):
+    company_tickers = b'{"0": {"cik_str": 66740, "ticker": "MMM", "title": "3M CO"}}'
+    client = _client(tmp_path, [MockResponse(content=company_tickers)])
+    assert client.tickers.resolve("mmm") == "0000066740"
+    # NOTE: Another client, e.g. in the next run, reuses the stored mapping
+    other = _client(tmp_path, [])
+    assert other.tickers.resolve("mmm") == "0000066740"
+    assert other.cache.size() == 0
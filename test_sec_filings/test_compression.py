@@ -0,0 +1,138 @@
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from prepline_sec_filings import compression
+
+zstandard = pytest.importorskip("zstandard")
+
+LARGE_TEXT = "The business could be attacked by wolverines. " * 200
+
+
+def _build_app(**kwargs):
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE_TEXT)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("bears")
+
+    @app.get("/stream")
+    def stream():
+        def chunks():
+            for _ in range(3):
+                yield LARGE_TEXT
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(compression.CompressionMiddleware, **kwargs)
+    return app
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("zstd", "zstd"),
+        ("gzip, zstd", "zstd"),
+        ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+        ("br", None),
+        ("*", "zstd"),
+        ("*;q=0, gzip", "gzip"),
+        ("identity", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert compression.negotiate_encoding(accept_encoding, ["zstd", "gzip"]) == expected
+
+
+def test_parse_accept_encoding():
+    assert compression.parse_accept_encoding("gzip;q=0.5, zstd, br;q=bad") == {
+        "gzip": 0.5,
+        "zstd": 1.0,
+        "br": 0.0,
+    }
+
+
+def test_gzip_response():
+    client = TestClient(_build_app())
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(LARGE_TEXT)
+    assert response.text == LARGE_TEXT
+
+
+def test_zstd_response():
+    client = TestClient(_build_app())
+    response = client.get("/large", headers={"Accept-Encoding": "zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    # httpx does not decode zstd, so decompress here
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+    assert body.decode() == LARGE_TEXT
+
+
+def test_response_below_minimum_size_is_not_compressed():
+    client = TestClient(_build_app())
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "bears"
+
+
+def test_minimum_size_is_configurable():
+    client = TestClient(_build_app(minimum_size=1))
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "bears"
+
+
+def test_no_accept_encoding_is_not_compressed():
+    client = TestClient(_build_app())
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == LARGE_TEXT
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_streaming_response(encoding):
+    client = TestClient(_build_app())
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": encoding}) as response:
+        assert response.headers["content-encoding"] == encoding
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+
+    if encoding == "gzip":
+        body = gzip.decompress(raw)
+    else:
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    assert body.decode() == LARGE_TEXT * 3
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compressor_flushes_each_chunk(encoding):
+    compressor = compression.get_compressor(encoding, 6, 3)
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    else:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    # Each chunk must be decodable as soon as it arrives
+    for _ in range(3):
+        chunk = compressor.compress(LARGE_TEXT.encode(), final=False)
+        assert decompressor.decompress(chunk) == LARGE_TEXT.encode()
+    assert decompressor.decompress(compressor.compress(b"", final=True)) == b""
+
+
+def test_get_compressor_raises_for_unknown_encoding():
+    with pytest.raises(ValueError):
+        compression.get_compressor("br", 6, 3)
@@ -0,0 +1,92 @@
+from prepline_sec_filings.delta import (
+    SectionDelta,
+    delta_from_store,
+    filing_delta,
+    normalized_hash,
+    prior_filing,
+    section_delta,
+    sections_delta,
+)
+from prepline_sec_filings.section_store import SectionStore, StoredFiling
+
+
+def _elements(*texts):
+    return [{"text": text, "type": "NarrativeText"} for text in texts]
+
+
+def test_normalized_hash_ignores_formatting():
+    assert normalized_hash("We may lose  money.") == normalized_hash("we may lose money")
+    assert normalized_hash("We may lose money.") != normalized_hash("We may make money.")
+
+
+def test_section_delta():
+    prior = _elements("Competition is intense.", "We may lose money.", "Rates may rise.")
+    current = _elements("We may lose money", "Tariffs may hurt us.", "Competition is  intense.")
+    assert section_delta(prior, current) == SectionDelta(
+        added=_elements("Tariffs may hurt us."),
+        removed=_elements("Rates may rise."),
+        unchanged=_elements("We may lose money", "Competition is  intense."),
+    )
+
+
+def test_section_delta_counts_repeated_elements():
+    delta = section_delta(_elements("Risk.", "Risk.", "Other.", "Risk."), _elements("Risk."))
+    assert delta.unchanged == _elements("Risk.")
+    assert delta.removed == _elements("Risk.", "Other.", "Risk.")
+    assert delta.added == []
+
+
+def test_sections_delta_compares_missing_sections_as_empty():
+    prior = {"RISK_FACTORS": _elements("Risk."), "MANAGEMENT_DISCUSSION": _elements("Growth.")}
+    current = {"RISK_FACTORS": _elements("Risk."), "BUSINESS": _elements("We sell.")}
+    delta = sections_delta(prior, current)
+    assert list(delta) == ["RISK_FACTORS", "BUSINESS", "MANAGEMENT_DISCUSSION"]
+    assert delta["BUSINESS"].added == _elements("We sell.")
+    assert delta["MANAGEMENT_DISCUSSION"].removed == _elements("Growth.")
+
+
+def test_filing_delta():
+    def extract(text, sections):
+        return {section: _elements(*text.split("|")) for section in sections}
+
+    delta = filing_delta("Risk A.|Risk B.", "Risk B.|Risk C.", ["RISK_FACTORS"], extract=extract)
+    assert delta["RISK_FACTORS"].added == _elements("Risk C.")
+    assert delta["RISK_FACTORS"].removed == _elements("Risk A.")
+
+
+def test_delta_from_store(tmp_path):
+    filings = [
+        StoredFiling("000000000121000001", "1", "10-K", "2021-03-01"),
+        StoredFiling("000000000122000001", "1", "10-K", "2022-03-01"),
+        StoredFiling("000000000122000002", "1", "10-Q", "2022-05-01"),
+        StoredFiling("000000000222000001", "2", "10-K", "2022-03-01"),
+    ]
+    with SectionStore(str(tmp_path / "sections.db")) as store:
+        store.put_many(
+            [
+                (filings[0], {"RISK_FACTORS": _elements("Old risk.")}),
+                (filings[1], {"RISK_FACTORS": _elements("Old risk.", "Risk.")}),
+                (filings[2], {"RISK_FACTORS": _elements("Quarterly risk.")}),
+                (filings[3], {"RISK_FACTORS": _elements("Other company.")}),
+            ]
+        )
+        current = StoredFiling("000000000123000001", "1", "10-K", "2023-03-01")
+        sections = {"RISK_FACTORS": _elements("Risk.", "New risk.")}
+        assert prior_filing(store, current).accession_number == "000000000122000001"
+
+        prior, delta = delta_from_store(store, current, sections)
+        assert prior.accession_number == "000000000122000001"
+        assert delta == {
+            "RISK_FACTORS": SectionDelta(
+                _elements("New risk."), _elements("Old risk."), _elements("Risk.")
+            )
+        }
+
+        # NOTE: Defaults to the stored sections of the filing
+        prior, delta = delta_from_store(store, filings[1])
+        assert prior.accession_number == "000000000121000001"
+        assert delta["RISK_FACTORS"].added == _elements("Risk.")
+
+        prior, delta = delta_from_store(store, filings[0])
+        assert prior is None
+        assert delta["RISK_FACTORS"].added == _elements("Old risk.")
@@ -0,0 +1,185 @@
+import gzip
+import json
+import os
+
+import pytest
+import requests
+import zstandard
+
+import prepline_sec_filings.download as download_module
+from prepline_sec_filings.download import IncompleteDownloadError, download, download_filing
+from prepline_sec_filings.fetch import EdgarClient
+
+BODY = bytes(range(256)) * 400
+URL = "https://www.sec.gov/Archives/edgar/data/1/0000000001-22-000001.txt"
+
+
+class MockResponse:
+    def __init__(self, body, status_code=200, headers=None, fail_after=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.fail_after = fail_after
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            yield self.body[start : start + chunk_size]  # noqa: E203
+
+    def close(self):
+        self.closed = True
+
+
+class RangeSession:
+    """Serves body with support for Range and If-Range requests. The first failures responses
+    are cut off after fail_after bytes."""
+
+    def __init__(self, body=BODY, failures=0, fail_after=None, etag='"v1"'):
+        self.headers = {}
+        self.body = body
+        self.failures = failures
+        self.fail_after = fail_after
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        assert kwargs["stream"]
+        headers = headers or {}
+        self.requests.append(headers)
+        fail_after = None
+        if self.failures:
+            self.failures -= 1
+            fail_after = self.fail_after
+        response_headers = {"ETag": self.etag}
+        if "Range" in headers and headers.get("If-Range") == self.etag:
+            start = int(headers["Range"][len("bytes=") : -1])  # noqa: E203
+            if start >= len(self.body):
+                return MockResponse(b"", 416)
+            response_headers[
+                "Content-Range"
+            ] = f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+            return MockResponse(self.body[start:], 206, response_headers, fail_after)
+        response_headers["Content-Length"] = str(len(self.body))
+        return MockResponse(self.body, 200, response_headers, fail_after)
+
+
+class NoWaitRateLimiter:
+    def acquire(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(download_module.time, "sleep", lambda seconds: None)
+
+
+def _client(session, max_retries=5):
+    return EdgarClient(session=session, rate_limiter=NoWaitRateLimiter(), max_retries=max_retries)
+
+
+def _read_zstd(path):
+    with open(path, "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        return reader.read()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd", None])
+def test_download(tmp_path, compression):
+    path = str(tmp_path / "filing")
+    result = download(_client(RangeSession()), URL, path, compression, chunk_size=1000)
+    assert result.size == len(BODY)
+    assert result.stored_size == os.path.getsize(path)
+    assert result.resumed_from == 0
+    if compression == "gzip":
+        assert gzip.open(path).read() == BODY
+        assert result.stored_size < len(BODY)
+    elif compression == "zstd":
+        assert _read_zstd(path) == BODY
+    else:
+        assert open(path, "rb").read() == BODY
+    assert os.listdir(tmp_path) == ["filing"]
+
+
+def test_download_resumes_within_call(tmp_path):
+    session = RangeSession(failures=2, fail_after=30000)
+    path = str(tmp_path / "filing.gz")
+    result = download(_client(session), URL, path, chunk_size=1000, checkpoint_size=10000)
+    assert gzip.open(path).read() == BODY
+    assert result.resumed_from == 0
+    assert "Range" not in session.requests[0]
+    assert session.requests[1]["Range"] == "bytes=30000-"
+    assert session.requests[1]["If-Range"] == '"v1"'
+    assert session.requests[2]["Range"] == "bytes=60000-"
+
+
+def test_download_resumes_across_calls(tmp_path):
+    path = str(tmp_path / "filing.gz")
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        download(
+            _client(RangeSession(failures=1, fail_after=25000), max_retries=0),
+            URL,
+            path,
+            chunk_size=1000,
+            checkpoint_size=10000,
+        )
+    assert not os.path.exists(path)
+    state = json.load(open(path + ".part.json"))
+    assert state["raw_bytes"] == 20000
+    assert os.path.getsize(path + ".part") == state["stored_bytes"]
+
+    session = RangeSession()
+    result = download(_client(session), URL, path, chunk_size=1000, checkpoint_size=10000)
+    assert result.resumed_from == 20000
+    assert session.requests[0]["Range"] == "bytes=20000-"
+    assert gzip.open(path).read() == BODY
+    assert sorted(os.listdir(tmp_path)) == ["filing.gz"]
+
+
+def test_download_restarts_if_range_is_ignored(tmp_path):
+    path = str(tmp_path / "filing.gz")
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        download(
+            _client(RangeSession(failures=1, fail_after=25000), max_retries=0),
+            URL,
+            path,
+            checkpoint_size=10000,
+            chunk_size=1000,
+        )
+    # NOTE: The file changed, so the server sends all of it instead of the range
+    session = RangeSession(body=BODY[::-1], etag='"v2"')
+    result = download(_client(session), URL, path, chunk_size=1000, checkpoint_size=10000)
+    assert session.requests[0]["Range"] == "bytes=20000-"
+    assert gzip.open(path).read() == BODY[::-1]
+    assert result.size == len(BODY)
+
+
+def test_download_fails_if_incomplete(tmp_path):
+    class ShortSession(RangeSession):
+        def get(self, url, headers=None, **kwargs):
+            response = super().get(url, headers, **kwargs)
+            response.body = response.body[:-10]
+            return response
+
+    path = str(tmp_path / "filing.gz")
+    with pytest.raises(IncompleteDownloadError):
+        download(_client(ShortSession(), max_retries=1), URL, path)
+    assert not os.path.exists(path)
+
+
+def test_download_filing(tmp_path):
+    class RecordingSession(RangeSession):
+        def get(self, url, headers=None, **kwargs):
+            self.url = url
+            return super().get(url, headers, **kwargs)
+
+    session = RecordingSession()
+    path = str(tmp_path / "filings" / "949874.txt.gz")
+    download_filing(_client(session), "949874", "0001193125-11-215661", path)
+    assert session.url.endswith("/949874/000119312511215661/0001193125-11-215661.txt")
+    assert gzip.open(path).read() == BODY
@@ -0,0 +1,171 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from prepline_sec_filings.extraction import SectionResult, extract_sections_for_tickers
+from prepline_sec_filings.filing_index import Filing
+from prepline_sec_filings.section_store import SectionStore
+from prepline_sec_filings.state import EXTRACTED, FAILED, StateStore
+
+
+def fake_extract(text, sections):
+    if "broken" in text:
+        raise ValueError("could not parse")
+    time.sleep(0.05)
+    return {section: [{"text": text, "type": "NarrativeText"}] for section in sections}
+
+
+CIKS = {"mmm": "66740", "aapl": "320193", "bad": "1"}
+
+
+class FakeClient:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.downloaded = []
+        self.lock = threading.Lock()
+
+    def get_cik_by_ticker(self, ticker):
+        if ticker == "nope":
+            raise IndexError("no CIK found")
+        return CIKS.get(ticker, ticker[1:])
+
+    def get_latest_filing(self, cik, form_type, allow_amended_filing=True):
+        return Filing(f"{int(cik):010}22000001", form_type, datetime.date(2022, 2, 9), "")
+
+    def get_filing(self, cik, accession_number):
+        time.sleep(self.delay)
+        with self.lock:
+            self.downloaded.append(cik)
+        return "broken" if cik == CIKS["bad"] else f"filing of {cik}"
+
+
+def _extract(tickers, client, **kwargs):
+    return extract_sections_for_tickers(
+        tickers,
+        "10-K",
+        ["RISK_FACTORS"],
+        client=client,
+        warm_up=False,
+        extract=fake_extract,
+        **kwargs,
+    )
+
+
+def test_extract_sections_for_tickers():
+    results = {
+        result.ticker: result
+        for result in _extract(["mmm", "nope", "bad", "aapl"], FakeClient(), workers=2)
+    }
+    assert sorted(results) == ["aapl", "bad", "mmm", "nope"]
+    assert results["mmm"] == SectionResult(
+        "mmm",
+        "66740",
+        "000006674022000001",
+        "10-K",
+        {"RISK_FACTORS": [{"text": "filing of 66740", "type": "NarrativeText"}]},
+        filing_date=datetime.date(2022, 2, 9),
+    )
+    assert isinstance(results["nope"].error, IndexError)
+    assert results["nope"].cik is None
+    assert isinstance(results["bad"].error, ValueError)
+    assert results["bad"].cik == "1"
+
+
+def test_extract_sections_for_tickers_bounds_queue():
+    client = FakeClient()
+    results = _extract(
+        [f"t{i}" for i in range(20)], client, workers=1, download_workers=4, queue_size=1
+    )
+    next(results)
+    # NOTE: The second filing can only be downloaded once the first has been extracted
+    assert len(client.downloaded) <= 2
+    results.close()
+    assert len(client.downloaded) <= 3
+
+
+def test_extract_sections_for_tickers_overlaps_downloads_and_extraction():
+    client = FakeClient(delay=0.05)
+    started = time.perf_counter()
+    results = list(_extract([f"t{i}" for i in range(16)], client, workers=1, download_workers=1))
+    elapsed = time.perf_counter() - started
+    assert len(results) == 16
+    # NOTE: 0.8s of downloads and 0.8s of extraction, run one after the other would take 1.6s
+    assert elapsed < 1.4
+
+
+# NOTE: Held by a download thread while the extraction processes start
+DOWNLOAD_LOCK = threading.Lock()
+
+
+def extract_with_download_lock(text, sections):
+    # NOTE: A process forked while a download holds the lock would wait for it forever
+    if not DOWNLOAD_LOCK.acquire(timeout=5):
+        raise RuntimeError("inherited a lock held by a download thread")
+    DOWNLOAD_LOCK.release()
+    return fake_extract(text, sections)
+
+
+class LockingClient(FakeClient):
+    def get_filing(self, cik, accession_number):
+        if cik == "4":
+            with DOWNLOAD_LOCK:
+                time.sleep(1)
+        else:
+            # NOTE: Lets the other download take the lock first
+            time.sleep(0.2)
+        return super().get_filing(cik, accession_number)
+
+
+def test_extract_sections_for_tickers_starts_processes_while_downloading():
+    results = extract_sections_for_tickers(
+        ["t3", "t4"],
+        "10-K",
+        ["RISK_FACTORS"],
+        client=LockingClient(),
+        workers=1,
+        download_workers=2,
+        warm_up=False,
+        extract=extract_with_download_lock,
+    )
+    assert {result.ticker: result.error for result in results} == {"t3": None, "t4": None}
+
+
+def test_extract_sections_for_tickers_validates_sections():
+    with pytest.raises(ValueError):
+        list(extract_sections_for_tickers(["mmm"], "10-K", ["NOT_A_SECTION"], client=FakeClient()))
+
+
+def test_extract_sections_for_tickers_skips_current_filings(tmp_path):
+    path = str(tmp_path / "state.db")
+    with StateStore(path) as state:
+        client = FakeClient()
+        first = {result.ticker: result for result in _extract(["mmm", "bad"], client, state=state)}
+        assert sorted(client.downloaded) == ["1", "66740"]
+        assert state.get("000006674022000001").status == EXTRACTED
+        assert state.get("000000000122000001").status == FAILED
+
+        client = FakeClient()
+        second = {result.ticker: result for result in _extract(["mmm", "bad"], client, state=state)}
+        # NOTE: Only the filing that failed is downloaded and extracted again
+        assert client.downloaded == ["1"]
+        assert second["mmm"].skipped
+        assert second["mmm"].sections == first["mmm"].sections
+        assert not second["bad"].skipped
+
+    with StateStore(path, version="0.0.0") as state:
+        client = FakeClient()
+        results = list(_extract(["mmm"], client, state=state))
+        assert client.downloaded == ["66740"]
+        assert not results[0].skipped
+
+
+def test_extract_sections_for_tickers_stores_sections(tmp_path):
+    with SectionStore(str(tmp_path / "sections.db")) as store:
+        results = list(_extract(["mmm", "bad", "aapl"], FakeClient(), store=store))
+        assert len(results) == 3
+        stored = store.query("RISK_FACTORS", ciks=[66740, 320193], start="2022-01-01")
+        assert sorted(section.cik for section in stored) == ["320193", "66740"]
+        assert store.get_filing("000006674022000001").ticker == "mmm"
+        assert store.filings(ciks=[1]) == []
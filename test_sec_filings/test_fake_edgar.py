@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import pytest
+
+from prepline_sec_filings.fetch import EdgarClient
+from prepline_sec_filings.rate_limiter import RateLimiter
+
+# NOTE: The scripts in test_utils import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "test_utils"))
+
+import benchmark_fetch  # noqa: E402
+from fake_edgar import FakeEdgar, edgar_session, load_filings, running  # noqa: E402
+
+
+@pytest.fixture
+def filings():
+    return load_filings(synthetic_scale=1)[:3]
+
+
+def test_fake_edgar_serves_primary_documents(filings):
+    edgar = FakeEdgar(filings, throttle_rate=None)
+    with running(edgar) as url:
+        client = EdgarClient(session=edgar_session(url), rate_limiter=RateLimiter(1000))
+        for filing in filings:
+            assert client.find_primary_document(filing.cik, filing.accession_number) == (
+                filing.primary_document,
+                filing.form_type,
+            )
+            text = client.get_primary_document(filing.cik, filing.accession_number)
+            assert f"<TYPE>{filing.form_type}" in text
+            assert filing.primary_document_content.decode("utf-8") in text
+            assert "<SEC-HEADER>" not in text
+    # NOTE: Two requests for the filing index and one for the document of each filing
+    assert edgar.stats()["statuses"] == {"200": 3 * len(filings)}
+
+
+@pytest.mark.parametrize("document", benchmark_fetch.DOCUMENTS)
+def test_benchmark_fetch(tmp_path, document):
+    output = tmp_path / "report.json"
+    benchmark_fetch.main(
+        [
+            "--filings=4",
+            "--concurrency=2",
+            f"--document={document}",
+            "--rate=1000",
+            "--latency=0",
+            "--throttle-rate=0",
+            "--synthetic-scale=1",
+            f"--output={output}",
+        ]
+    )
+    with open(output) as f:
+        (scenario,) = json.load(f)["scenarios"]
+    assert scenario["document"] == document
+    assert scenario["errors"] == 0
+    assert scenario["retries"] == 0
+    assert scenario["server"]["statuses"] == {"200": scenario["server"]["requests"]}
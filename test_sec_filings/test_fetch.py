@@ -18,14 +18,32 @@ response_content = {
                 "1234567890-12-345681",
             ],
             "form": ["10-K", "S-1", "10-K", "10-Q"],
+            "filingDate": ["2022-12-01", "2022-11-01", "2022-10-01", "2022-09-01"],
         }
     }
 }
 
 
+company_tickers = {
+    "0": {"cik_str": 66740, "ticker": "MMM", "title": "3M CO"},
+    "1": {"cik_str": 1067983, "ticker": "BRK-B", "title": "BERKSHIRE HATHAWAY INC"},
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_default_clients():
+    fetch._default_clients.clear()
+    yield
+    fetch._default_clients.clear()
+
+
 class MockSession:
     def __init__(self):
         self.headers = dict()
+        self.adapters = dict()
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
 
     def get(self, url, **kwargs):
         if url.startswith(fetch.SEC_ARCHIVE_URL):
@@ -41,18 +59,26 @@ class MockSession:
                 "",
                 content=json.dumps(response_content),
             )
+        elif url == fetch.SEC_COMPANY_TICKERS_URL:
+            return MockResponse("", content=json.dumps(company_tickers))
         else:
             raise ValueError
 
 
 class MockResponse:
-    def __init__(self, text, content=None):
+    def __init__(self, text, content=None, status_code=200, headers=None):
         self.text = text
         self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
 
     def raise_for_status(self):
         pass
 
+    def close(self):
+        self.closed = True
+
 
 def test_get_filing(monkeypatch):
     monkeypatch.setattr(requests, "Session", MockSession)
@@ -255,3 +281,263 @@ def test_get_recent_acc_by_cik(monkeypatch, formtype, cid, expected_acc_num):
     )
     assert acc_num == expected_acc_num
     assert recvd_formtype == formtype
+
+
+def test_requests_share_the_rate_limiter(monkeypatch):
+    acquired = []
+
+    class MockRateLimiter:
+        def acquire(self):
+            acquired.append(True)
+
+    monkeypatch.setattr(requests, "Session", MockSession)
+    monkeypatch.setattr(fetch, "get_rate_limiter", MockRateLimiter)
+    fetch.get_form_by_ticker("mmm", "10-K", company="Giant", email="parker@giant.com")
+    # NOTE: Ticker to CIK mapping, recent filings and the filing itself
+    assert len(acquired) == 3
+
+
+class NoWaitRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+class FlakySession(MockSession):
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_get_default_client_reuses_the_session(monkeypatch):
+    monkeypatch.setattr(requests, "Session", MockSession)
+    client = fetch.get_default_client("Giant", "parker@giant.com")
+    assert fetch.get_default_client("Giant", "parker@giant.com") is client
+    assert fetch.get_default_client("Other", "parker@giant.com") is not client
+    assert client.session.adapters["https://"]._pool_maxsize == fetch.DEFAULT_POOL_SIZE
+
+
+def test_edgar_client_retries_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(fetch.time, "sleep", sleeps.append)
+    session = FlakySession(
+        [
+            requests.ConnectionError(),
+            MockResponse("", status_code=503),
+            MockResponse("", status_code=500),
+            MockResponse("filing"),
+        ]
+    )
+    limiter = NoWaitRateLimiter()
+    client = fetch.EdgarClient(session=session, backoff_factor=0.5, rate_limiter=limiter)
+    assert client.get_filing("949874", "000119312511215661") == "filing"
+    assert sleeps == [0.5, 1, 2]
+    # NOTE: Retries count against the rate limit too
+    assert limiter.acquired == 4
+
+
+@pytest.mark.parametrize(
+    "retry_after, expected",
+    [("7", 7), ("Wed, 21 Oct 2015 07:28:00 GMT", 0), ("soon", 0.5)],
+)
+def test_edgar_client_respects_retry_after(monkeypatch, retry_after, expected):
+    sleeps = []
+    monkeypatch.setattr(fetch.time, "sleep", sleeps.append)
+    session = FlakySession(
+        [MockResponse("", status_code=429, headers={"Retry-After": retry_after}), MockResponse("")]
+    )
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    assert client.get("https://www.sec.gov").status_code == 200
+    assert sleeps == [expected]
+
+
+def test_edgar_client_closes_retried_streamed_responses(monkeypatch):
+    monkeypatch.setattr(fetch.time, "sleep", lambda seconds: None)
+    unavailable = MockResponse("", status_code=503)
+    session = FlakySession([unavailable, MockResponse("filing")])
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    response = client.get("https://www.sec.gov", stream=True)
+    assert response.text == "filing"
+    assert unavailable.closed
+    assert not response.closed
+
+
+def test_edgar_client_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(fetch.time, "sleep", lambda seconds: None)
+    session = FlakySession([MockResponse("", status_code=503)] * 3 + [requests.Timeout()] * 3)
+    client = fetch.EdgarClient(session=session, max_retries=2, rate_limiter=NoWaitRateLimiter())
+    assert client.get("https://www.sec.gov").status_code == 503
+    assert session.calls == 3
+    with pytest.raises(requests.Timeout):
+        client.get("https://www.sec.gov")
+
+
+def test_get_ciks_by_tickers(monkeypatch):
+    session = MockSession()
+    requested = []
+    get = session.get
+
+    def recording_get(url, **kwargs):
+        requested.append(url)
+        if url.startswith(fetch.SEC_SEARCH_URL) and "unknown" in url:
+            return MockResponse("<html>No matching Ticker Symbol.</html>")
+        return get(url, **kwargs)
+
+    session.get = recording_get
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    assert client.get_ciks_by_tickers(["mmm", "brk.b", "noice", "unknown"]) == {
+        "mmm": "0000066740",
+        "brk.b": "0001067983",
+        "noice": "1234567890",
+        "unknown": None,
+    }
+    # NOTE: The mapping is downloaded once, and only misses are searched
+    assert requested.count(fetch.SEC_COMPANY_TICKERS_URL) == 1
+    assert len(requested) == 3
+    assert client.get_cik_by_ticker("MMM") == "0000066740"
+    assert len(requested) == 3
+
+
+def test_get_cik_by_ticker_falls_back_to_search():
+    session = MockSession()
+    get = session.get
+
+    def get_without_mapping(url, **kwargs):
+        if url == fetch.SEC_COMPANY_TICKERS_URL:
+            raise requests.ConnectionError()
+        return get(url, **kwargs)
+
+    session.get = get_without_mapping
+    client = fetch.EdgarClient(session=session, max_retries=0, rate_limiter=NoWaitRateLimiter())
+    assert client.get_cik_by_ticker("mmm") == "1234567890"
+
+
+def test_session_functions_download_ticker_mapping_once():
+    session = MockSession()
+    requested = []
+    get = session.get
+
+    def recording_get(url, **kwargs):
+        requested.append(url)
+        return get(url, **kwargs)
+
+    session.get = recording_get
+    for _ in range(5):
+        assert fetch.get_cik_by_ticker(session, "mmm") == "0000066740"
+    assert requested.count(fetch.SEC_COMPANY_TICKERS_URL) == 1
+
+
+def test_ticker_resolver_backs_off_after_failure():
+    session = MockSession()
+    requested = []
+    get = session.get
+
+    def get_without_mapping(url, **kwargs):
+        requested.append(url)
+        if url == fetch.SEC_COMPANY_TICKERS_URL:
+            raise requests.ConnectionError()
+        return get(url, **kwargs)
+
+    session.get = get_without_mapping
+    client = fetch.EdgarClient(session=session, max_retries=0, rate_limiter=NoWaitRateLimiter())
+    ciks = client.get_ciks_by_tickers(["mmm", "aapl", "msft"])
+    assert ciks == dict.fromkeys(["mmm", "aapl", "msft"], "1234567890")
+    # NOTE: The mapping is tried once, and the other lookups go straight to the search
+    assert requested.count(fetch.SEC_COMPANY_TICKERS_URL) == 1
+    assert len(requested) == 4
+
+    session.get = get
+    assert client.tickers.resolve("mmm") is None
+    client.tickers._failed_at -= fetch.DEFAULT_TICKERS_RETRY_AFTER + 1
+    assert client.tickers.resolve("mmm") == "0000066740"
+
+
+def test_ticker_resolver_refreshes(monkeypatch):
+    client = fetch.EdgarClient(session=MockSession(), rate_limiter=NoWaitRateLimiter())
+    resolver = fetch.TickerResolver(client, max_age=60)
+    assert resolver.resolve("MMM") == "0000066740"
+    monkeypatch.setitem(company_tickers, "2", {"cik_str": 1, "ticker": "NEW", "title": "New"})
+    assert resolver.resolve("NEW") is None
+    resolver._loaded_at -= 61
+    assert resolver.resolve("NEW") == "0000000001"
+
+
+FILING_INDEX_HTML = """<html><body>
+<table class="tableFile" summary="Document Format Files">
+<tr><th>Seq</th><th>Description</th><th>Document</th><th>Type</th><th>Size</th></tr>
+<tr><td>1</td><td>10-K</td>
+<td><a href="/ix?doc=/Archives/edgar/data/66740/000006674023000010/mmm-20221231.htm">
+mmm-20221231.htm</a> <span>iXBRL</span></td><td>10-K</td><td>2345678</td></tr>
+<tr><td>2</td><td>EXHIBIT 21</td><td><a href="ex21.htm">ex21.htm</a></td><td>EX-21</td>
+<td>1234</td></tr>
+<tr><td>&nbsp;</td><td>Complete submission text file</td>
+<td><a href="0000066740-23-000010.txt">0000066740-23-000010.txt</a></td><td>&nbsp;</td>
+<td>9876543</td></tr>
+</table></body></html>"""
+
+
+class PrimaryDocumentSession(MockSession):
+    def __init__(self, has_index=True):
+        super().__init__()
+        self.has_index = has_index
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("-index.html"):
+            if self.has_index:
+                return MockResponse(FILING_INDEX_HTML)
+            return MockResponse("", status_code=404)
+        if url.endswith("mmm-20221231.htm"):
+            return MockResponse("<html><body><p>ITEM 1A. RISK FACTORS</p></body></html>")
+        return super().get(url, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "form_type, expected",
+    [(None, ("mmm-20221231.htm", "10-K")), ("EX-21", ("ex21.htm", "EX-21")), ("S-1", None)],
+)
+def test_parse_primary_document(form_type, expected):
+    assert fetch._parse_primary_document(FILING_INDEX_HTML, form_type) == expected
+
+
+def test_get_primary_document():
+    session = PrimaryDocumentSession()
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    text = client.get_primary_document("66740", "0000066740-23-000010")
+    assert text.startswith("<SEC-DOCUMENT>\n<DOCUMENT>\n<TYPE>10-K\n")
+    assert "<p>ITEM 1A. RISK FACTORS</p>" in text
+    assert session.urls == [
+        f"{fetch.SEC_ARCHIVE_URL}/66740/000006674023000010/0000066740-23-000010-index.html",
+        f"{fetch.SEC_ARCHIVE_URL}/66740/000006674023000010/mmm-20221231.htm",
+    ]
+
+
+def test_get_primary_document_falls_back_to_full_submission():
+    session = PrimaryDocumentSession(has_index=False)
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    text = client.get_primary_document("66740", "0000066740-23-000010")
+    assert text == "<SEC-DOCUMENT>0000066740-23-000010.txt</SEC-DOCUMENT>"
+
+
+def test_get_form_by_cik_primary_document_only():
+    response_content["filings"]["recent"]["primaryDocument"] = ["mmm-20221231.htm"] + [""] * 3
+    try:
+        session = PrimaryDocumentSession()
+        client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+        text = client.get_form_by_cik("1234567890", "10-K", primary_document_only=True)
+    finally:
+        del response_content["filings"]["recent"]["primaryDocument"]
+    assert "<TYPE>10-K\n" in text
+    # NOTE: The primary document is known from the submissions, so the index is not needed
+    assert not any(url.endswith("-index.html") for url in session.urls)
@@ -0,0 +1,123 @@
+import datetime
+import json
+
+import pytest
+
+import prepline_sec_filings.fetch as fetch
+from prepline_sec_filings.filing_index import Filing, FilingIndex
+
+RECENT = {
+    "accessionNumber": ["0000066740-23-000014", "0000066740-23-000010", "0000066740-22-000060"],
+    "form": ["10-Q", "10-K", "10-Q"],
+    "filingDate": ["2023-04-25", "2023-02-08", "2022-10-25"],
+    "primaryDocument": ["mmm-20230331.htm", "mmm-20221231.htm", "mmm-20220930.htm"],
+}
+OLDER = {
+    # NOTE: The last filing of the recent page is repeated, and a 10-K/A is on the same day as
+    # the 10-K
+    "accessionNumber": [
+        "0000066740-22-000060",
+        "0000066740-02-000012",
+        "0000066740-02-000010",
+        "0000066740-01-000005",
+    ],
+    "form": ["10-Q", "10-K/A", "10-K", "10-K"],
+    "filingDate": ["2022-10-25", "2002-03-01", "2002-03-01", "2001-03-02"],
+    "primaryDocument": ["mmm-20220930.htm", "", "", ""],
+}
+
+
+@pytest.fixture
+def index():
+    return FilingIndex.from_pages("66740", [RECENT, OLDER])
+
+
+def test_from_pages_merges_and_sorts(index):
+    assert len(index) == 6
+    assert list(index.accession_numbers) == [
+        "000006674023000014",
+        "000006674023000010",
+        "000006674022000060",
+        "000006674002000012",
+        "000006674002000010",
+        "000006674001000005",
+    ]
+    assert index[1] == Filing(
+        "000006674023000010", "10-K", datetime.date(2023, 2, 8), "mmm-20221231.htm"
+    )
+
+
+@pytest.mark.parametrize(
+    "form_types, start, end, expected",
+    [
+        (["10-K"], None, None, ["000006674023000010", "000006674002000010", "000006674001000005"]),
+        (
+            ["10-K", "10-K/A"],
+            "2002-03-01",
+            "2002-03-01",
+            ["000006674002000012", "000006674002000010"],
+        ),
+        (
+            None,
+            "2022-01-01",
+            None,
+            ["000006674023000014", "000006674023000010", "000006674022000060"],
+        ),
+        (None, None, datetime.date(2001, 12, 31), ["000006674001000005"]),
+        (["10-Q"], "2001-01-01", "2021-12-31", []),
+        (["S-1"], None, None, []),
+    ],
+)
+def test_query(index, form_types, start, end, expected):
+    assert [filing.accession_number for filing in index.query(form_types, start, end)] == expected
+
+
+def test_latest(index):
+    assert index.latest(["10-K", "10-K/A"]).accession_number == "000006674023000010"
+    assert index.latest(["S-1"]) is None
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = FilingIndex.load(path)
+    assert loaded.cik == "66740"
+    assert list(loaded) == list(index)
+
+
+class MockResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.headers = {}
+        self.content = json.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+class MockSession:
+    def __init__(self):
+        self.headers = {}
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("CIK0000066740.json"):
+            files = [{"name": "CIK0000066740-submissions-001.json"}]
+            return MockResponse({"filings": {"recent": RECENT, "files": files}})
+        assert url.endswith("CIK0000066740-submissions-001.json")
+        return MockResponse(OLDER)
+
+
+class NoWaitRateLimiter:
+    def acquire(self):
+        pass
+
+
+def test_client_get_filing_index():
+    session = MockSession()
+    client = fetch.EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+    assert len(client.get_filing_index("0000066740")) == 6
+    assert len(session.urls) == 2
+    assert len(client.get_filing_index("0000066740", all_pages=False)) == 3
+    assert len(session.urls) == 3
@@ -0,0 +1,166 @@
+import datetime
+
+import pytest
+
+from prepline_sec_filings import full_index
+from prepline_sec_filings.fetch import EdgarClient
+from prepline_sec_filings.full_index import (
+    FullIndex,
+    IndexEntry,
+    get_daily_index,
+    get_index,
+    parse_form_index,
+    parse_master_index,
+)
+
+MASTER_IDX = """Description:           Master Index of EDGAR Dissemination Feed
+Last Data Received:    March 31, 2023
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+
+
+
+
+CIK|Company Name|Form Type|Date Filed|File Name
+--------------------------------------------------------------------------------
+1000045|NICHOLAS FINANCIAL INC|8-K|2023-02-14|edgar/data/1000045/0000950170-23-003588.txt
+1000045|NICHOLAS FINANCIAL INC|10-Q|2023-02-14|edgar/data/1000045/0000950170-23-003586.txt
+66740|3M CO|10-K|2023-02-08|edgar/data/66740/0000066740-23-000014.txt
+1000097|KINGDON CAPITAL LLC|SC 13G|2023-01-10|edgar/data/1000097/0000919574-23-000101.txt
+1000209|MEDALLION FINANCIAL CORP|S-1/A|2023-03-31|edgar/data/1000209/0001193125-23-090001.txt
+"""
+
+FORM_IDX = """Description:           Master Index of EDGAR Dissemination Feed by Form Type
+Last Data Received:    March 31, 2023
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+
+
+
+
+Form Type   Company Name          CIK     Date Filed  File Name
+--------------------------------------------------------------------------------------------------
+10-K        3M CO                 66740   2023-02-08  edgar/data/66740/0000066740-23-000014.txt
+SC 13G      KINGDON CAPITAL LLC   1000097 2023-01-10  edgar/data/1000097/0000919574-23-000101.txt
+"""
+
+DAILY_IDX = """Description:           Daily Index of EDGAR Dissemination Feed by Company Name
+Last Data Received:    Apr 03, 2023
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+
+
+
+
+CIK|Company Name|Form Type|Date Filed|File Name
+--------------------------------------------------------------------------------
+320193|Apple Inc.|10-Q|20230403|edgar/data/320193/0000320193-23-000064.txt
+"""
+
+
+def test_parse_master_index():
+    rows = list(parse_master_index(MASTER_IDX))
+    assert len(rows) == 5
+    assert rows[3] == ("1000097", "SC 13G", "2023-01-10", "0000919574-23-000101")
+    assert list(parse_master_index(DAILY_IDX)) == [
+        ("320193", "10-Q", "2023-04-03", "0000320193-23-000064")
+    ]
+
+
+def test_parse_form_index():
+    assert list(parse_form_index(FORM_IDX)) == [
+        ("66740", "10-K", "2023-02-08", "0000066740-23-000014"),
+        ("1000097", "SC 13G", "2023-01-10", "0000919574-23-000101"),
+    ]
+
+
+@pytest.fixture
+def index():
+    return FullIndex.from_rows(parse_master_index(MASTER_IDX))
+
+
+def test_from_rows_filters_and_sorts(index):
+    assert [entry.form for entry in index] == ["S-1/A", "10-Q", "10-K"]
+    assert index[1] == IndexEntry(
+        "1000045", "10-Q", datetime.date(2023, 2, 14), "000095017023003586"
+    )
+    assert len(FullIndex.from_rows(parse_master_index(MASTER_IDX), form_types=None)) == 5
+
+
+def test_query(index):
+    assert [entry.cik for entry in index.query(["10-K", "10-Q"], end="2023-02-13")] == ["66740"]
+    assert [entry.cik for entry in index.query(ciks=["0001000209", 66740])] == [
+        "1000209",
+        "66740",
+    ]
+    assert len(index.query(start="2023-04-01")) == 0
+
+
+def test_concat_deduplicates(index):
+    daily = FullIndex.from_rows(parse_master_index(DAILY_IDX))
+    merged = FullIndex.concat([index, daily, index])
+    assert [entry.accession_number for entry in merged] == [
+        "000032019323000064",
+        "000119312523090001",
+        "000095017023003586",
+        "000006674023000014",
+    ]
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    assert list(FullIndex.load(path)) == list(index)
+
+
+class MockResponse:
+    def __init__(self, text, status_code=200):
+        self.content = text.encode("latin-1")
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+
+class MockSession:
+    def __init__(self):
+        self.headers = {}
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("/2023/QTR1/master.idx"):
+            return MockResponse(MASTER_IDX)
+        if url.endswith("/2023/QTR2/master.20230403.idx"):
+            return MockResponse(DAILY_IDX)
+        if "/daily-index/" in url:
+            return MockResponse("", 404)
+        return MockResponse(MASTER_IDX.replace("2023-", "2022-").replace("-23-", "-22-"))
+
+
+class NoWaitRateLimiter:
+    def acquire(self):
+        pass
+
+
+def _client(session):
+    return EdgarClient(session=session, rate_limiter=NoWaitRateLimiter())
+
+
+def test_get_index():
+    session = MockSession()
+    index = get_index(_client(session), "2022-11-01", "2023-02-10", form_types=["10-K"])
+    assert session.urls == [
+        f"{full_index.FULL_INDEX_URL}/2022/QTR4/master.idx",
+        f"{full_index.FULL_INDEX_URL}/2023/QTR1/master.idx",
+    ]
+    assert [entry.accession_number for entry in index] == ["000006674023000014"]
+
+
+def test_get_index_daily():
+    session = MockSession()
+    # NOTE: Saturday April 1st to Monday April 3rd, 2023
+    index = get_index(_client(session), "2023-04-01", "2023-04-03", daily=True)
+    assert session.urls == [f"{full_index.DAILY_INDEX_URL}/2023/QTR2/master.20230403.idx"]
+    assert [entry.cik for entry in index] == ["320193"]
+    assert len(get_daily_index(_client(session), datetime.date(2023, 4, 4))) == 0
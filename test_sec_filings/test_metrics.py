@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from prepline_sec_filings import metrics
+from prepline_sec_filings.timing import NULL_TIMER, get_timer
+
+
+def _build_app(**middleware_options):
+    app = FastAPI()
+
+    @app.post("/section")
+    def section():
+        timer = get_timer()
+        timer.tag("filing_type", "10-K")
+        timer.tag("section_count", "3")
+        timer.count("sections_toc", 2)
+        timer.count("sections_up_to_next_title")
+        return {"ok": True}
+
+    @app.post("/broken")
+    def broken():
+        raise ValueError("Filing type is empty.")
+
+    @app.post("/missing")
+    def missing():
+        raise HTTPException(status_code=400, detail="missing")
+
+    app.add_middleware(metrics.MetricsMiddleware, **middleware_options)
+    app.add_route("/metrics", metrics.metrics_endpoint, methods=["GET"])
+    return app
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.parametrize(
+    "section_count, expected",
+    [(None, "unknown"), ("0", "0"), ("1", "1"), ("3", "2-5"), ("8", "6-10"), ("23", "11+")],
+)
+def test_section_count_bucket(section_count, expected):
+    assert metrics.section_count_bucket(section_count) == expected
+
+
+def test_middleware_records_request_metrics():
+    client = TestClient(_build_app())
+    labels = {"filing_type": "10-K", "section_count": "2-5"}
+    before_requests = _sample("sec_filings_request_duration_seconds_count", **labels)
+    before_toc = _sample("sec_filings_extraction_path_total", path="toc")
+    before_fallback = _sample("sec_filings_extraction_path_total", path="up_to_next_title")
+    before_size = _sample("sec_filings_request_size_bytes_count", filing_type="10-K")
+
+    response = client.post("/section", content=b"x" * 100)
+    assert response.status_code == 200
+
+    assert _sample("sec_filings_request_duration_seconds_count", **labels) == before_requests + 1
+    assert _sample("sec_filings_extraction_path_total", path="toc") == before_toc + 2
+    assert (
+        _sample("sec_filings_extraction_path_total", path="up_to_next_title") == before_fallback + 1
+    )
+    assert _sample("sec_filings_request_size_bytes_count", filing_type="10-K") == before_size + 1
+    assert _sample("sec_filings_requests_in_flight") == 0
+
+
+def test_middleware_counts_errors():
+    client = TestClient(_build_app())
+    before_value_errors = _sample("sec_filings_request_errors_total", error="ValueError")
+    before_bad_requests = _sample("sec_filings_request_errors_total", error="400")
+
+    with pytest.raises(ValueError):
+        client.post("/broken")
+    client.post("/missing")
+
+    assert _sample("sec_filings_request_errors_total", error="ValueError") == (
+        before_value_errors + 1
+    )
+    assert _sample("sec_filings_request_errors_total", error="400") == before_bad_requests + 1
+
+
+def test_middleware_keeps_null_timer_when_timing_is_disabled():
+    timers = []
+    app = FastAPI()
+
+    @app.post("/section")
+    def section():
+        timers.append(get_timer())
+        return {"ok": True}
+
+    app.add_middleware(metrics.MetricsMiddleware, timing_enabled=False)
+    labels = {"filing_type": "unknown", "section_count": "unknown"}
+    before = _sample("sec_filings_request_duration_seconds_count", **labels)
+
+    assert TestClient(app).post("/section").status_code == 200
+    assert timers == [NULL_TIMER]
+    assert _sample("sec_filings_request_duration_seconds_count", **labels) == before + 1
+
+
+def test_middleware_ignores_malformed_content_length():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/section",
+        "headers": [(b"content-length", b"not-a-number")],
+    }
+    before = _sample("sec_filings_request_size_bytes_count", filing_type="unknown")
+    asyncio.run(metrics.MetricsMiddleware(app)(scope, receive, send))
+    assert messages[0]["status"] == 200
+    assert _sample("sec_filings_request_size_bytes_count", filing_type="unknown") == before
+
+
+def test_metrics_endpoint():
+    client = TestClient(_build_app())
+    client.post("/section")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "sec_filings_request_duration_seconds_bucket" in response.text
+    assert "sec_filings_requests_in_flight" in response.text
+
+
+def test_get_registry_multiprocess(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert metrics.get_registry() is not REGISTRY
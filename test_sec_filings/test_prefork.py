@@ -0,0 +1,85 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+from fastapi import FastAPI
+
+# NOTE: Served by the launcher under test, imported as test_prefork:app
+app = FastAPI()
+
+
+@app.get("/pid")
+def pid():
+    return {"pid": os.getpid()}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_pid(url: str, retries: int = 50) -> int:
+    for _ in range(retries):
+        try:
+            return requests.get(f"{url}/pid", timeout=5).json()["pid"]
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise AssertionError(f"{url} did not respond")
+
+
+@pytest.fixture
+def launcher():
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SEC_FILINGS_WARMUP": "0",
+        "PYTHONPATH": os.pathsep.join([os.path.dirname(__file__), os.getcwd()]),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "prepline_sec_filings.prefork",
+            "--app",
+            "test_prefork:app",
+            "--port",
+            str(port),
+            "--workers",
+            "2",
+            "--max-requests",
+            "3",
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    _get_pid(url)
+    yield url, proc
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+
+def test_prefork_serves_from_recycled_workers(launcher):
+    url, proc = launcher
+    pids = []
+    for _ in range(12):
+        pids.append(_get_pid(url))
+        # NOTE: uvicorn checks the request limit every 0.1s
+        time.sleep(0.15)
+    assert proc.pid not in pids
+    # NOTE: Each worker serves at most 3 requests before it is replaced
+    assert len(set(pids)) >= 4
+
+
+def test_prefork_stops_workers_on_sigterm(launcher):
+    url, proc = launcher
+    proc.send_signal(signal.SIGTERM)
+    assert proc.wait(timeout=30) == 0
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{url}/pid", timeout=5)
@@ -0,0 +1,102 @@
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from prepline_sec_filings import profiling, timing
+
+
+def _build_app(**kwargs):
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        timer = timing.get_timer()
+        timer.record_since_start("upload")
+        with timer.stage("parse"):
+            data = [bytearray(1024) for _ in range(100)]
+        timer.count("elements", len(data))
+        return {"ok": True}
+
+    app.add_middleware(profiling.MemoryProfilingMiddleware, **kwargs)
+    return app
+
+
+def test_profile_memory_records_stages():
+    with profiling.profile_memory() as profiler:
+        timer = timing.get_timer()
+        with timer.stage("section.RISK_FACTORS"):
+            with timer.stage("toc"):
+                retained = [bytearray(1024) for _ in range(1000)]
+        timer.count("elements", 3)
+
+    report = profiler.report()
+    assert [stage["stage"] for stage in report["stages"]] == ["toc", "section.RISK_FACTORS"]
+    toc, section = report["stages"]
+    assert toc["depth"] == 1 and section["depth"] == 0
+    assert toc["retained_mb"] >= 1
+    assert section["peak_traced_mb"] >= toc["retained_mb"]
+    assert "top_allocations" not in toc
+    assert "test_profiling.py:" in section["top_allocations"][0]["site"]
+    assert report["rss_mb"] > 0 and report["peak_rss_mb"] > 0
+    assert len(retained) == 1000
+
+
+def test_profile_memory_forwards_to_current_timer():
+    with timing.use_timer() as timer:
+        with profiling.profile_memory() as profiler:
+            with timing.get_timer().stage("parse"):
+                pass
+            timing.get_timer().count("elements", 2)
+            timing.get_timer().tag("filing_type", "10-K")
+    assert timing.get_timer() is timing.NULL_TIMER
+    assert "parse" in timer.durations and "parse" in profiler.durations
+    assert timer.counts == {"elements": 2}
+    assert timer.tags == {"filing_type": "10-K"}
+
+
+def test_reset_peak_rss():
+    block = b"x" * 64 * 1024**2
+    peak = profiling.peak_rss_bytes()
+    del block
+    if not profiling.reset_peak_rss():
+        pytest.skip("resetting the peak RSS requires Linux 4.0+")
+    assert profiling.peak_rss_bytes() < peak
+
+
+def test_profile_memory_runs_one_at_a_time():
+    with profiling.profile_memory():
+        with pytest.raises(RuntimeError):
+            with profiling.profile_memory():
+                pass
+    with profiling.profile_memory():
+        pass
+
+
+def test_middleware_profiles_authorized_requests(caplog):
+    client = TestClient(_build_app(token="secret"))
+    with caplog.at_level(logging.INFO, logger="prepline_sec_filings"):
+        response = client.get("/work", headers={"X-Profile-Memory": "secret"})
+    assert response.status_code == 200
+    records = [json.loads(record.getMessage()) for record in caplog.records]
+    assert len(records) == 1
+    assert records[0]["event"] == "memory_profile"
+    assert [stage["stage"] for stage in records[0]["stages"]] == ["upload", "parse"]
+
+
+@pytest.mark.parametrize(
+    ("token", "headers"),
+    [
+        (None, {"X-Profile-Memory": "secret"}),
+        ("secret", {"X-Profile-Memory": "guess"}),
+        ("secret", {}),
+    ],
+)
+def test_middleware_ignores_unauthorized_requests(token, headers, caplog):
+    client = TestClient(_build_app(token=token))
+    with caplog.at_level(logging.INFO, logger="prepline_sec_filings"):
+        response = client.get("/work", headers=headers)
+    assert response.status_code == 200
+    assert not caplog.records
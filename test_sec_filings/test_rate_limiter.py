@@ -0,0 +1,133 @@
+import os
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import prepline_sec_filings.rate_limiter as rate_limiter
+from prepline_sec_filings.rate_limiter import FileRateLimiter, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_spaces_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == pytest.approx([0.1] * 4)
+
+
+def test_rate_limiter_allows_bursts_up_to_capacity():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, capacity=3, clock=clock, sleep=clock.sleep)
+    assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.try_acquire() == pytest.approx(0.1)
+    clock.now += 10
+    # NOTE: Idle time does not accumulate more than capacity tokens
+    assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.try_acquire() > 0
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 1), (10, 0.5)])
+def test_rate_limiter_rejects_invalid_arguments(rate, capacity):
+    with pytest.raises(ValueError):
+        RateLimiter(rate=rate, capacity=capacity)
+
+
+def test_rate_limiter_is_thread_safe():
+    limiter = RateLimiter(rate=50)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # NOTE: The first request is free, the other 19 are spaced 20ms apart
+    assert time.monotonic() - start >= 19 / 50 * 0.9
+
+
+def test_file_rate_limiter_shares_the_bucket(tmp_path):
+    path = str(tmp_path / "edgar.limit")
+    clock = FakeClock()
+    first = FileRateLimiter(path, rate=10, clock=clock, sleep=clock.sleep)
+    second = FileRateLimiter(path, rate=10, clock=clock, sleep=clock.sleep)
+    try:
+        assert first.try_acquire() == 0
+        assert second.try_acquire() == pytest.approx(0.1)
+        clock.now += 0.1
+        assert second.try_acquire() == 0
+        assert first.try_acquire() == pytest.approx(0.1)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_file_rate_limiter_does_not_wait_for_the_lock(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    path = str(tmp_path / "edgar.limit")
+    limiter = FileRateLimiter(path, rate=10)
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # NOTE: Another process holds the lock, so no token is taken
+        assert 0 < limiter.try_acquire() < 0.1
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        assert limiter.try_acquire() == 0
+    finally:
+        os.close(fd)
+        limiter.close()
+
+
+def _acquire_from_file(path, n, timestamps):
+    limiter = FileRateLimiter(path, rate=50)
+    for _ in range(n):
+        limiter.acquire()
+        timestamps.append(time.monotonic())
+    limiter.close()
+
+
+def test_file_rate_limiter_across_processes(tmp_path):
+    path = str(tmp_path / "edgar.limit")
+    with multiprocessing.Manager() as manager:
+        timestamps = manager.list()
+        processes = [
+            multiprocessing.Process(target=_acquire_from_file, args=(path, 5, timestamps))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        timestamps = sorted(timestamps)
+    assert len(timestamps) == 15
+    gaps = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    assert min(gaps) >= 1 / 50 * 0.5
+
+
+def test_get_rate_limiter_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setattr(rate_limiter, "_default_limiter", None)
+    monkeypatch.setenv("SEC_API_RATE_LIMIT", "5")
+    monkeypatch.delenv("SEC_API_RATE_LIMIT_FILE", raising=False)
+    limiter = rate_limiter.get_rate_limiter()
+    assert type(limiter) is RateLimiter
+    assert limiter.rate == 5
+    assert rate_limiter.get_rate_limiter() is limiter
+
+    rate_limiter.set_rate_limiter(None)
+    monkeypatch.setenv("SEC_API_RATE_LIMIT_FILE", str(tmp_path / "edgar.limit"))
+    limiter = rate_limiter.get_rate_limiter()
+    assert isinstance(limiter, FileRateLimiter)
+    limiter.close()
@@ -0,0 +1,163 @@
+import datetime
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from prepline_sec_filings import search
+from prepline_sec_filings.search import SearchIndex
+from prepline_sec_filings.section_store import SectionStore, StoredFiling
+
+FILINGS = {
+    StoredFiling("000000000122000001", "1", "10-K", "2022-03-01"): {
+        "RISK_FACTORS": [
+            {"text": "Risk Factors", "type": "Title"},
+            {
+                "text": "A cybersecurity incident could disrupt our operations.",
+                "type": "NarrativeText",
+            },
+            {
+                "text": "Cybersecurity threats, breaches and cybersecurity costs keep rising.",
+                "type": "NarrativeText",
+            },
+        ],
+        "MANAGEMENT_DISCUSSION": [
+            {"text": "Revenue grew despite supply chain constraints.", "type": "NarrativeText"}
+        ],
+    },
+    StoredFiling("000000000223000001", "2", "10-Q", "2023-05-01"): {
+        "RISK_FACTORS": [
+            {"text": "Supply chain disruptions may reduce our margins.", "type": "NarrativeText"},
+        ],
+    },
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(str(tmp_path / "sections.db")) as index:
+        index.put_many(FILINGS.items())
+        yield index
+
+
+def test_search_ranks_hits(index):
+    assert index.search("cybersecurity").total == 0
+    assert index.pending() == 5
+    assert index.update(batch_size=2) == 5
+    assert index.pending() == 0
+
+    results = index.search("cybersecurity")
+    assert results.total == 2
+    first, second = results.hits
+    # NOTE: The element that mentions cybersecurity more often ranks first
+    assert first.position == 2
+    assert first.score > second.score
+    assert (first.cik, first.form_type, first.section) == ("1", "10-K", "RISK_FACTORS")
+    assert first.filing_date == datetime.date(2022, 3, 1)
+    assert "<b>Cybersecurity</b>" in first.snippet
+
+
+def test_search_filters_and_paginates(index):
+    index.update()
+    assert index.search('"supply chain"').total == 2
+    assert [hit.cik for hit in index.search('"supply chain"', sections="RISK_FACTORS").hits] == [
+        "2"
+    ]
+    assert [hit.cik for hit in index.search('"supply chain"', ciks=["0000000001"]).hits] == ["1"]
+    assert index.search("supply", form_types=["10-Q"], start="2023-01-01").total == 1
+    assert index.search("supply", end="2022-12-31").total == 1
+    # NOTE: Stemmed, so disruption matches disrupt and disruptions
+    page = index.search("disruption", limit=1, offset=1)
+    assert page.total == 2
+    assert len(page.hits) == 1
+    with pytest.raises(ValueError):
+        index.search('"unbalanced')
+
+
+def test_search_index_is_incremental(index):
+    index.update()
+    filing = StoredFiling("000000000324000001", "3", "10-K", "2024-02-01")
+    index.put(filing, {"RISK_FACTORS": [{"text": "Tariffs may hurt us.", "type": "NarrativeText"}]})
+    assert index.search("tariffs").total == 0
+    assert index.update() == 1
+    assert index.search("tariffs").total == 1
+
+    # NOTE: Replaced elements are removed from the index right away
+    replaced = next(iter(FILINGS))
+    index.put(replaced, {"RISK_FACTORS": [{"text": "Inflation.", "type": "NarrativeText"}]})
+    assert index.search("cybersecurity").total == 0
+    index.update()
+    assert index.search("inflation").total == 1
+
+    index.rebuild()
+    assert index.pending() == 0
+    assert index.search("inflation OR tariffs").total == 2
+
+
+def test_read_only_search_index(index):
+    index.update()
+    with SearchIndex(index.path, read_only=True) as read_only:
+        assert read_only.search("supply", ciks=["2"]).total == 1
+        with pytest.raises(sqlite3.OperationalError):
+            read_only.put(next(iter(FILINGS)), {})
+
+
+def test_read_only_search_index_must_exist(tmp_path):
+    path = str(tmp_path / "sections.db")
+    with pytest.raises(sqlite3.OperationalError):
+        SearchIndex(path, read_only=True)
+    # NOTE: A section store without the full-text index
+    SectionStore(path).close()
+    with pytest.raises(sqlite3.OperationalError):
+        SearchIndex(path, read_only=True)
+
+
+def _client(monkeypatch, path=None):
+    if path is None:
+        monkeypatch.delenv(search.SEARCH_INDEX_ENV, raising=False)
+    else:
+        monkeypatch.setenv(search.SEARCH_INDEX_ENV, path)
+    app = FastAPI()
+    app.add_route("/sec-filings/v0/search", search.search_endpoint, methods=["GET"])
+    return TestClient(app)
+
+
+def test_search_endpoint(monkeypatch, index):
+    index.update()
+    client = _client(monkeypatch, index.path)
+    response = client.get(
+        "/sec-filings/v0/search",
+        params={"q": "supply", "section": "RISK_FACTORS", "page_size": 1},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["page"], body["page_size"]) == (1, 1, 1)
+    assert body["hits"][0]["accession_number"] == "000000000223000001"
+    assert body["hits"][0]["filing_date"] == "2023-05-01"
+
+    response = client.get("/sec-filings/v0/search", params={"q": "supply", "page": 2})
+    assert response.json()["hits"] == []
+    assert client.get("/sec-filings/v0/search").status_code == 400
+    assert client.get("/sec-filings/v0/search", params={"q": '"open'}).status_code == 400
+    assert client.get("/sec-filings/v0/search", params={"q": "a", "page": 0}).status_code == 400
+
+
+def test_search_endpoint_without_index(monkeypatch):
+    assert _client(monkeypatch).get("/sec-filings/v0/search", params={"q": "a"}).status_code == 503
+
+
+def test_search_endpoint_with_missing_index(monkeypatch, tmp_path):
+    path = str(tmp_path / "missing.db")
+    response = _client(monkeypatch, path).get("/sec-filings/v0/search", params={"q": "a"})
+    assert response.status_code == 503
+    assert "unavailable" in response.json()["error"]
+    # NOTE: Opened read-only, so it is not created
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_search_command(index, capsys):
+    search.main(["index", index.path])
+    assert capsys.readouterr().out == "indexed 5 elements\n"
+    search.main(["search", index.path, "cybersecurity", "--section", "RISK_FACTORS"])
+    assert capsys.readouterr().out.startswith("2 matching elements\n")
@@ -18,6 +18,7 @@ from prepline_sec_filings.sec_document import (
     get_narrative_texts,
 )
 from prepline_sec_filings.sections import SECSection, ALL_SECTIONS, validate_section_names
+from prepline_sec_filings.timing import use_timer
 
 
 @pytest.fixture
@@ -150,6 +151,20 @@ def test_get_risk_narrative(sample_document):
     ]
 
 
+@pytest.mark.parametrize("form_type, use_toc", product(("10-Q", "10-K", "S-1"), (True, False)))
+def test_get_risk_narrative_records_timings(sample_document, use_toc):
+    sec_document = SECDocument.from_string(sample_document)
+    with use_timer() as timer:
+        sec_document.get_risk_narrative()
+    assert "toc" in timer.durations
+    assert timer.counts["titles_detected"] > 0
+    if use_toc:
+        assert "sections_no_toc" not in timer.counts
+    else:
+        assert timer.counts["sections_no_toc"] == 1
+        assert "no_toc" in timer.durations
+
+
 @pytest.mark.parametrize("form_type, use_toc", product(("10-Q", "10-K", "S-1"), (True, False)))
 def test_get_table_of_contents(sample_document, form_type, use_toc):
     is_s1 = form_type == "S-1"
@@ -0,0 +1,92 @@
+import datetime
+
+import numpy as np
+
+from prepline_sec_filings.section_store import SectionStore, StoredFiling, StoredSection
+from prepline_sec_filings.sections import SECSection
+
+
+def _sections(cik, year):
+    return {
+        "RISK_FACTORS": [
+            {"text": f"Risk factors of {cik} in {year}", "type": "Title"},
+            {"text": f"We may lose money in {year}.", "type": "NarrativeText"},
+        ],
+        "MANAGEMENT_DISCUSSION": [{"text": f"Discussion of {year}", "type": "NarrativeText"}],
+    }
+
+
+def _filing(cik, year, form_type="10-K"):
+    return StoredFiling(f"{cik:010}{year % 100:02}000001", str(cik), form_type, f"{year}-03-01")
+
+
+def _store(tmp_path, ciks=range(1, 11), years=range(2020, 2024)):
+    store = SectionStore(str(tmp_path / "sections.db"))
+    store.put_many(
+        ((_filing(cik, year), _sections(cik, year)) for cik in ciks for year in years),
+        batch_size=7,
+    )
+    return store
+
+
+def test_section_store_query(tmp_path):
+    with _store(tmp_path) as store:
+        results = store.query(
+            "RISK_FACTORS", ciks=["0000000003", 5], start="2022-01-01", end="2022-12-31"
+        )
+        assert [(result.cik, result.section) for result in results] == [
+            ("3", "RISK_FACTORS"),
+            ("5", "RISK_FACTORS"),
+        ]
+        assert results[0] == StoredSection(
+            "000000000322000001",
+            "3",
+            "10-K",
+            datetime.date(2022, 3, 1),
+            "RISK_FACTORS",
+            _sections(3, 2022)["RISK_FACTORS"],
+        )
+
+        results = store.query(SECSection.MANAGEMENT_DISCUSSION, ciks=[1], start="2021-01-01")
+        assert [result.filing_date.year for result in results] == [2023, 2022, 2021]
+        assert len(store.query(ciks=[1])) == 8
+        assert store.query("RISK_FACTORS", form_types=["10-Q"]) == []
+
+
+def test_section_store_query_many_ciks(tmp_path):
+    with _store(tmp_path, ciks=range(1, 1201), years=[2021, 2022]) as store:
+        results = store.query("RISK_FACTORS", ciks=range(1, 1201, 2), start="2022-01-01")
+        assert len(results) == 600
+        assert all(result.filing_date.year == 2022 for result in results)
+        assert len(store.filings(ciks=range(1, 1201, 2))) == 1200
+
+
+def test_section_store_replaces_sections(tmp_path):
+    with _store(tmp_path, ciks=[1], years=[2022]) as store:
+        filing = _filing(1, 2022)
+        elements = [{"text": "Updated", "type": "NarrativeText", "metadata": {"page": 1}}]
+        store.put(filing, {"RISK_FACTORS": elements})
+        assert store.get(filing.accession_number) == {
+            "MANAGEMENT_DISCUSSION": _sections(1, 2022)["MANAGEMENT_DISCUSSION"],
+            "RISK_FACTORS": elements,
+        }
+        assert store.get(filing.accession_number, ["RISK_FACTORS"]) == {"RISK_FACTORS": elements}
+        assert store.get_filing(filing.accession_number) == StoredFiling(
+            filing.accession_number, "1", "10-K", datetime.date(2022, 3, 1)
+        )
+        assert store.get_filing("000000000222000001") is None
+
+
+def test_section_store_filings(tmp_path):
+    with _store(tmp_path, ciks=[1, 2], years=[2021, 2022]) as store:
+        store.put(_filing(1, 2023, "10-Q"), {})
+        assert [filing.accession_number for filing in store.filings(ciks=[1])] == [
+            "000000000123000001",
+            "000000000122000001",
+            "000000000121000001",
+        ]
+        assert [filing.cik for filing in store.filings(form_types=["10-Q"])] == ["1"]
+        assert len(store.filings(end="2021-12-31")) == 2
+        assert len(store.filings(end=datetime.date(2021, 12, 31))) == 2
+        assert len(store.filings(start=datetime.datetime(2022, 1, 1, 9, 30))) == 3
+        assert len(store.filings(start=np.datetime64("2023-01-01"))) == 1
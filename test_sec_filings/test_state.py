@@ -0,0 +1,78 @@
+import threading
+
+from prepline_sec_filings.state import (
+    EXTRACTED,
+    FAILED,
+    FETCHED,
+    StateStore,
+    content_hash,
+)
+
+ACCESSION_NUMBER = "000006674022000065"
+SECTIONS = {"RISK_FACTORS": [{"text": "Risks", "type": "NarrativeText"}]}
+
+
+def test_state_store_records_extraction(tmp_path):
+    path = str(tmp_path / "state.db")
+    text_hash = content_hash("<SEC-DOCUMENT>")
+    with StateStore(path, version="1.0.0") as state:
+        assert state.get(ACCESSION_NUMBER) is None
+        state.record_fetch(ACCESSION_NUMBER, text_hash, "66740", "10-Q")
+        assert state.get(ACCESSION_NUMBER).status == FETCHED
+        assert not state.is_current(ACCESSION_NUMBER)
+        state.record_extraction(ACCESSION_NUMBER, sections=["RISK_FACTORS"], result=SECTIONS)
+
+    with StateStore(path, version="1.0.0") as state:
+        recorded = state.get(ACCESSION_NUMBER)
+        assert recorded.status == EXTRACTED
+        assert (recorded.cik, recorded.form_type) == ("66740", "10-Q")
+        assert recorded.content_hash == text_hash
+        assert recorded.result == SECTIONS
+        assert state.is_current(ACCESSION_NUMBER, text_hash, ["RISK_FACTORS"])
+        assert not state.is_current(ACCESSION_NUMBER, content_hash("changed"))
+        assert not state.is_current(ACCESSION_NUMBER, sections=["FORWARD_LOOKING_STATEMENTS"])
+        # NOTE: Fetching the same text again keeps the results
+        state.record_fetch(ACCESSION_NUMBER, text_hash)
+        assert state.is_current(ACCESSION_NUMBER)
+        assert state.counts() == {EXTRACTED: 1}
+
+    with StateStore(path, version="1.1.0") as state:
+        assert not state.is_current(ACCESSION_NUMBER)
+        assert state.stale(["000000000122000001", ACCESSION_NUMBER]) == [
+            "000000000122000001",
+            ACCESSION_NUMBER,
+        ]
+
+
+def test_state_store_records_failures(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        state.record_fetch(ACCESSION_NUMBER, content_hash("text"), "66740", "10-Q")
+        state.record_failure(ACCESSION_NUMBER, ValueError("could not parse"))
+        recorded = state.get(ACCESSION_NUMBER)
+        assert recorded.status == FAILED
+        assert recorded.error == "ValueError: could not parse"
+        assert recorded.cik == "66740"
+        assert not state.is_current(ACCESSION_NUMBER)
+
+
+def test_state_store_all_sections(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        state.record_extraction(ACCESSION_NUMBER, sections=["_ALL"], result=SECTIONS)
+        assert state.is_current(ACCESSION_NUMBER, sections=["RISK_FACTORS"])
+        state.record_extraction(ACCESSION_NUMBER, sections=["RISK_FACTORS"], result=SECTIONS)
+        assert not state.is_current(ACCESSION_NUMBER, sections=["_ALL"])
+
+
+def test_state_store_is_shared_by_threads(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+
+        def record(i):
+            state.record_fetch(f"{i:018}", content_hash(str(i)))
+            state.record_extraction(f"{i:018}", result={})
+
+        threads = [threading.Thread(target=record, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert state.counts() == {EXTRACTED: 16}
@@ -0,0 +1,100 @@
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from prepline_sec_filings import timing
+
+
+def _build_app(**kwargs):
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        # Sync endpoints run in a worker thread, so this checks the timer is visible there
+        timer = timing.get_timer()
+        with timer.stage("parse"):
+            timer.count("elements", 3)
+        return {"ok": True}
+
+    app.add_middleware(timing.ServerTimingMiddleware, **kwargs)
+    return app
+
+
+def test_stage_timer_accumulates_stages():
+    timer = timing.StageTimer()
+    with timer.stage("toc"):
+        pass
+    timer.record("toc", 0.5)
+    timer.count("titles_detected", 2)
+    timer.count("titles_detected")
+    assert timer.durations["toc"] >= 0.5
+    assert timer.counts == {"titles_detected": 3}
+
+
+def test_stage_timer_tags():
+    timer = timing.StageTimer()
+    timer.tag("filing_type", "10-K")
+    assert timer.as_dict()["tags"] == {"filing_type": "10-K"}
+    assert "filing_type" not in timer.server_timing()
+
+
+def test_record_since_start_only_records_once():
+    timer = timing.StageTimer()
+    timer.record_since_start("upload")
+    first = timer.durations["upload"]
+    timer.record_since_start("upload")
+    assert timer.durations["upload"] == first
+
+
+def test_server_timing_header():
+    timer = timing.StageTimer()
+    timer.record("parse", 0.0123)
+    timer.count("elements", 42)
+    header = timer.server_timing()
+    assert header.startswith('parse;dur=12.3, elements;desc="42", total;dur=')
+
+
+def test_null_timer_records_nothing():
+    timer = timing.NULL_TIMER
+    with timer.stage("parse"):
+        timer.count("elements")
+    timer.record_since_start("upload")
+    assert timer.durations == {}
+    assert timer.counts == {}
+
+
+def test_get_timer_defaults_to_null_timer():
+    assert timing.get_timer() is timing.NULL_TIMER
+    with timing.use_timer() as timer:
+        assert timing.get_timer() is timer
+    assert timing.get_timer() is timing.NULL_TIMER
+
+
+def test_middleware_adds_server_timing_header():
+    client = TestClient(_build_app())
+    response = client.get("/work")
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert "parse;dur=" in server_timing
+    assert 'elements;desc="3"' in server_timing
+    assert "total;dur=" in server_timing
+
+
+def test_middleware_logs_timings(caplog):
+    client = TestClient(_build_app())
+    with caplog.at_level(logging.INFO, logger="prepline_sec_filings"):
+        client.get("/work")
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["event"] == "request_timing"
+    assert record["path"] == "/work"
+    assert record["status_code"] == 200
+    assert "parse" in record["stages"]
+    assert record["counts"] == {"elements": 3}
+
+
+def test_middleware_can_be_disabled():
+    client = TestClient(_build_app(enabled=False))
+    response = client.get("/work")
+    assert "server-timing" not in response.headers
@@ -0,0 +1,98 @@
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from prepline_sec_filings import warmup
+from prepline_sec_filings.api import section
+from prepline_sec_filings.sections import SECTIONS_10K, SECSection
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(warmup, "_state", warmup.WarmupState())
+
+
+def _build_app():
+    app = FastAPI()
+    app.add_route("/readyz", warmup.readyz_endpoint, methods=["GET"])
+    return app
+
+
+def test_readyz_reports_ready_after_warm_up(monkeypatch):
+    calls = []
+    monkeypatch.setattr(section, "pipeline_api", lambda text, **kwargs: calls.append(kwargs))
+    client = TestClient(_build_app())
+
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False, "error": None}
+
+    warmup.warm_up()
+    assert len(calls) == 2
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+def test_warm_up_failure_stays_not_ready(monkeypatch):
+    def pipeline_api(text, **kwargs):
+        raise LookupError("tagger not found")
+
+    monkeypatch.setattr(section, "pipeline_api", pipeline_api)
+    warmup.warm_up()
+    assert not warmup.is_ready()
+
+    response = TestClient(_build_app()).get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["error"] == "LookupError: tagger not found"
+
+
+def test_start_warm_up_runs_in_background(monkeypatch):
+    monkeypatch.setattr(section, "pipeline_api", lambda text, **kwargs: None)
+    thread = warmup.start_warm_up(enabled=True)
+    thread.join(timeout=10)
+    assert warmup.is_ready()
+    # NOTE: Warming up again is a no-op, e.g. for workers forked after warming up
+    assert warmup.start_warm_up(enabled=True) is None
+
+
+def test_start_warm_up_disabled_is_ready():
+    assert warmup.start_warm_up(enabled=False) is None
+    assert warmup.is_ready()
+
+
+def test_server_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, prepline_sec_filings.server; "
+        "print(','.join(m for m in ('nltk', 'sklearn', 'numpy') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True)
+    assert result.stdout.decode().strip() == ""
+
+
+# NOTE: The sections in the embedded filing, which warming up should exercise
+WARMUP_SECTIONS = [
+    SECSection.BUSINESS,
+    SECSection.RISK_FACTORS,
+    SECSection.UNRESOLVED_STAFF_COMMENTS,
+    SECSection.PROPERTIES,
+]
+
+
+def test_warmup_filing_runs_through_pipeline():
+    results = section.pipeline_api(warmup.WARMUP_FILING, m_section=["_ALL"])
+    assert set(results) == {enum.name for enum in SECTIONS_10K}
+    for enum in WARMUP_SECTIONS:
+        assert results[enum.name], f"{enum.name} is empty"
+        assert all(element["text"] for element in results[enum.name])
+
+
+def test_warmup_filing_risk_factors_csv():
+    result = section.pipeline_api(
+        warmup.WARMUP_FILING, response_type="text/csv", m_section=["RISK_FACTORS"]
+    )
+    assert "RISK_FACTORS" in result
+    assert "adversely affected" in result
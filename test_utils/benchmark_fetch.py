@@ -0,0 +1,215 @@
+"""Benchmarks the fetch layer against the local EDGAR stand-in in test_utils/fake_edgar.py. Each
+scenario downloads --filings filings with EdgarClient from a pool of threads or with
+AsyncEdgarClient (requires httpx), at each --concurrency, and reports the achieved throughput
+along with what the server saw: requests (including retries), TCP connections opened, the
+largest number of requests in any one second window and how many requests it throttled for
+exceeding --throttle-rate. A scenario complies with the rate limit if none were throttled.
+With --document primary, the threads mode fetches only the primary document of each filing with
+get_primary_document, which looks it up in the filing index first.
+
+Latency and errors are injected by the server, so retries and backoff are part of the timings:
+
+    PYTHONPATH=. python test_utils/benchmark_fetch.py --mode threads --mode async \\
+        --concurrency 1 --concurrency 8 --latency 0.05 --error-rate-5xx 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import List, Optional
+
+import requests
+
+from prepline_sec_filings.fetch import EdgarClient
+from prepline_sec_filings.rate_limiter import SEC_RATE_LIMIT, RateLimiter
+from fake_edgar import FakeEdgar, FakeFiling, edgar_session, edgar_transport, load_filings, running
+
+MODES: List[str] = ["threads", "async"]
+DOCUMENTS: List[str] = ["submission", "primary"]
+COMPANY = "Fetch Benchmark"
+EMAIL = "bench@edgar.test"
+
+
+def _fetch_with_threads(
+    url: str,
+    filings: List[FakeFiling],
+    concurrency: int,
+    client_kwargs: dict,
+    document: str = "submission",
+) -> List[Optional[int]]:
+    client = EdgarClient(session=edgar_session(url, pool_size=concurrency), **client_kwargs)
+    get = client.get_primary_document if document == "primary" else client.get_filing
+
+    def fetch(filing: FakeFiling) -> Optional[int]:
+        try:
+            return len(get(filing.cik, filing.accession_number).encode("utf-8"))
+        except requests.RequestException:
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(fetch, filings))
+
+
+def _fetch_with_asyncio(
+    url: str,
+    filings: List[FakeFiling],
+    concurrency: int,
+    client_kwargs: dict,
+    document: str = "submission",
+) -> List[Optional[int]]:
+    from prepline_sec_filings.async_fetch import AsyncEdgarClient
+
+    async def fetch():
+        async with AsyncEdgarClient(
+            COMPANY,
+            EMAIL,
+            max_concurrency=concurrency,
+            transport=edgar_transport(url, concurrency),
+            **client_kwargs,
+        ) as client:
+            pairs = [(filing.cik, filing.accession_number) for filing in filings]
+            return [
+                None if download.error is not None else len(download.text.encode("utf-8"))
+                async for download in client.download_filings(pairs)
+            ]
+
+    return asyncio.run(fetch())
+
+
+def run_scenario(
+    url: str,
+    filings: List[FakeFiling],
+    mode: str,
+    concurrency: int,
+    rate: float,
+    max_retries: int,
+    backoff_factor: float,
+    document: str = "submission",
+) -> dict:
+    """Downloads the filings and returns a report of the scenario."""
+    client_kwargs = {
+        "rate_limiter": RateLimiter(rate),
+        "max_retries": max_retries,
+        "backoff_factor": backoff_factor,
+    }
+    # NOTE: The connection for the stats is opened before the reset, so it is not counted
+    stats_session = requests.Session()
+    stats_session.get(f"{url}/__stats")
+    stats_session.get(f"{url}/__stats?reset=1")
+    started = time.perf_counter()
+    fetch = _fetch_with_threads if mode == "threads" else _fetch_with_asyncio
+    sizes = fetch(url, filings, concurrency, client_kwargs, document)
+    elapsed = time.perf_counter() - started
+    server = stats_session.get(f"{url}/__stats").json()
+
+    ok = [size for size in sizes if size is not None]
+    # NOTE: A primary document takes a request for the filing index and one for the document
+    requests_per_filing = 2 if document == "primary" else 1
+    return {
+        "mode": mode,
+        "document": document,
+        "concurrency": concurrency,
+        "rate": rate,
+        "filings": len(sizes),
+        "errors": len(sizes) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "filings_per_s": round(len(ok) / elapsed, 3),
+        "mb_per_s": round(sum(ok) / elapsed / 1e6, 3),
+        "retries": server["requests"] - requests_per_filing * len(sizes),
+        "rate_limit_compliant": server["throttled"] == 0,
+        "server": server,
+    }
+
+
+def print_report(report: List[dict]):
+    header = (
+        f"{'mode':8} {'conc':>4} {'rate':>6} {'files':>6} {'errs':>5} {'files/s':>8} "
+        f"{'MB/s':>7} {'reqs':>5} {'conns':>5} {'max/s':>5} {'thrtl':>5} {'compliant':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for scenario in report:
+        server = scenario["server"]
+        print(
+            f"{scenario['mode']:8} {scenario['concurrency']:>4} {scenario['rate']:>6g} "
+            f"{scenario['filings']:>6} {scenario['errors']:>5} "
+            f"{scenario['filings_per_s']:>8.2f} {scenario['mb_per_s']:>7.2f} "
+            f"{server['requests']:>5} {server['connections']:>5} "
+            f"{server['max_requests_per_second']:>5} {server['throttled']:>5} "
+            f"{str(scenario['rate_limit_compliant']):>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", action="append", choices=MODES, help="Defaults to threads.")
+    parser.add_argument("--concurrency", action="append", type=int, help="Defaults to 1 and 8.")
+    parser.add_argument("--filings", type=int, default=50, help="Filings per scenario.")
+    parser.add_argument(
+        "--document",
+        choices=DOCUMENTS,
+        default="submission",
+        help="Fetch the full submission or only the primary document (threads mode only).",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=SEC_RATE_LIMIT, help="Client rate limit in requests/s."
+    )
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--backoff-factor", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean server delay in s.")
+    parser.add_argument("--error-rate-429", type=float, default=0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0)
+    parser.add_argument("--retry-after", type=float)
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=SEC_RATE_LIMIT,
+        help="Requests per second the server allows. 0 disables throttling.",
+    )
+    parser.add_argument("--synthetic-scale", type=int, default=20)
+    parser.add_argument("--output", default="fetch-bench-report.json")
+    args = parser.parse_args(argv)
+    if args.document == "primary" and "async" in (args.mode or []):
+        parser.error("--document primary is only supported in threads mode")
+
+    fake_filings = load_filings(synthetic_scale=args.synthetic_scale)
+    filings = list(itertools.islice(itertools.cycle(fake_filings), args.filings))
+    edgar = FakeEdgar(
+        fake_filings,
+        latency=args.latency,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        retry_after=args.retry_after,
+        throttle_rate=args.throttle_rate or None,
+    )
+    scenarios = list(itertools.product(args.mode or ["threads"], args.concurrency or [1, 8]))
+    report = []
+    with running(edgar) as url:
+        for mode, concurrency in scenarios:
+            print(f"{mode} x{concurrency}...", flush=True)
+            report.append(
+                run_scenario(
+                    url,
+                    filings,
+                    mode,
+                    concurrency,
+                    args.rate,
+                    args.max_retries,
+                    args.backoff_factor,
+                    args.document,
+                )
+            )
+            # NOTE: Lets the server's throttle refill, so scenarios do not affect each other
+            time.sleep(1)
+
+    with open(args.output, "w") as f:
+        json.dump({"settings": vars(args), "scenarios": report}, f, indent=2)
+    print()
+    print_report(report)
+    print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Measures how the public SECDocument methods scale with document size, using synthetic
+filings from test_utils/synthetic_filings.py. For each filing type and each size, this records
+the number of elements, and the runtime, peak RSS and peak traced memory of every method.
+
+Results are written as CSV. The script also prints the growth exponent of each method, i.e. the
+slope of log(runtime) against log(element count): ~1 means linear, ~2 quadratic. With --plot
+(requires matplotlib) the runtime and peak RSS curves are saved as an image.
+
+    PYTHONPATH=. python test_utils/benchmark_scaling.py --filing-type 10-K --plot scaling.png
+"""
+import argparse
+import csv
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from prepline_sec_filings.sec_document import SECDocument
+from prepline_sec_filings.sections import SECSection
+
+# NOTE: Sibling scripts, importable since the script's directory is on sys.path
+from benchmark_sections import measure_memory, sections_for_filing_type
+from synthetic_filings import generate_filing, section_headings
+
+DEFAULT_SCALES: List[int] = [5, 10, 20, 40, 80]
+CSV_FIELDNAMES: List[str] = [
+    "filing_type",
+    "paragraphs_per_section",
+    "input_bytes",
+    "elements",
+    "method",
+    "seconds",
+    "peak_rss_mb",
+    "peak_memory_mb",
+]
+
+
+def _parse(text: str) -> SECDocument:
+    sec_document = SECDocument.from_string(text)
+    # NOTE: Elements are partitioned lazily, so access them to include partitioning
+    sec_document.elements
+    return sec_document
+
+
+def document_methods(text: str, sec_document: SECDocument) -> Dict[str, Callable]:
+    """Returns the calls to measure, by name. Section lookups use RISK_FACTORS, which appears
+    in every filing type, and get_section_narrative[_ALL] extracts every section of the form
+    the way the API does for section=_ALL."""
+    sections = sections_for_filing_type(sec_document.filing_type)
+    return {
+        "from_string": lambda: _parse(text),
+        "get_table_of_contents": sec_document.get_table_of_contents,
+        "get_section_narrative_no_toc": lambda: sec_document.get_section_narrative_no_toc(
+            SECSection.RISK_FACTORS
+        ),
+        "get_section_narrative": lambda: sec_document.get_section_narrative(
+            SECSection.RISK_FACTORS
+        ),
+        "get_risk_narrative": sec_document.get_risk_narrative,
+        "get_section_narrative[_ALL]": lambda: [
+            sec_document.get_section_narrative(section) for section in sections
+        ],
+        "doc_after_cleaners": sec_document.doc_after_cleaners,
+    }
+
+
+def measure(func: Callable, repeat: int) -> Dict[str, float]:
+    """Returns the best wall clock time over repeat calls, and the peak RSS and peak traced
+    memory (see benchmark_sections.measure_memory). Memory is measured in separate calls since
+    tracing slows down execution."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {"seconds": min(durations), **measure_memory(func)}
+
+
+def run_scaling(filing_type: str, scales: List[int], repeat: int, **filing_kwargs) -> List[dict]:
+    rows = []
+    for paragraphs_per_section in scales:
+        text = generate_filing(
+            filing_type, paragraphs_per_section=paragraphs_per_section, **filing_kwargs
+        )
+        sec_document = _parse(text)
+        n_elements = len(sec_document.elements)
+        print(f"{filing_type} x{paragraphs_per_section}: {n_elements} elements", flush=True)
+        for method, func in document_methods(text, sec_document).items():
+            rows.append(
+                {
+                    "filing_type": filing_type,
+                    "paragraphs_per_section": paragraphs_per_section,
+                    "input_bytes": len(text.encode("utf-8")),
+                    "elements": n_elements,
+                    "method": method,
+                    **measure(func, repeat),
+                }
+            )
+    return rows
+
+
+def growth_exponents(rows: List[dict]) -> Dict[tuple, float]:
+    """Fits runtime ~ elements**k for each (filing_type, method) and returns k."""
+    series: Dict[tuple, List[dict]] = {}
+    for row in rows:
+        series.setdefault((row["filing_type"], row["method"]), []).append(row)
+    exponents = {}
+    for key, points in series.items():
+        if len(points) < 2:
+            continue
+        x = np.log([point["elements"] for point in points])
+        y = np.log([max(point["seconds"], 1e-9) for point in points])
+        exponents[key] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+
+def plot(rows: List[dict], filename: str):
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise SystemExit("--plot requires matplotlib, install it with `pip install matplotlib`")
+
+    filing_types = sorted({row["filing_type"] for row in rows})
+    fig, axes = plt.subplots(
+        len(filing_types), 2, figsize=(12, 4 * len(filing_types)), squeeze=False
+    )
+    for (ax_time, ax_memory), filing_type in zip(axes, filing_types):
+        methods = sorted({row["method"] for row in rows if row["filing_type"] == filing_type})
+        for method in methods:
+            points = [
+                row for row in rows if row["filing_type"] == filing_type and row["method"] == method
+            ]
+            elements = [point["elements"] for point in points]
+            ax_time.plot(elements, [point["seconds"] for point in points], marker="o", label=method)
+            ax_memory.plot(
+                elements, [point["peak_rss_mb"] for point in points], marker="o", label=method
+            )
+        ax_time.set(title=f"{filing_type} runtime", xlabel="elements", ylabel="seconds")
+        ax_time.set_xscale("log")
+        ax_time.set_yscale("log")
+        ax_memory.set(title=f"{filing_type} peak RSS", xlabel="elements", ylabel="MB")
+        ax_memory.set_xscale("log")
+        ax_time.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(filename)
+    print(f"wrote {filename}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--filing-type",
+        action="append",
+        help="Filing type(s) to generate, defaults to 10-K, 10-Q and S-1.",
+    )
+    parser.add_argument(
+        "--scales",
+        default=",".join(str(scale) for scale in DEFAULT_SCALES),
+        help="Comma separated paragraphs per section for each run.",
+    )
+    parser.add_argument("--subheadings-per-section", type=int, default=2)
+    parser.add_argument("--list-items-per-section", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench-scaling.csv")
+    parser.add_argument("--plot", help="Image file to plot the results to.")
+    args = parser.parse_args(argv)
+
+    filing_types = args.filing_type or ["10-K", "10-Q", "S-1"]
+    for filing_type in filing_types:
+        # NOTE: Raises early for filing types the generator does not know
+        section_headings(filing_type)
+    scales = [int(scale) for scale in args.scales.split(",")]
+
+    rows = []
+    for filing_type in filing_types:
+        rows.extend(
+            run_scaling(
+                filing_type,
+                scales,
+                args.repeat,
+                subheadings_per_section=args.subheadings_per_section,
+                list_items_per_section=args.list_items_per_section,
+            )
+        )
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"wrote {args.output}")
+
+    print("\ngrowth exponent of runtime vs. elements (1 = linear, 2 = quadratic):")
+    for (filing_type, method), exponent in sorted(growth_exponents(rows).items()):
+        print(f"  {filing_type:6} {method:32} {exponent:5.2f}")
+
+    if args.plot:
+        plot(rows, args.plot)
+
+
+if __name__ == "__main__":
+    main()
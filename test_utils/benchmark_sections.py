@@ -0,0 +1,234 @@
+"""Benchmarks the section pipeline on the sample SEC filings listed in test_utils/examples.json.
+For each filing this times parsing, TOC detection, each section's extraction, the full _ALL
+pipeline and ISD/CSV serialization, and records the peak memory of the _ALL pipeline: both the
+peak RSS, which includes the lxml parse trees, and the peak memory traced by tracemalloc, which
+only sees Python objects but points at the Python code responsible.
+
+Results are written as JSON. If a baseline file is given, results are compared against it and
+the script exits with a non-zero status when any metric regresses by more than the threshold, or
+when the baseline does not exist. Run with `make bench`, or `make bench-baseline` to record a
+new baseline."""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from unstructured.staging.base import convert_to_isd
+
+from prepline_sec_filings.api.section import convert_to_isd_csv, pipeline_api
+from prepline_sec_filings.profiling import peak_rss_bytes, reset_peak_rss
+from prepline_sec_filings.sec_document import SECDocument, REPORT_TYPES
+from prepline_sec_filings.sections import SECTIONS_10K, SECTIONS_10Q, SECTIONS_S1
+
+SEC_DOCS_DIR = os.environ.get("SEC_DOCS_DIR", "sample-docs")
+FILINGS_MANIFEST_JSON = os.path.join("test_utils", "examples.json")
+
+# Timings faster than this are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.005
+MIN_REGRESSION_MB = 1.0
+MEMORY_METRICS = ("peak_memory_mb", "peak_rss_mb")
+
+
+def sections_for_filing_type(filing_type: str):
+    if filing_type in REPORT_TYPES:
+        return SECTIONS_10K if filing_type.startswith("10-K") else SECTIONS_10Q
+    return SECTIONS_S1
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """Returns the median wall clock time of calling func repeat times."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def _parse(text: str) -> SECDocument:
+    sec_document = SECDocument.from_string(text)
+    # NOTE: Elements are partitioned lazily, so access them to include partitioning
+    sec_document.elements
+    return sec_document
+
+
+def benchmark_filing(text: str, repeat: int) -> dict:
+    """Runs each stage of the pipeline on a filing and returns the timings in seconds."""
+    results: dict = {"input_bytes": len(text.encode("utf-8"))}
+    results["parse"] = time_call(lambda: _parse(text), repeat)
+
+    sec_document = _parse(text)
+    results["elements"] = len(sec_document.elements)
+    results["toc"] = time_call(sec_document.get_table_of_contents, repeat)
+
+    section_results = {}
+    results["sections"] = {}
+    for section in sections_for_filing_type(sec_document.filing_type):
+        results["sections"][section.name] = time_call(
+            lambda: sec_document.get_section_narrative(section), repeat
+        )
+        section_results[section.name] = sec_document.get_section_narrative(section)
+
+    results["all_sections"] = time_call(lambda: pipeline_api(text, m_section=["_ALL"]), repeat)
+    results["isd"] = time_call(
+        lambda: {name: convert_to_isd(elements) for name, elements in section_results.items()},
+        repeat,
+    )
+    results["csv"] = time_call(lambda: convert_to_isd_csv(section_results), repeat)
+    results.update(measure_memory(lambda: pipeline_api(text, m_section=["_ALL"])))
+    return results
+
+
+def measure_memory(func: Callable) -> Dict[str, float]:
+    """Returns the peak RSS and the peak traced memory of calling func, in MB, each from a
+    separate call since tracing allocates memory too. Where the peak RSS cannot be reset, it is
+    the peak of the whole process so far."""
+    reset_peak_rss()
+    func()
+    peak_rss = peak_rss_bytes()
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_rss_mb": peak_rss / 1024**2, "peak_memory_mb": peak / 1024**2}
+
+
+def sample_filings(manifest_filename: str = FILINGS_MANIFEST_JSON) -> Dict[str, str]:
+    """Returns a mapping of filing name -> path for the filings in the manifest, in the same
+    naming scheme used by test_utils/get_sec_docs_from_edgar.py."""
+    with open(manifest_filename) as f:
+        manifest = json.load(f)
+    filings = {}
+    for ticker, filing_info in manifest.items():
+        cik = filing_info["cik"]
+        for form_type, accession_number in filing_info["forms"].items():
+            filename = f"{ticker}-{form_type}-{cik}-{accession_number}.xbrl".replace("/", "")
+            filings[f"{ticker}-{form_type}"] = os.path.join(SEC_DOCS_DIR, filename)
+    return filings
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.decode().strip()
+
+
+def run_benchmarks(filings: Dict[str, str], repeat: int) -> dict:
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "filings": {},
+    }
+    for name, filename in filings.items():
+        print(f"{name}...", end="", flush=True)
+        with open(filename) as f:
+            text = f.read()
+        results["filings"][name] = benchmark_filing(text, repeat)
+        print(f" {results['filings'][name]['all_sections']:.2f}s", flush=True)
+    return results
+
+
+def _flatten(filing_results: dict) -> Dict[str, float]:
+    flat = {}
+    for key, value in filing_results.items():
+        if key == "sections":
+            flat.update({f"sections.{name}": seconds for name, seconds in value.items()})
+        elif key not in ("input_bytes", "elements"):
+            flat[key] = value
+    return flat
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Returns a description of each metric that is more than threshold (a fraction) slower or
+    larger than in the baseline. Filings or metrics missing from the baseline are skipped."""
+    regressions = []
+    for name, filing_results in results["filings"].items():
+        if name not in baseline["filings"]:
+            continue
+        baseline_metrics = _flatten(baseline["filings"][name])
+        for metric, value in _flatten(filing_results).items():
+            if metric not in baseline_metrics:
+                continue
+            baseline_value = baseline_metrics[metric]
+            min_difference = (
+                MIN_REGRESSION_MB if metric in MEMORY_METRICS else MIN_REGRESSION_SECONDS
+            )
+            if value > baseline_value * (1 + threshold) and value - baseline_value > min_difference:
+                change = (value - baseline_value) / baseline_value if baseline_value else 0
+                regressions.append(
+                    f"{name} {metric}: {baseline_value:.4f} -> {value:.4f} (+{change:.0%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against.")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to --baseline instead of comparing against it, creating it.",
+    )
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, 0.2=20%%")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filing", action="append", help="Only run the named filing(s).")
+    args = parser.parse_args(argv)
+
+    if args.baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        # NOTE: Checked before running, and an error rather than recording one, so a missing
+        # baseline cannot make the regression check pass
+        print(
+            f"baseline {args.baseline} does not exist, record one with --update-baseline "
+            "(make bench-baseline) on the machine you compare on",
+            file=sys.stderr,
+        )
+        return 2
+
+    filings = sample_filings()
+    if args.filing:
+        filings = {name: filings[name] for name in args.filing}
+    results = run_benchmarks(filings, args.repeat)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote baseline {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}:")
+        print("\n".join(regressions))
+        return 1
+    print(f"no regressions above {args.threshold:.0%} compared to {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""Serves a local stand-in for the SEC EDGAR endpoints used by prepline_sec_filings.fetch, so the
+fetch layer can be exercised offline: real sockets, keep-alive connections, retries, rate
+limiting and concurrency, with none of the requests reaching sec.gov.
+
+Served endpoints, from the filings in test_utils/examples.json (the sample documents when they
+are present, otherwise synthetic filings from test_utils/synthetic_filings.py):
+
+    /Archives/edgar/data/<cik>/<accession>/<accession with dashes>.txt   (supports Range)
+    /Archives/edgar/data/<cik>/<accession>/<accession with dashes>-index.html
+    /Archives/edgar/data/<cik>/<accession>/<primary document>
+    /submissions/CIK<cik>.json
+    /files/company_tickers.json
+    /cgi-bin/browse-edgar?action=getcompany&CIK=<ticker>
+    /__stats                 counters for the requests served so far (?reset=1 clears them)
+
+Faults are injected at random: --latency adds an exponentially distributed delay with that
+mean to every response, --error-rate-429 and --error-rate-5xx answer with 429 (with
+Retry-After if --retry-after is set) or 500/502/503 instead. Like EDGAR, requests above
+--throttle-rate per second are answered with 429, which /__stats counts as throttled.
+
+Clients reach the server through edgar_session (requests) or EdgarTransport (httpx), which
+rewrite www.sec.gov and data.sec.gov URLs to it, so fetch.py runs unchanged:
+
+    PYTHONPATH=. python test_utils/fake_edgar.py --port 8000 --latency 0.05 --error-rate-5xx 0.02
+"""
+import argparse
+import collections
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from prepline_sec_filings.rate_limiter import SEC_RATE_LIMIT, RateLimiter
+from synthetic_filings import generate_filing
+
+SEC_DOCS_DIR = os.environ.get("SEC_DOCS_DIR", "sample-docs")
+FILINGS_MANIFEST_JSON = os.path.join("test_utils", "examples.json")
+EDGAR_HOSTS: List[str] = ["https://www.sec.gov", "http://www.sec.gov", "https://data.sec.gov"]
+
+_ARCHIVE_RE = re.compile(r"^/Archives/edgar/data/(\d+)/(\d{18})/([\d-]+)\.txt$")
+_INDEX_RE = re.compile(r"^/Archives/edgar/data/(\d+)/(\d{18})/([\d-]+)-index\.html$")
+_DOCUMENT_RE = re.compile(r"^/Archives/edgar/data/(\d+)/(\d{18})/([^/]+)$")
+_TEXT_RE = re.compile(rb"<TEXT>\s*(.*?)\s*</TEXT>", re.DOTALL)
+_SUBMISSIONS_RE = re.compile(r"^/submissions/CIK0*(\d+)\.json$")
+_RANGE_RE = re.compile(r"^bytes=(\d+)-$")
+
+
+class FakeFiling(NamedTuple):
+    ticker: str
+    cik: str
+    form_type: str
+    accession_number: str
+    content: bytes
+
+    @property
+    def primary_document(self) -> str:
+        return f"{self.ticker}-{self.form_type.replace('/', '').lower()}.htm"
+
+    @property
+    def primary_document_content(self) -> bytes:
+        """The first document of the submission, which is the primary document on EDGAR."""
+        match = _TEXT_RE.search(self.content)
+        return match.group(1) if match else self.content
+
+
+def load_filings(
+    manifest_filename: str = FILINGS_MANIFEST_JSON, synthetic_scale: int = 20
+) -> List[FakeFiling]:
+    """Returns the filings in the manifest, read from the sample documents when they are
+    present and generated with synthetic_scale paragraphs per section otherwise."""
+    with open(manifest_filename) as f:
+        manifest = json.load(f)
+    filings = []
+    for ticker, filing_info in manifest.items():
+        cik = str(filing_info["cik"])
+        for form_type, accession_number in filing_info["forms"].items():
+            filename = f"{ticker}-{form_type}-{cik}-{accession_number}.xbrl".replace("/", "")
+            path = os.path.join(SEC_DOCS_DIR, filename)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    content = f.read()
+            else:
+                content = generate_filing(
+                    form_type,
+                    paragraphs_per_section=synthetic_scale,
+                    company=ticker.upper(),
+                    seed=len(filings),
+                ).encode("utf-8")
+            filings.append(FakeFiling(ticker, cik, form_type, accession_number, content))
+    return filings
+
+
+class FakeEdgar:
+    """The state of the stand-in server: the filings it serves, the faults it injects and
+    counters of what it served."""
+
+    def __init__(
+        self,
+        filings: List[FakeFiling],
+        latency: float = 0,
+        error_rate_429: float = 0,
+        error_rate_5xx: float = 0,
+        retry_after: Optional[float] = None,
+        throttle_rate: Optional[float] = SEC_RATE_LIMIT,
+        seed: int = 0,
+    ):
+        self.filings = {filing.accession_number: filing for filing in filings}
+        self.latency = latency
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.retry_after = retry_after
+        # NOTE: A burst of 2 tolerates the jitter between when a client sends requests at
+        # exactly the rate and when they arrive
+        self.throttle = (
+            RateLimiter(throttle_rate, capacity=2) if throttle_rate is not None else None
+        )
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+            self.bytes_sent = 0
+            self.statuses: Dict[int, int] = collections.Counter()
+            self.injected = 0
+            self.throttled = 0
+            self.max_requests_per_second = 0
+            self._recent: Deque[float] = collections.deque()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "bytes_sent": self.bytes_sent,
+                "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+                "injected_errors": self.injected,
+                "throttled": self.throttled,
+                "max_requests_per_second": self.max_requests_per_second,
+            }
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def fault(self) -> Optional[int]:
+        """Records a request and returns the status of the error to answer it with, if any."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            self._recent.append(now)
+            while self._recent[0] <= now - 1:
+                self._recent.popleft()
+            self.max_requests_per_second = max(self.max_requests_per_second, len(self._recent))
+            draw = self._random.random()
+            server_error = self._random.choice([500, 502, 503])
+            delay = self._random.expovariate(1 / self.latency) if self.latency > 0 else 0
+        status: Optional[int] = None
+        if self.throttle is not None and self.throttle.try_acquire() > 0:
+            status = 429
+            with self._lock:
+                self.throttled += 1
+        elif draw < self.error_rate_429 + self.error_rate_5xx:
+            status = 429 if draw < self.error_rate_429 else server_error
+            with self._lock:
+                self.injected += 1
+        time.sleep(delay)
+        return status
+
+    def sent(self, status: int, size: int):
+        with self._lock:
+            self.statuses[status] += 1
+            self.bytes_sent += size
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeEdgarServer"
+
+    def setup(self):
+        super().setup()
+        self.server.edgar.connected()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        edgar = self.server.edgar
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            if "reset" in parse_qs(url.query):
+                edgar.reset_stats()
+            return self._send(
+                200, json.dumps(edgar.stats()).encode(), "application/json", record=False
+            )
+
+        status = edgar.fault()
+        if status is not None:
+            headers = {}
+            if status == 429 and edgar.retry_after is not None:
+                headers["Retry-After"] = f"{edgar.retry_after:g}"
+            return self._send(status, b"", headers=headers)
+
+        archive = _ARCHIVE_RE.match(url.path)
+        index = _INDEX_RE.match(url.path)
+        document = _DOCUMENT_RE.match(url.path)
+        submissions = _SUBMISSIONS_RE.match(url.path)
+        if archive:
+            filing = edgar.filings.get(archive.group(2))
+            if filing is None or archive.group(1) != filing.cik:
+                return self._send(404, b"")
+            return self._send_range(filing.content)
+        elif index:
+            filing = edgar.filings.get(index.group(2))
+            if filing is None or index.group(1) != filing.cik:
+                return self._send(404, b"")
+            return self._send(200, _filing_index_html(filing), "text/html")
+        elif document:
+            filing = edgar.filings.get(document.group(2))
+            if (
+                filing is None
+                or document.group(1) != filing.cik
+                or document.group(3) != filing.primary_document
+            ):
+                return self._send(404, b"")
+            return self._send(200, filing.primary_document_content, "text/html")
+        elif submissions:
+            return self._send_submissions(submissions.group(1))
+        elif url.path == "/files/company_tickers.json":
+            return self._send_company_tickers()
+        elif url.path == "/cgi-bin/browse-edgar":
+            return self._send_browse_edgar(parse_qs(url.query).get("CIK", [""])[0])
+        return self._send(404, b"")
+
+    def _send_range(self, content: bytes):
+        match = _RANGE_RE.match(self.headers.get("Range", ""))
+        if match is None:
+            return self._send(200, content)
+        start = int(match.group(1))
+        if start >= len(content):
+            return self._send(416, b"", headers={"Content-Range": f"bytes */{len(content)}"})
+        content_range = f"bytes {start}-{len(content) - 1}/{len(content)}"
+        return self._send(206, content[start:], headers={"Content-Range": content_range})
+
+    def _send_submissions(self, cik: str):
+        filings = [filing for filing in self.server.edgar.filings.values() if filing.cik == cik]
+        if not filings:
+            return self._send(404, b"")
+        recent = {
+            "accessionNumber": [_add_dashes(filing.accession_number) for filing in filings],
+            "form": [filing.form_type for filing in filings],
+            # NOTE: Most recent first, as on EDGAR
+            "filingDate": [f"2022-12-{28 - i:02}" for i in range(len(filings))],
+            "primaryDocument": [filing.primary_document for filing in filings],
+        }
+        payload = {"cik": cik, "filings": {"recent": recent, "files": []}}
+        return self._send(200, json.dumps(payload).encode(), "application/json")
+
+    def _send_company_tickers(self):
+        companies = {}
+        for filing in self.server.edgar.filings.values():
+            companies[filing.ticker] = {
+                "cik_str": int(filing.cik),
+                "ticker": filing.ticker.upper(),
+                "title": filing.ticker.upper(),
+            }
+        payload = {str(i): company for i, company in enumerate(companies.values())}
+        return self._send(200, json.dumps(payload).encode(), "application/json")
+
+    def _send_browse_edgar(self, ticker: str):
+        for filing in self.server.edgar.filings.values():
+            if filing.ticker == ticker.lower():
+                body = f'<a href="/cgi-bin/browse-edgar?action=getcompany&CIK={filing.cik:0>10}">'
+                return self._send(200, body.encode(), "text/html")
+        return self._send(200, b"<html>No matching Ticker Symbol.</html>", "text/html")
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str = "text/plain",
+        headers: Optional[Dict[str, str]] = None,
+        record: bool = True,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        if record:
+            self.server.edgar.sent(status, len(body))
+
+
+class FakeEdgarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, edgar: FakeEdgar, port: int = 0):
+        self.edgar = edgar
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@contextmanager
+def running(edgar: FakeEdgar, port: int = 0) -> Iterator[str]:
+    """Serves edgar from a background thread and yields the base URL of the server."""
+    server = FakeEdgarServer(edgar, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.url
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class _RedirectAdapter(HTTPAdapter):
+    """Sends requests for EDGAR to the stand-in server instead, through its own pool of
+    keep-alive connections."""
+
+    def __init__(self, base_url: str, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = self.base_url + url.path + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+
+def edgar_session(
+    base_url: str,
+    company: str = "Fake Edgar",
+    email: str = "fake@edgar.test",
+    pool_size: int = 10,
+) -> requests.Session:
+    """Returns a session for fetch.EdgarClient that sends EDGAR requests to base_url."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": f"{company} {email}"})
+    adapter = _RedirectAdapter(base_url, pool_maxsize=pool_size)
+    for host in EDGAR_HOSTS:
+        session.mount(host, adapter)
+    return session
+
+
+def edgar_transport(base_url: str, max_connections: int = 10):
+    """Returns an httpx transport for async_fetch.AsyncEdgarClient that sends EDGAR requests to
+    base_url (requires httpx)."""
+    import httpx
+
+    class EdgarTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            request.url = httpx.URL(base_url + request.url.raw_path.decode("ascii"))
+            request.headers["Host"] = request.url.netloc.decode("ascii")
+            return await super().handle_async_request(request)
+
+    return EdgarTransport(limits=httpx.Limits(max_connections=max_connections))
+
+
+def _add_dashes(accession_number: str) -> str:
+    return f"{accession_number[:10]}-{accession_number[10:12]}-{accession_number[12:]}"
+
+
+def _filing_index_html(filing: FakeFiling) -> bytes:
+    """Returns a filing index page that lists the primary document first, as on EDGAR."""
+    submission = f"{_add_dashes(filing.accession_number)}.txt"
+    rows = [
+        ("1", filing.form_type, filing.primary_document, filing.form_type),
+        ("", "Complete submission text file", submission, ""),
+    ]
+    sizes = [len(filing.primary_document_content), len(filing.content)]
+    cells = "".join(
+        f'<tr><td>{seq}</td><td>{description}</td><td><a href="{name}">{name}</a></td>'
+        f"<td>{type_}</td><td>{size}</td></tr>"
+        for (seq, description, name, type_), size in zip(rows, sizes)
+    )
+    return (
+        '<html><body><table class="tableFile" summary="Document Format Files">'
+        "<tr><th>Seq</th><th>Description</th><th>Document</th><th>Type</th><th>Size</th></tr>"
+        f"{cells}</table></body></html>"
+    ).encode("utf-8")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0, help="Mean delay in seconds.")
+    parser.add_argument("--error-rate-429", type=float, default=0)
+    parser.add_argument("--error-rate-5xx", type=float, default=0)
+    parser.add_argument("--retry-after", type=float, help="Retry-After of injected 429s.")
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=SEC_RATE_LIMIT,
+        help="Requests per second above which requests are throttled. 0 disables throttling.",
+    )
+    parser.add_argument("--synthetic-scale", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    edgar = FakeEdgar(
+        load_filings(synthetic_scale=args.synthetic_scale),
+        latency=args.latency,
+        error_rate_429=args.error_rate_429,
+        error_rate_5xx=args.error_rate_5xx,
+        retry_after=args.retry_after,
+        throttle_rate=args.throttle_rate or None,
+    )
+    server = FakeEdgarServer(edgar, args.port)
+    print(f"serving {len(edgar.filings)} filings on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,13 @@ import re
 from pathlib import Path
 
 
+from prepline_sec_filings.bulk_download import (
+    download_manifest,
+    read_checksums,
+    write_manifest,
+)
 from prepline_sec_filings.fetch import (
-    get_filing,
+    EdgarClient,
     get_recent_acc_by_cik,
     get_recent_cik_and_acc_by_ticker,
 )
@@ -19,22 +24,15 @@ from prepline_sec_filings.fetch import (
 SEC_DOCS_DIR = os.environ.get("SEC_DOCS_DIR", "sample-docs")
 SEC_API_ORGANIZATION = os.environ.get("SEC_API_ORGANIZATION")
 SEC_API_EMAIL = os.environ.get("SEC_API_EMAIL")
+SEC_DOCS_MAX_WORKERS = int(os.environ.get("SEC_DOCS_MAX_WORKERS", 10))
 # only 1 of these 2 manifests types determines what gets downloaded
 FILINGS_MANIFEST_JSON = os.path.join("test_utils", "examples.json")
 FILINGS_MANIFEST_FILE = os.environ.get("FILINGS_MANIFEST_FILE")
-
-
-def fetch_filing_xbrl(ticker, form_type, cik, accession_number, skip_fetch_if_file_exists=True):
-    "Fetch a single filing from edgar and write it to $SEC_DOCS_DIR"
-    _doc_name = f"{ticker}-{form_type}-{cik}-{accession_number}.xbrl".replace("/", "")
-    sec_doc_filename = os.path.join(SEC_DOCS_DIR, _doc_name)
-    if skip_fetch_if_file_exists and Path(sec_doc_filename).is_file():
-        print(f"skipping download since {sec_doc_filename} exists")
-        return
-
-    text = get_filing(cik, accession_number, SEC_API_ORGANIZATION, SEC_API_EMAIL)
-    with open(sec_doc_filename, "w+") as f:
-        f.write(text)
+SEC_DOCS_CHECKSUMS_FILE = os.path.join(SEC_DOCS_DIR, "sample-sec-docs.sha256")
+SEC_DOCS_MANIFEST_JSON = os.path.join(SEC_DOCS_DIR, "sec_docs_manifest.json")
+# NOTE: requests decodes text/plain responses without a charset, which is how EDGAR serves
+# filings, as ISO-8859-1
+EDGAR_TEXT_ENCODING = "ISO-8859-1"
 
 
 def parse_examples_json():
@@ -54,7 +52,17 @@ def parse_manifest_text_file():
     return ticker_form_type_pairs
 
 
-def fetch_filings(manifest_json_obj):
+def rewrite_as_text(path):
+    """Rewrites a downloaded filing the way earlier versions of this script wrote it, i.e. the
+    text of the response (see EDGAR_TEXT_ENCODING) encoded as UTF-8. sample-sec-docs.sha256
+    holds the checksums of files written that way."""
+    with open(path, "rb") as f:
+        text = f.read().decode(EDGAR_TEXT_ENCODING)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def fetch_filings(manifest_json_obj, skip_fetch_if_file_exists=True):
     """Given json like:
       {
         "mmm": {
@@ -63,13 +71,33 @@ def fetch_filings(manifest_json_obj):
             "10-Q": "000006674022000065"
           }
         },
-    download the indicated xbrl documents from edgar.
-    """
-    for ticker, filing_info in manifest_json_obj.items():
-        cik = filing_info["cik"]
-        for form_type, accession_number in filing_info["forms"].items():
-            fetch_filing_xbrl(ticker, form_type, cik, accession_number)
-            print(f"fetched {ticker}")
+    download the indicated xbrl documents from edgar, several at a time. Files that are already
+    in $SEC_DOCS_DIR are kept if they match sample-sec-docs.sha256 (or have no checksum there),
+    and the checksum and size of every file are recorded in sec_docs_manifest.json."""
+    checksums = None
+    if Path(SEC_DOCS_CHECKSUMS_FILE).is_file():
+        checksums = read_checksums(SEC_DOCS_CHECKSUMS_FILE)
+    client = EdgarClient(SEC_API_ORGANIZATION, SEC_API_EMAIL, pool_size=SEC_DOCS_MAX_WORKERS)
+    results = download_manifest(
+        client,
+        manifest_json_obj,
+        SEC_DOCS_DIR,
+        checksums=checksums,
+        max_workers=SEC_DOCS_MAX_WORKERS,
+        overwrite=not skip_fetch_if_file_exists,
+        transform=rewrite_as_text,
+    )
+    for result in results:
+        if result.error is not None:
+            print(f"failed to fetch {result.path}: {result.error}")
+        elif result.skipped:
+            print(f"skipping download since {result.path} exists")
+        else:
+            print(f"fetched {result.path}")
+    write_manifest(SEC_DOCS_MANIFEST_JSON, manifest_json_obj)
+    failed = [result.path for result in results if result.error is not None]
+    if failed:
+        raise RuntimeError(f"failed to fetch {', '.join(failed)}")
 
 
 def get_sample_docs():
@@ -104,10 +132,9 @@ def get_latest_docs():
             ticker = ticker_or_cik
             cik, acc_num, form_type = get_recent_cik_and_acc_by_ticker(ticker, _form_type)
         _add_to_manifest_json_obj(manifest_json_obj, ticker_or_cik, form_type, cik, acc_num)
-        fetch_filing_xbrl(ticker_or_cik, form_type, cik, acc_num)
+        print("done")
 
-    with open(os.path.join(SEC_DOCS_DIR, "sec_docs_manifest.json"), "w") as f:
-        json.dump(manifest_json_obj, f, indent=2)
+    fetch_filings(manifest_json_obj)
 
 
 if __name__ == "__main__":
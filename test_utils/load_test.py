@@ -0,0 +1,361 @@
+"""Load tests the section API. Starts the app locally with uvicorn (or targets --url), replays
+filings against it and writes a throughput and latency report.
+
+Each scenario is one combination of --mode, --section and --concurrency:
+
+    single     one filing per request
+    multi      --files-per-request filings per request, returned as a JSON list
+    gzip       one gzip-compressed filing per request
+    multipart  --files-per-request filings per request, returned as multipart/mixed
+
+By default each scenario is closed loop: --concurrency clients send requests back to back.
+With --rate, requests instead arrive as a Poisson process at that many requests per second and
+are served by up to --concurrency clients, and latency includes the time spent waiting for a
+free client. Filings are the sample documents (make dl-test-artifacts) when they are present,
+otherwise synthetic filings from test_utils/synthetic_filings.py.
+
+    PYTHONPATH=. python test_utils/load_test.py --mode single --mode multipart \\
+        --concurrency 1 --concurrency 4 --duration 30
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import gzip
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from benchmark_sections import sample_filings
+from synthetic_filings import generate_filing
+
+SECTION_ROUTE = "/sec-filings/v0/section"
+MODES: List[str] = ["single", "multi", "gzip", "multipart"]
+
+Filing = Tuple[str, bytes]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(workers: int = 1, startup_timeout: float = 60) -> Iterator[str]:
+    """Runs the API with uvicorn in a subprocess and yields its base URL once it is ready, i.e.
+    has warmed up, so the measurements do not include the warm-up."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [".", os.environ.get("PYTHONPATH")])),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "prepline_sec_filings.server:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        # NOTE: Each request reaches one of the workers, so wait until several in a row are
+        # ready rather than the first one
+        ready = 0
+        while ready < 2 * workers:
+            if proc.poll() is not None:
+                raise RuntimeError(f"API server exited with status {proc.returncode}")
+            try:
+                ready = ready + 1 if requests.get(f"{url}/readyz", timeout=1).ok else 0
+            except requests.ConnectionError:
+                ready = 0
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"API server did not become ready in {startup_timeout}s")
+            if not ready:
+                time.sleep(0.2)
+        yield url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def load_filings(synthetic_scales: Optional[List[int]] = None) -> List[Filing]:
+    """Returns (name, content) for the sample documents, or synthetic filings of each scale
+    (paragraphs per section) if synthetic_scales is given or no sample documents are present."""
+    if not synthetic_scales:
+        filings = []
+        for name, filename in sample_filings().items():
+            if os.path.exists(filename):
+                with open(filename, "rb") as f:
+                    filings.append((name, f.read()))
+        if filings:
+            return filings
+        synthetic_scales = [10, 40]
+    return [
+        (
+            f"synthetic-{filing_type}-x{scale}",
+            generate_filing(filing_type, paragraphs_per_section=scale).encode("utf-8"),
+        )
+        for filing_type in ("10-K", "10-Q", "S-1")
+        for scale in synthetic_scales
+    ]
+
+
+def build_request(mode: str, filings: List[Filing], section: str) -> dict:
+    """Returns the keyword arguments to requests.post for the filings in the given mode."""
+    if mode == "gzip":
+        files = [
+            ("text_files", (f"{name}.xbrl.gz", gzip.compress(content), "application/gzip"))
+            for name, content in filings
+        ]
+    else:
+        files = [
+            ("text_files", (f"{name}.xbrl", content, "text/plain")) for name, content in filings
+        ]
+    accept = "multipart/mixed" if mode == "multipart" else "application/json"
+    return {"files": files, "data": {"section": [section]}, "headers": {"Accept": accept}}
+
+
+def _request_filings(
+    mode: str, filings: List[Filing], files_per_request: int
+) -> Iterator[List[Filing]]:
+    """Cycles through the filings, taking files_per_request of them for multi-file modes."""
+    n_files = files_per_request if mode in ("multi", "multipart") else 1
+    cycle = itertools.cycle(filings)
+    while True:
+        yield [next(cycle) for _ in range(n_files)]
+
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: List[dict] = []
+
+    def add(self, sample: dict):
+        with self.lock:
+            self.samples.append(sample)
+
+
+_thread_local = threading.local()
+
+
+def _send(url: str, request_filings: List[Filing], mode: str, section: str, scheduled: float):
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    sample = {
+        "filings": [name for name, _ in request_filings],
+        "input_bytes": sum(len(content) for _, content in request_filings),
+    }
+    try:
+        response = session.post(
+            url + SECTION_ROUTE, timeout=300, **build_request(mode, request_filings, section)
+        )
+        sample["status"] = response.status_code
+        sample["output_bytes"] = len(response.content)
+    except requests.RequestException as e:
+        sample["status"] = type(e).__name__
+    sample["latency"] = time.perf_counter() - scheduled
+    return sample
+
+
+def run_scenario(
+    url: str,
+    filings: List[Filing],
+    mode: str,
+    section: str,
+    concurrency: int,
+    duration: float,
+    rate: Optional[float] = None,
+    files_per_request: int = 2,
+    seed: int = 0,
+) -> dict:
+    """Sends requests for duration seconds and returns a report of the scenario."""
+    recorder = _Recorder()
+    request_filings = _request_filings(mode, filings, files_per_request)
+    started = time.perf_counter()
+    deadline = started + duration
+
+    if rate is None:
+        lock = threading.Lock()
+
+        def client():
+            while time.perf_counter() < deadline:
+                with lock:
+                    next_filings = next(request_filings)
+                recorder.add(_send(url, next_filings, mode, section, time.perf_counter()))
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        rng = random.Random(seed)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = []
+            scheduled = started
+            while True:
+                scheduled += rng.expovariate(rate)
+                if scheduled >= deadline:
+                    break
+                time.sleep(max(scheduled - time.perf_counter(), 0))
+                futures.append(
+                    executor.submit(_send, url, next(request_filings), mode, section, scheduled)
+                )
+            for future in futures:
+                recorder.add(future.result())
+
+    elapsed = time.perf_counter() - started
+    return summarize(
+        recorder.samples,
+        elapsed,
+        {"mode": mode, "section": section, "concurrency": concurrency, "rate": rate},
+    )
+
+
+def _latency_stats(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "p50_ms": round(p50 * 1000, 1),
+        "p90_ms": round(p90 * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 1),
+    }
+
+
+def summarize(samples: List[dict], elapsed: float, scenario: dict) -> dict:
+    ok = [sample for sample in samples if sample["status"] == 200]
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+
+    # NOTE: Latency by filing only makes sense for requests with a single filing
+    by_filing: Dict[str, List[float]] = {}
+    for sample in ok:
+        if len(sample["filings"]) == 1:
+            by_filing.setdefault(sample["filings"][0], []).append(sample["latency"])
+
+    return {
+        **scenario,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_s": round(len(ok) / elapsed, 3),
+        "filings_per_s": round(sum(len(sample["filings"]) for sample in ok) / elapsed, 3),
+        "input_mb_per_s": round(sum(sample["input_bytes"] for sample in ok) / elapsed / 1e6, 3),
+        "latency": _latency_stats([sample["latency"] for sample in ok]),
+        "latency_by_filing": {
+            name: _latency_stats(latencies) for name, latencies in sorted(by_filing.items())
+        },
+    }
+
+
+def print_report(report: List[dict]):
+    header = (
+        f"{'mode':10} {'section':22} {'conc':>4} {'rate':>6} {'reqs':>6} {'errs':>5} "
+        f"{'req/s':>7} {'files/s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for scenario in report:
+        latency = scenario["latency"]
+        rate = f"{scenario['rate']:g}" if scenario["rate"] else "-"
+        print(
+            f"{scenario['mode']:10} {scenario['section']:22} {scenario['concurrency']:>4} "
+            f"{rate:>6} {scenario['requests']:>6} {scenario['errors']:>5} "
+            f"{scenario['requests_per_s']:>7.2f} {scenario['filings_per_s']:>7.2f} "
+            f"{latency.get('p50_ms', float('nan')):>8.1f} "
+            f"{latency.get('p90_ms', float('nan')):>8.1f} "
+            f"{latency.get('p99_ms', float('nan')):>8.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running API. Starts one locally if unset.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers to start.")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Defaults to single.")
+    parser.add_argument("--section", action="append", help="Defaults to RISK_FACTORS.")
+    parser.add_argument("--concurrency", action="append", type=int, help="Defaults to 1.")
+    parser.add_argument("--rate", type=float, help="Open loop arrival rate in requests/s.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario.")
+    parser.add_argument("--files-per-request", type=int, default=2)
+    parser.add_argument("--filing", action="append", help="Only replay the named filing(s).")
+    parser.add_argument(
+        "--synthetic",
+        help="Comma separated paragraphs per section of synthetic filings to use instead of "
+        "the sample documents.",
+    )
+    parser.add_argument("--output", default="load-test-report.json")
+    args = parser.parse_args(argv)
+
+    synthetic_scales = (
+        [int(scale) for scale in args.synthetic.split(",")] if args.synthetic else None
+    )
+    filings = load_filings(synthetic_scales)
+    if args.filing:
+        filings = [(name, content) for name, content in filings if name in args.filing]
+    if not filings:
+        raise SystemExit("no filings to replay")
+    print(f"replaying {len(filings)} filing(s)", flush=True)
+
+    scenarios = list(
+        itertools.product(
+            args.mode or ["single"], args.section or ["RISK_FACTORS"], args.concurrency or [1]
+        )
+    )
+    server = nullcontext(args.url.rstrip("/")) if args.url else local_server(args.workers)
+    with server as url:
+        report = []
+        for mode, section, concurrency in scenarios:
+            print(f"{mode} {section} x{concurrency}...", flush=True)
+            report.append(
+                run_scenario(
+                    url,
+                    filings,
+                    mode,
+                    section,
+                    concurrency,
+                    args.duration,
+                    rate=args.rate,
+                    files_per_request=args.files_per_request,
+                )
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {"workers": args.workers if not args.url else None, "scenarios": report}, f, indent=2
+        )
+    print()
+    print_report(report)
+    print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
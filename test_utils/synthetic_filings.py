@@ -0,0 +1,331 @@
+"""Generates synthetic 10-K, 10-Q and S-1 submissions for scaling tests. The output mimics the
+layout of the EDGAR filings the pipeline is built for: a <TYPE> header, a table of contents,
+item headings (grouped into parts for 10-K/10-Q) and section bodies made of subheadings,
+narrative paragraphs and bulleted lists. The size and title density are controlled by the
+parameters of generate_filing, and the output is deterministic for a given seed.
+
+Example:
+
+    PYTHONPATH=. python test_utils/synthetic_filings.py --filing-type 10-K \\
+        --paragraphs-per-section 50 > synthetic-10-K.xbrl
+"""
+import argparse
+import html
+import random
+from typing import List, Optional, Sequence, Tuple
+
+from prepline_sec_filings.sec_document import REPORT_TYPES, S1_TYPES
+
+# (part, item, title) for each heading of the form. Titles match the section patterns in
+# prepline_sec_filings.sections.
+ITEMS_10K: List[Tuple[str, str, str]] = [
+    ("PART I", "1", "BUSINESS"),
+    ("PART I", "1A", "RISK FACTORS"),
+    ("PART I", "1B", "UNRESOLVED STAFF COMMENTS"),
+    ("PART I", "2", "PROPERTIES"),
+    ("PART I", "3", "LEGAL PROCEEDINGS"),
+    ("PART I", "4", "MINE SAFETY DISCLOSURES"),
+    (
+        "PART II",
+        "5",
+        "MARKET FOR REGISTRANT'S COMMON EQUITY, RELATED STOCKHOLDER MATTERS AND ISSUER "
+        "PURCHASES OF EQUITY SECURITIES",
+    ),
+    ("PART II", "6", "[RESERVED]"),
+    (
+        "PART II",
+        "7",
+        "MANAGEMENT'S DISCUSSION AND ANALYSIS OF FINANCIAL CONDITION AND RESULTS OF OPERATIONS",
+    ),
+    ("PART II", "7A", "QUANTITATIVE AND QUALITATIVE DISCLOSURES ABOUT MARKET RISK"),
+    ("PART II", "8", "FINANCIAL STATEMENTS AND SUPPLEMENTARY DATA"),
+    (
+        "PART II",
+        "9",
+        "CHANGES IN AND DISAGREEMENTS WITH ACCOUNTANTS ON ACCOUNTING AND FINANCIAL DISCLOSURE",
+    ),
+    ("PART II", "9A", "CONTROLS AND PROCEDURES"),
+    ("PART II", "9B", "OTHER INFORMATION"),
+    ("PART III", "10", "DIRECTORS, EXECUTIVE OFFICERS AND CORPORATE GOVERNANCE"),
+    ("PART III", "11", "EXECUTIVE COMPENSATION"),
+    (
+        "PART III",
+        "12",
+        "SECURITY OWNERSHIP OF CERTAIN BENEFICIAL OWNERS AND MANAGEMENT AND RELATED "
+        "STOCKHOLDER MATTERS",
+    ),
+    (
+        "PART III",
+        "13",
+        "CERTAIN RELATIONSHIPS AND RELATED TRANSACTIONS, AND DIRECTOR INDEPENDENCE",
+    ),
+    ("PART III", "14", "PRINCIPAL ACCOUNTANT FEES AND SERVICES"),
+    ("PART IV", "15", "EXHIBITS, FINANCIAL STATEMENT SCHEDULES"),
+    ("PART IV", "16", "FORM 10-K SUMMARY"),
+]
+
+ITEMS_10Q: List[Tuple[str, str, str]] = [
+    ("PART I", "1", "FINANCIAL STATEMENTS"),
+    (
+        "PART I",
+        "2",
+        "MANAGEMENT'S DISCUSSION AND ANALYSIS OF FINANCIAL CONDITION AND RESULTS OF OPERATIONS",
+    ),
+    ("PART I", "3", "QUANTITATIVE AND QUALITATIVE DISCLOSURES ABOUT MARKET RISK"),
+    ("PART I", "4", "CONTROLS AND PROCEDURES"),
+    ("PART II", "1", "LEGAL PROCEEDINGS"),
+    ("PART II", "1A", "RISK FACTORS"),
+    ("PART II", "2", "UNREGISTERED SALES OF EQUITY SECURITIES AND USE OF PROCEEDS"),
+    ("PART II", "3", "DEFAULTS UPON SENIOR SECURITIES"),
+    ("PART II", "4", "MINE SAFETY DISCLOSURES"),
+    ("PART II", "5", "OTHER INFORMATION"),
+    ("PART II", "6", "EXHIBITS"),
+]
+
+PART_TITLES = {
+    "10-Q": {
+        "PART I": "FINANCIAL INFORMATION",
+        "PART II": "OTHER INFORMATION",
+    },
+}
+
+SECTIONS_S1: List[str] = [
+    "PROSPECTUS SUMMARY",
+    "ABOUT THIS PROSPECTUS",
+    "SPECIAL NOTE REGARDING FORWARD-LOOKING STATEMENTS",
+    "RISK FACTORS",
+    "USE OF PROCEEDS",
+    "DIVIDEND POLICY",
+    "CAPITALIZATION",
+    "DILUTION",
+    "MANAGEMENT'S DISCUSSION AND ANALYSIS OF FINANCIAL CONDITION AND RESULTS OF OPERATIONS",
+    "BUSINESS",
+    "MANAGEMENT",
+    "EXECUTIVE COMPENSATION",
+    "CERTAIN RELATIONSHIPS AND RELATED PARTY TRANSACTIONS",
+    "PRINCIPAL STOCKHOLDERS",
+    "DESCRIPTION OF CAPITAL STOCK",
+    "SHARES ELIGIBLE FOR FUTURE SALE",
+    "MATERIAL U.S. FEDERAL INCOME TAX CONSEQUENCES TO NON-U.S. HOLDERS",
+    "UNDERWRITING",
+    "LEGAL MATTERS",
+    "EXPERTS",
+    "WHERE YOU CAN FIND MORE INFORMATION",
+]
+
+_SUBJECTS = [
+    "Our business",
+    "The Company",
+    "Our operating results",
+    "Our revenue",
+    "Demand for our products",
+    "Our supply chain",
+    "The market price of our common stock",
+    "Our indebtedness",
+    "Our international operations",
+    "Our information technology systems",
+    "Competition in our industry",
+    "Changes in interest rates",
+]
+_VERBS = [
+    "could be adversely affected by",
+    "may fluctuate significantly due to",
+    "depends substantially on",
+    "is subject to",
+    "has been impacted by",
+    "may decline as a result of",
+    "could be harmed by",
+    "is exposed to",
+]
+_OBJECTS = [
+    "changes in general economic conditions",
+    "the loss of key customers or suppliers",
+    "increased competition from new market entrants",
+    "disruptions in our manufacturing facilities",
+    "cybersecurity incidents and data breaches",
+    "fluctuations in foreign currency exchange rates",
+    "new laws and regulations that apply to our industry",
+    "our ability to attract and retain qualified personnel",
+    "delays in the development of new products",
+    "litigation and regulatory proceedings",
+]
+_CLAUSES = [
+    "and we cannot predict the timing or extent of these effects",
+    "which could result in a material decline in our net sales",
+    "and we may be required to incur significant additional costs",
+    "as we experienced during the prior fiscal year",
+    "and there can be no assurance that our efforts will be successful",
+    "",
+]
+_SUBHEADINGS = [
+    "Risks Related to Our Business",
+    "Risks Related to Our Industry",
+    "Risks Related to Our Common Stock",
+    "Overview",
+    "Results of Operations",
+    "Liquidity and Capital Resources",
+    "Critical Accounting Estimates",
+    "Competition",
+    "Employees",
+    "Seasonality",
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    clause = rng.choice(_CLAUSES)
+    sentence = f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+    return f"{sentence}, {clause}." if clause else f"{sentence}."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def section_headings(filing_type: str) -> List[Tuple[Optional[str], str]]:
+    """Returns (part, heading) for each section heading of the filing type, where part is None
+    for filings that are not grouped into parts (S-1)."""
+    if filing_type in REPORT_TYPES:
+        items = ITEMS_10K if filing_type.startswith("10-K") else ITEMS_10Q
+        return [(part, f"ITEM {item}. {title}") for part, item, title in items]
+    elif filing_type in S1_TYPES:
+        return [(None, title) for title in SECTIONS_S1]
+    raise ValueError(f"Unsupported filing type {filing_type}")
+
+
+def _part_heading(filing_type: str, part: str) -> str:
+    part_title = PART_TITLES.get(filing_type[:4], {}).get(part)
+    return f"{part} - {part_title}" if part_title else part
+
+
+def _table_of_contents(filing_type: str, headings: Sequence[Tuple[Optional[str], str]]) -> str:
+    rows = ['<tr><td><p style="font-weight:bold">TABLE OF CONTENTS</p></td><td></td></tr>']
+    current_part = None
+    for page, (part, heading) in enumerate(headings, start=1):
+        if part is not None and part != current_part:
+            current_part = part
+            rows.append(f"<tr><td><p>{_part_heading(filing_type, part)}</p></td><td></td></tr>")
+        rows.append(f"<tr><td><p>{html.escape(heading)}</p></td><td>{page * 3}</td></tr>")
+    return "<table>\n" + "\n".join(rows) + "\n</table>"
+
+
+def _section_body(
+    rng: random.Random,
+    paragraphs: int,
+    sentences_per_paragraph: int,
+    subheadings: int,
+    list_items: int,
+) -> List[str]:
+    body: List[str] = []
+    # NOTE: Subheadings are spread evenly through the section, each followed by its paragraphs
+    subheading_every = max(paragraphs // subheadings, 1) if subheadings else 0
+    for i in range(paragraphs):
+        if subheading_every and i % subheading_every == 0 and i // subheading_every < subheadings:
+            body.append(f"<p><b>{rng.choice(_SUBHEADINGS)}</b></p>")
+        body.append(f"<p>{_paragraph(rng, sentences_per_paragraph)}</p>")
+        if list_items and i == paragraphs // 2:
+            items = "\n".join(f"<li>{_sentence(rng)}</li>" for _ in range(list_items))
+            body.append(f"<ul>\n{items}\n</ul>")
+    return body
+
+
+def generate_filing(
+    filing_type: str = "10-K",
+    paragraphs_per_section: int = 10,
+    sentences_per_paragraph: int = 4,
+    subheadings_per_section: int = 2,
+    list_items_per_section: int = 3,
+    num_sections: Optional[int] = None,
+    include_toc: bool = True,
+    page_break_every: int = 20,
+    company: str = "Synthetic Holdings Inc.",
+    seed: int = 0,
+) -> str:
+    """Returns the text of a synthetic EDGAR submission of the given filing type.
+
+    paragraphs_per_section, sentences_per_paragraph and list_items_per_section control the
+    size of each section body. subheadings_per_section controls the title density.
+    num_sections keeps only the first n sections of the form. page_break_every inserts an
+    <hr> after that many body elements."""
+    rng = random.Random(seed)
+    headings = section_headings(filing_type)
+    if num_sections is not None:
+        headings = headings[:num_sections]
+
+    body: List[str] = []
+    if include_toc:
+        body.append(_table_of_contents(filing_type, headings))
+        body.append("<hr>")
+    current_part = None
+    for part, heading in headings:
+        if part is not None and part != current_part:
+            current_part = part
+            body.append(f'<p style="font-weight:bold">{_part_heading(filing_type, part)}</p>')
+        body.append(f'<p style="font-weight:bold">{html.escape(heading)}</p>')
+        body.extend(
+            _section_body(
+                rng,
+                paragraphs_per_section,
+                sentences_per_paragraph,
+                subheadings_per_section,
+                list_items_per_section,
+            )
+        )
+
+    if page_break_every:
+        paged: List[str] = []
+        for i, element in enumerate(body, start=1):
+            paged.append(element)
+            if i % page_break_every == 0:
+                paged.append("<hr>")
+        body = paged
+
+    newline = "\n"
+    return f"""<SEC-DOCUMENT>0000000000-00-000000.txt
+<SEC-HEADER>
+CONFORMED SUBMISSION TYPE:	{filing_type}
+COMPANY CONFORMED NAME:	{company}
+</SEC-HEADER>
+<DOCUMENT>
+<TYPE>{filing_type}
+<SEQUENCE>1
+<FILENAME>synthetic.htm
+<TEXT>
+<HTML>
+<BODY>
+{newline.join(body)}
+</BODY>
+</HTML>
+</TEXT>
+</DOCUMENT>
+</SEC-DOCUMENT>
+"""
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Writes a synthetic SEC filing to stdout.")
+    parser.add_argument("--filing-type", default="10-K")
+    parser.add_argument("--paragraphs-per-section", type=int, default=10)
+    parser.add_argument("--sentences-per-paragraph", type=int, default=4)
+    parser.add_argument("--subheadings-per-section", type=int, default=2)
+    parser.add_argument("--list-items-per-section", type=int, default=3)
+    parser.add_argument("--num-sections", type=int)
+    parser.add_argument("--no-toc", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(
+        generate_filing(
+            args.filing_type,
+            paragraphs_per_section=args.paragraphs_per_section,
+            sentences_per_paragraph=args.sentences_per_paragraph,
+            subheadings_per_section=args.subheadings_per_section,
+            list_items_per_section=args.list_items_per_section,
+            num_sections=args.num_sections,
+            include_toc=not args.no_toc,
+            seed=args.seed,
+        ),
+        end="",
+    )
+
+
+if __name__ == "__main__":
+    main()